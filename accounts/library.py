@@ -0,0 +1,287 @@
+"""Synchronization of user libraries with the Lutris client"""
+
+# pylint: disable=no-member
+import logging
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from games.models import Game, GamePopularity, LibraryCategory, LibraryGame
+
+LOGGER = logging.getLogger(__name__)
+LIBRARY_BATCH_SIZE = 500
+LIBRARY_GAME_FIELDS = (
+    "game",
+    "name",
+    "runner",
+    "platform",
+    "lastplayed",
+    "playtime",
+    "service",
+    "service_id",
+    "updated_at",
+    "revision",
+)
+
+
+def sanitize_lastplayed(value):
+    """Sanitize lastplayed timestamp, returning 0 for invalid values."""
+    value = int(value or 0)
+    if value > int(time.time()) or value > 2147483647:
+        return 0
+    return value
+
+
+def get_library_key(slug, runner, platform, service):
+    """Return the key identifying a game in a library"""
+    return (slug, runner or "", platform or "", service or "")
+
+
+def resolve_game_slugs(slugs):
+    """Return the Lutris games matching a set of slugs, looking up aliases for
+    the slugs that don't belong to any game. Runs at most two queries.
+    """
+    slugs = {slug for slug in slugs if slug}
+    if not slugs:
+        return {}
+    games = {
+        game.slug: game
+        for game in Game.objects.filter(slug__in=slugs, change_for=None).only("id", "slug")
+    }
+    alias_games = defaultdict(dict)
+    aliased_games = (
+        Game.objects.filter(aliases__slug__in=slugs - games.keys(), change_for=None)
+        .annotate(alias_slug=F("aliases__slug"))
+        .only("id", "slug")
+        .order_by("id")
+    )
+    for game in aliased_games:
+        alias_games[game.alias_slug].setdefault(game.id, game)
+    for slug, matches in alias_games.items():
+        if len(matches) > 1:
+            LOGGER.warning("Alias slug '%s' matches multiple games: %s", slug, list(matches))
+        games[slug] = next(iter(matches.values()))
+    return games
+
+
+class LibrarySync:
+    """Apply the library sent by a client to its stored copy.
+
+    The stored library is loaded in a few queries, compared to the client
+    library in memory, and only the differences are written with bulk queries.
+    """
+
+    def __init__(self, library):
+        self.library = library
+        self.stats = {
+            "user": library.user.username,
+            "unchanged": 0,
+            "updated": 0,
+            "created": 0,
+            "errors": 0,
+        }
+        self.categories = {
+            category.name: category
+            for category in LibraryCategory.objects.filter(gamelibrary=library)
+        }
+        self.category_links = set()
+
+    def get_stored_games(self):
+        """Return the stored library, along with the slug of the Lutris game of each entry"""
+        return list(
+            LibraryGame.objects.filter(gamelibrary=self.library)
+            .annotate(game_slug=F("game__slug"))
+            .order_by("game__slug")
+        )
+
+    def create_categories(self, client_games):
+        """Create the categories used by the client that don't exist yet"""
+        new_categories = {
+            category_name: LibraryCategory(gamelibrary=self.library, name=category_name)
+            for client_game in client_games
+            for category_name in client_game.get("categories", [])
+            if category_name and category_name not in self.categories
+        }
+        LibraryCategory.objects.bulk_create(new_categories.values())
+        self.categories.update(new_categories)
+
+    def add_categories(self, library_game, client_game):
+        """Link a library game to the categories of a client game.
+        Returns whether a new link was added.
+        """
+        added = False
+        for category_name in client_game.get("categories", []):
+            if not category_name:
+                continue
+            link = (library_game, self.categories[category_name].id)
+            if link not in self.category_links:
+                self.category_links.add(link)
+                added = True
+        return added
+
+    @staticmethod
+    def update_library_game(library_game, client_game):
+        """Update a stored game from the client data, returns whether it changed"""
+        changed = False
+        if library_game.name != client_game["name"]:
+            library_game.name = client_game["name"]
+            changed = True
+        if library_game.runner != client_game["runner"]:
+            library_game.runner = client_game["runner"]
+            changed = True
+        if library_game.platform != client_game["platform"]:
+            library_game.platform = client_game["platform"]
+            changed = True
+        client_lastplayed = sanitize_lastplayed(client_game["lastplayed"])
+        if not library_game.lastplayed or library_game.lastplayed < client_lastplayed:
+            if library_game.lastplayed != client_lastplayed:
+                library_game.lastplayed = client_lastplayed
+                changed = True
+        client_playtime = float(client_game["playtime"] or 0)
+        if not library_game.playtime or library_game.playtime < client_playtime:
+            if library_game.playtime != client_playtime:
+                library_game.playtime = client_playtime
+                changed = True
+        if library_game.service != client_game["service"]:
+            library_game.service = client_game["service"]
+            library_game.service_id = client_game.get("service_id")
+            changed = True
+        return changed
+
+    def sync(self, client_games):
+        """Synchronize the library with a list of games sent by the client"""
+        client_library = defaultdict(list)
+        for client_game in client_games:
+            # Skip invalid entries, I don't even know how there are created.
+            if "runner" not in client_game:
+                continue
+            client_library[client_game["slug"]].append(client_game)
+        self.create_categories(
+            client_game for games in client_library.values() for client_game in games
+        )
+        stored_games = self.get_stored_games()
+        for library_game_id, category_id in LibraryGame.categories.through.objects.filter(
+            librarygame__gamelibrary=self.library
+        ).values_list("librarygame_id", "librarycategory_id"):
+            self.category_links.add((library_game_id, category_id))
+        existing_links = set(self.category_links)
+
+        updated_keys = set()
+        matched_ids = set()
+        changed_games = {}
+        unmatched_games = []
+        for library_game in stored_games:
+            slug = library_game.slug or library_game.game_slug
+            if slug not in client_library:
+                continue
+            stored_key = get_library_key(
+                slug, library_game.runner, library_game.platform, library_game.service
+            )
+            for client_game in client_library[slug]:
+                client_key = get_library_key(
+                    client_game["slug"],
+                    client_game["runner"],
+                    client_game["platform"],
+                    client_game["service"],
+                )
+                if client_key != stored_key and any(stored_key[1:]):
+                    continue
+                if not library_game.game_id:
+                    unmatched_games.append((library_game, client_game["slug"]))
+                changed = self.update_library_game(library_game, client_game)
+                if self.add_categories(library_game.id, client_game):
+                    changed = True
+                matched_ids.add(library_game.id)
+                if changed:
+                    changed_games[library_game.id] = library_game
+                stored_key = client_key
+                updated_keys.add(stored_key)
+
+        new_games = []
+        for slug, games in client_library.items():
+            for client_game in games:
+                client_key = get_library_key(
+                    slug, client_game["runner"], client_game["platform"], client_game["service"]
+                )
+                if client_key not in updated_keys:
+                    new_games.append(client_game)
+
+        lutris_games = resolve_game_slugs(
+            {slug for _library_game, slug in unmatched_games}
+            | {client_game["slug"] for client_game in new_games}
+        )
+        matched_game_ids = []
+        for library_game, slug in unmatched_games:
+            if not library_game.game_id and slug in lutris_games:
+                library_game.game = lutris_games[slug]
+                changed_games[library_game.id] = library_game
+                matched_game_ids.append(library_game.game_id)
+        self.stats["unchanged"] = len(matched_ids - changed_games.keys())
+
+        if not changed_games and not new_games:
+            LOGGER.info(self.stats)
+            return self.stats
+        with transaction.atomic():
+            revision = self.library.next_revision()
+            self.save_changed_games(changed_games.values(), revision)
+            self.create_games(new_games, lutris_games, revision)
+            GamePopularity.add_library_games(
+                matched_game_ids
+                + [
+                    lutris_games[game["slug"]].id
+                    for game in new_games
+                    if game["slug"] in lutris_games
+                ]
+            )
+            LibraryGame.categories.through.objects.bulk_create(
+                [
+                    LibraryGame.categories.through(
+                        librarygame_id=library_game_id, librarycategory_id=category_id
+                    )
+                    for library_game_id, category_id in self.category_links - existing_links
+                ],
+                batch_size=LIBRARY_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+        LOGGER.info(self.stats)
+        return self.stats
+
+    def save_changed_games(self, library_games, revision):
+        """Write the updated games. bulk_update skips auto_now so updated_at is set here."""
+        library_games = list(library_games)
+        now = timezone.now()
+        for library_game in library_games:
+            library_game.updated_at = now
+            library_game.revision = revision
+        LibraryGame.objects.bulk_update(
+            library_games, LIBRARY_GAME_FIELDS, batch_size=LIBRARY_BATCH_SIZE
+        )
+        self.stats["updated"] += len(library_games)
+
+    def create_games(self, client_games, lutris_games, revision):
+        """Add the games the client has and the stored library doesn't"""
+        library_games = LibraryGame.objects.bulk_create(
+            [
+                LibraryGame(
+                    game=lutris_games.get(client_game["slug"]),
+                    name=client_game["name"],
+                    slug=client_game["slug"],
+                    gamelibrary=self.library,
+                    playtime=client_game["playtime"] or 0,
+                    runner=client_game["runner"],
+                    platform=client_game["platform"],
+                    service=client_game["service"],
+                    lastplayed=sanitize_lastplayed(client_game["lastplayed"]),
+                    revision=revision,
+                )
+                for client_game in client_games
+            ],
+            batch_size=LIBRARY_BATCH_SIZE,
+        )
+        for library_game, client_game in zip(library_games, client_games, strict=True):
+            self.add_categories(library_game.id, client_game)
+            LOGGER.info("Create new Library game %s", client_game)
+        self.stats["created"] += len(library_games)
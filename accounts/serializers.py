@@ -1,6 +1,8 @@
 """Serializers for account models"""
 
 # pylint: disable=too-few-public-methods
+from collections import defaultdict
+
 from rest_framework import serializers
 
 from accounts.models import User
@@ -45,3 +47,60 @@ class LibrarySerializer(serializers.ModelSerializer):
             "lastplayed",
             "categories",
         )
+
+
+def serialize_library(queryset):
+    """Return the same data as LibrarySerializer for a queryset of library games.
+
+    Rows are read as plain values, with the media URLs stored on the games, and
+    categories are fetched in a single query, so the cost doesn't depend on the
+    number of games.
+    """
+    queryset = queryset.prefetch_related(None)
+    category_names = defaultdict(list)
+    for library_game_id, category_name in (
+        LibraryGame.categories.through.objects.filter(librarygame__in=queryset.values("id"))
+        .order_by("id")
+        .values_list("librarygame_id", "librarycategory__name")
+    ):
+        category_names[library_game_id].append(category_name)
+    library = []
+    for row in queryset.values(
+        "id",
+        "name",
+        "slug",
+        "playtime",
+        "runner",
+        "platform",
+        "service",
+        "service_id",
+        "lastplayed",
+        "game_id",
+        "game__name",
+        "game__slug",
+        "game__media_urls",
+    ):
+        if row["game_id"]:
+            media_urls = row["game__media_urls"] or {}
+            banner = media_urls.get("banner", "")
+            coverart = media_urls.get("coverart")
+            icon = media_urls.get("icon", "")
+        else:
+            banner = coverart = icon = None
+        library.append(
+            {
+                "name": row["name"] or row["game__name"],
+                "slug": row["slug"] or row["game__slug"],
+                "banner": banner,
+                "coverart": coverart,
+                "icon": icon,
+                "playtime": row["playtime"],
+                "runner": row["runner"],
+                "platform": row["platform"],
+                "service": row["service"],
+                "service_id": row["service_id"],
+                "lastplayed": row["lastplayed"],
+                "categories": category_names[row["id"]],
+            }
+        )
+    return library
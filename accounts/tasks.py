@@ -3,13 +3,16 @@
 import json
 import logging
 
+from django.db import transaction
+
 import games.models
 from accounts import spam_control
 from accounts.models import User
 from common.models import save_action_log
-from common.util import slugify
 from games.notifier import send_daily_mod_mail
-from games.util.steam import create_game
+from games.search import update_search_documents
+from games.tasks import fetch_steam_media
+from games.util.steam import resolve_steam_games
 from lutrisweb.celery import app
 
 LOGGER = logging.getLogger()
@@ -17,7 +20,12 @@ LOGGER = logging.getLogger()
 
 @app.task
 def sync_steam_library(user_id):
-    """Launch a Steam to Lutris library sync"""
+    """Launch a Steam to Lutris library sync
+
+    Steam games are resolved against Lutris games in bulk and added to the
+    library in a single insert. Media for the games created along the way is
+    downloaded by separate tasks.
+    """
     user = User.objects.get(pk=user_id)
     steamid = user.steamid
     try:
@@ -26,60 +34,59 @@ def sync_steam_library(user_id):
         LOGGER.error("No library found for user %s", user.username)
         return
     steam_games = games.util.steam.steam_sync(steamid)
-    game_count = 0
     if not steam_games:
         LOGGER.info("Steam user %s has no steam games", user.username)
         return
-    for game in steam_games:
-        if not game["img_icon_url"]:
-            LOGGER.info("Game %s has no icon", game["name"])
-            continue
-        game_count += 1
-        try:
-            steam_game = games.models.Game.objects.get(steamid=game["appid"])
-        except games.models.Game.MultipleObjectsReturned:
-            LOGGER.error("Multiple games with appid '%s'", game["appid"])
-            continue
-        except games.models.Game.DoesNotExist:
-            LOGGER.info("No game with steam id %s", game["appid"])
-            try:
-                steam_game = games.models.Game.objects.get(slug=slugify(game["name"])[:50])
-                if not steam_game.steamid:
-                    steam_game.steamid = game["appid"]
-                    steam_game.save()
-            except games.models.Game.DoesNotExist:
-                try:
-                    steam_game = create_game(game)
-                except Exception:
-                    LOGGER.exception(
-                        "Failed to create game %s (appid %s)", game["name"], game["appid"]
-                    )
-                    continue
-                LOGGER.info("Creating game %s", steam_game.slug)
-
-        try:
-            games.models.LibraryGame.objects.get_or_create(
-                game=steam_game,
-                gamelibrary=library,
-                service="steam",
-                defaults={
-                    "name": steam_game.name,
-                    "slug": steam_game.slug,
-                    "playtime": 0,
-                    "runner": "",
-                    "platform": "",
-                    "lastplayed": 0,
-                },
-            )
-        except games.models.LibraryGame.MultipleObjectsReturned:
-            dupes = games.models.LibraryGame.objects.filter(
-                game=steam_game,
-                gamelibrary=library,
-                service="steam",
+    steam_games = [game for game in steam_games if game["img_icon_url"]]
+    game_ids, created_ids = resolve_steam_games(steam_games)
+    update_search_documents(created_ids.values())
+    for steam_game in steam_games:
+        if steam_game["appid"] in created_ids:
+            LOGGER.info("Created game %s", steam_game["name"])
+            fetch_steam_media.delay(
+                created_ids[steam_game["appid"]],
+                steam_game.get("img_logo_url") or "",
+                steam_game["img_icon_url"],
             )
-            dupes.exclude(pk=dupes.first().pk).delete()
 
-    LOGGER.info("Added %s Steam games to %s's library", game_count, user.username)
+    library_games = games.models.LibraryGame.objects.filter(gamelibrary=library, service="steam")
+    with transaction.atomic():
+        # Concurrent syncs of the same library would insert the same games twice
+        games.models.GameLibrary.objects.select_for_update().filter(pk=library.pk).exists()
+        stored_game_ids = set()
+        duplicates = []
+        for library_game in library_games.filter(game_id__in=set(game_ids.values())).select_related(
+            "game"
+        ):
+            if library_game.game_id in stored_game_ids:
+                duplicates.append(library_game)
+            stored_game_ids.add(library_game.game_id)
+        library.delete_games(duplicates)
+        new_game_ids = set(game_ids.values()) - stored_game_ids
+        if new_game_ids:
+            revision = library.next_revision()
+            games.models.LibraryGame.objects.bulk_create(
+                [
+                    games.models.LibraryGame(
+                        game_id=game_id,
+                        gamelibrary=library,
+                        service="steam",
+                        name=name,
+                        slug=slug,
+                        playtime=0,
+                        runner="",
+                        platform="",
+                        lastplayed=0,
+                        revision=revision,
+                    )
+                    for game_id, name, slug in games.models.Game.objects.filter(
+                        pk__in=new_game_ids
+                    ).values_list("id", "name", "slug")
+                ]
+            )
+            games.models.GamePopularity.add_library_games(new_game_ids)
+    LOGGER.info("Added %s Steam games to %s's library", len(new_game_ids), user.username)
+    return {"games": len(steam_games), "created": len(created_ids), "added": len(new_game_ids)}
 
 
 @app.task
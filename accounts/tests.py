@@ -1,11 +1,16 @@
 import json
+from datetime import timedelta
 
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from accounts import sso
+from accounts import serializers, sso
 from accounts.models import User
 from common.util import create_admin, create_user
+from games.models import Game, GameAlias, GameLibrary, LibraryGame, LibraryGameTombstone
 
 
 class TestRegistration(TestCase):
@@ -67,3 +72,239 @@ class TestSSO(TestCase):
         self.assertIn("/session/sso_login", url)
         self.assertIn("sso=", url)
         self.assertIn("sig=", url)
+
+
+class LibraryTestCase(TestCase):
+    def setUp(self):
+        self.user = create_user(username="player", password="password")
+        self.client.login(username="player", password="password")
+        self.quake = Game.objects.create(name="Quake", slug="quake")
+        self.doom = Game.objects.create(name="Doom", slug="doom")
+        GameAlias.objects.create(game=self.doom, name="DOOM (1993)", slug="doom-1993")
+
+    def get_client_game(self, slug, **kwargs):
+        client_game = {
+            "name": slug.title(),
+            "slug": slug,
+            "runner": "linux",
+            "platform": "Linux",
+            "service": "",
+            "service_id": "",
+            "playtime": 1.5,
+            "lastplayed": 1600000000,
+            "categories": [],
+        }
+        client_game.update(kwargs)
+        return client_game
+
+    def sync(self, client_games):
+        response = self.client.post(
+            reverse("api_user_library"),
+            data=json.dumps(client_games),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+
+class TestLibrarySync(LibraryTestCase):
+    def test_creates_library_games(self):
+        library = self.sync(
+            [
+                self.get_client_game("quake", categories=["favorite", "fps"]),
+                self.get_client_game("doom-1993", runner="wine", platform="Windows"),
+                self.get_client_game("unknown-game"),
+            ]
+        )
+        self.assertEqual(len(library), 3)
+        library_games = {game.slug: game for game in LibraryGame.objects.all()}
+        self.assertEqual(library_games["quake"].game, self.quake)
+        self.assertEqual(library_games["doom-1993"].game, self.doom)
+        self.assertIsNone(library_games["unknown-game"].game)
+        self.assertEqual(sorted(library_games["quake"].get_category_names()), ["favorite", "fps"])
+
+    def test_updates_changed_games_only(self):
+        self.sync([self.get_client_game("quake"), self.get_client_game("doom")])
+        doom_updated_at = LibraryGame.objects.get(slug="doom").updated_at
+        library = self.sync(
+            [
+                self.get_client_game("quake", playtime=3, categories=["favorite"]),
+                self.get_client_game("doom", playtime=0.5),
+            ]
+        )
+        quake = LibraryGame.objects.get(slug="quake")
+        self.assertEqual(quake.playtime, 3)
+        self.assertEqual(quake.get_category_names(), ["favorite"])
+        doom = LibraryGame.objects.get(slug="doom")
+        self.assertEqual(doom.playtime, 1.5)
+        self.assertEqual(doom.updated_at, doom_updated_at)
+        self.assertEqual(LibraryGame.objects.count(), 2)
+        self.assertEqual(len(library), 2)
+
+    def test_same_game_on_several_runners(self):
+        self.sync([self.get_client_game("hexen")])
+        self.sync([self.get_client_game("hexen"), self.get_client_game("hexen", runner="dosbox")])
+        self.assertEqual(
+            sorted(LibraryGame.objects.values_list("runner", flat=True)), ["dosbox", "linux"]
+        )
+
+    def test_sync_cost_does_not_depend_on_library_size(self):
+        client_games = [self.get_client_game(f"game-{index}") for index in range(50)]
+        self.sync(client_games)
+        client_games[0]["playtime"] = 10
+        with CaptureQueriesContext(connection) as large_library_queries:
+            self.sync(client_games)
+        LibraryGame.objects.all().delete()
+        client_games = client_games[:2]
+        self.sync(client_games)
+        client_games[0]["playtime"] = 20
+        with CaptureQueriesContext(connection) as small_library_queries:
+            self.sync(client_games)
+        self.assertEqual(
+            len(large_library_queries.captured_queries),
+            len(small_library_queries.captured_queries),
+        )
+
+
+class TestLibraryDeltaSync(LibraryTestCase):
+    def get_changes(self, cursor="", client_games=None):
+        url = reverse("api_user_library") + "?cursor=" + cursor
+        if client_games is None:
+            response = self.client.get(url)
+        else:
+            response = self.client.post(
+                url, data=json.dumps(client_games), content_type="application/json"
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_sync_returns_whole_library(self):
+        self.sync([self.get_client_game("quake"), self.get_client_game("doom")])
+        changes = self.get_changes()
+        self.assertEqual(len(changes["games"]), 2)
+        self.assertEqual(changes["deleted"], [])
+        self.assertTrue(changes["cursor"])
+
+    def test_post_returns_changed_games_only(self):
+        self.sync([self.get_client_game("quake"), self.get_client_game("doom")])
+        cursor = self.get_changes()["cursor"]
+        changes = self.get_changes(
+            cursor,
+            [self.get_client_game("quake"), self.get_client_game("doom", playtime=5)],
+        )
+        self.assertEqual([game["slug"] for game in changes["games"]], ["doom"])
+        self.assertNotEqual(changes["cursor"], cursor)
+        changes = self.get_changes(changes["cursor"])
+        self.assertEqual(changes["games"], [])
+
+    def test_deleted_games_are_returned_as_tombstones(self):
+        self.sync([self.get_client_game("quake"), self.get_client_game("doom")])
+        cursor = self.get_changes()["cursor"]
+        response = self.client.delete(
+            reverse("api_user_library"),
+            data=json.dumps([{"slug": "quake", "lastplayed": 1600000000}]),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        changes = self.get_changes(cursor)
+        self.assertEqual(changes["games"], [])
+        self.assertEqual(
+            changes["deleted"],
+            [{"slug": "quake", "runner": "linux", "platform": "Linux", "service": ""}],
+        )
+
+    def test_merged_games_are_returned(self):
+        quake_copy = Game.objects.create(name="Quake Copy", slug="quake-copy")
+        library = self.user.gamelibrary
+        LibraryGame.objects.create(gamelibrary=library, game=quake_copy, runner="linux")
+        cursor = self.get_changes()["cursor"]
+        self.quake.merge_with_game(quake_copy)
+        changes = self.get_changes(cursor)
+        self.assertEqual([game["slug"] for game in changes["games"]], ["quake"])
+        self.assertEqual([game["slug"] for game in changes["deleted"]], ["quake-copy"])
+
+    def test_merge_query_count_does_not_depend_on_library_count(self):
+        doom = Game.objects.get(slug="doom")
+        quake_copies = [
+            Game.objects.create(name=f"Quake Copy {index}", slug=f"quake-copy-{index}")
+            for index in range(2)
+        ]
+        libraries = [create_user(username=f"player{index}").gamelibrary for index in range(5)]
+        LibraryGame.objects.create(gamelibrary=libraries[0], game=quake_copies[0])
+        for library in libraries:
+            LibraryGame.objects.create(
+                gamelibrary=library,
+                game=quake_copies[1],
+                slug=None if library == libraries[0] else "quake",
+            )
+        with CaptureQueriesContext(connection) as single_library_queries:
+            self.assertEqual(GameLibrary.move_games(quake_copies[0], self.quake), 1)
+        with CaptureQueriesContext(connection) as many_libraries_queries:
+            self.assertEqual(GameLibrary.move_games(quake_copies[1], doom), 5)
+        self.assertEqual(len(many_libraries_queries), len(single_library_queries))
+        for library in libraries:
+            library.refresh_from_db()
+            self.assertEqual(
+                set(library.games.filter(game=doom).values_list("revision", flat=True)),
+                {library.revision},
+            )
+        self.assertEqual(
+            sorted(
+                LibraryGameTombstone.objects.filter(gamelibrary=libraries[0]).values_list(
+                    "slug", flat=True
+                )
+            ),
+            ["quake-copy-0", "quake-copy-1"],
+        )
+
+    def test_cursor_older_than_pruned_tombstones_returns_whole_library(self):
+        self.sync([self.get_client_game("quake"), self.get_client_game("doom")])
+        cursor = self.get_changes()["cursor"]
+        library = self.user.gamelibrary
+        library.delete_games(LibraryGame.objects.filter(gamelibrary=library, slug="quake"))
+        self.assertEqual(LibraryGameTombstone.prune(), 0)
+        LibraryGameTombstone.objects.update(
+            deleted_at=timezone.now() - LibraryGameTombstone.RETENTION - timedelta(days=1)
+        )
+        self.assertEqual(LibraryGameTombstone.prune(), 1)
+        changes = self.get_changes(cursor)
+        self.assertEqual([game["slug"] for game in changes["games"]], ["doom"])
+        self.assertEqual(changes["deleted"], [])
+        self.assertEqual(self.get_changes(changes["cursor"])["games"], [])
+
+    def test_invalid_cursor_returns_whole_library(self):
+        self.sync([self.get_client_game("quake")])
+        self.assertEqual(len(self.get_changes("999")["games"]), 1)
+        self.assertEqual(len(self.get_changes("garbage")["games"]), 1)
+
+
+class TestLibrarySerialization(LibraryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.quake.title_logo = "uploads/banners/quake.jpg"
+        self.quake.coverart = "igdb/cover_big/co1abc.jpg"
+        self.quake.save()
+
+    def test_media_urls_are_stored_on_games(self):
+        self.assertEqual(self.quake.media_urls, self.quake.get_media_urls())
+        self.assertTrue(self.quake.media_urls["banner"].endswith("/games/banner/quake.jpg"))
+        self.assertEqual(self.quake.media_urls["icon"], "")
+
+    def test_matches_model_serializer(self):
+        self.sync(
+            [
+                self.get_client_game("quake", categories=["favorite", "fps"]),
+                self.get_client_game("doom"),
+                self.get_client_game("unknown-game"),
+            ]
+        )
+        queryset = LibraryGame.objects.order_by("slug")
+        self.assertEqual(
+            serializers.serialize_library(queryset),
+            [dict(data) for data in serializers.LibrarySerializer(queryset, many=True).data],
+        )
+
+    def test_runs_a_constant_number_of_queries(self):
+        self.sync([self.get_client_game(f"game-{index}") for index in range(30)])
+        with self.assertNumQueries(2):
+            serializers.serialize_library(LibraryGame.objects.all())
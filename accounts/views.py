@@ -3,8 +3,6 @@
 # pylint: disable=too-many-ancestors,raise-missing-from
 import json
 import logging
-import time
-from collections import defaultdict
 from datetime import datetime, timezone
 
 from django.conf import settings
@@ -35,23 +33,17 @@ from django.views.generic.edit import FormView
 from rest_framework import generics
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from games import models
 
 from . import forms, serializers, sso, tasks
+from .library import LibrarySync
 from .models import EmailConfirmationToken, User
 
 LOGGER = logging.getLogger(__name__)
 
 
-def sanitize_lastplayed(value):
-    """Sanitize lastplayed timestamp, returning 0 for invalid values."""
-    value = int(value or 0)
-    if value > int(time.time()) or value > 2147483647:
-        return 0
-    return value
-
-
 class LutrisRegisterView(CreateView):
     """Account registration view"""
 
@@ -489,12 +481,21 @@ class UserDetailView(generics.RetrieveAPIView):
 
 
 class GameLibraryAPIView(generics.ListCreateAPIView):
-    """List a user's library"""
+    """List a user's library
+
+    Clients passing a ``cursor`` parameter (empty on the first sync) get the
+    games changed and deleted since that cursor along with a new cursor,
+    instead of the whole library. Cursors older than the tombstones retention
+    get the whole library.
+    """
 
     permission_classes = [IsAuthenticated]
     serializer_class = serializers.LibrarySerializer
     pagination_class = None
 
+    def get_library(self):
+        return models.GameLibrary.objects.select_related("user").get(user=self.request.user)
+
     def get_queryset(self, ignore_since=False):
         queryset = (
             models.LibraryGame.objects.prefetch_related("game", "categories")
@@ -509,176 +510,62 @@ class GameLibraryAPIView(generics.ListCreateAPIView):
             queryset = queryset.filter(updated_at__gte=dt)
         return queryset
 
-    def is_empty_key(self, key):
-        """Return true if runner, platform, service are empty"""
-        return not key[1] and not key[2] and not key[3]
-
-    def get_lutris_game(self, slug):
-        if not slug:
-            return None
+    def get_cursor(self, library):
+        """Return the revision the client last synced, None if it needs the whole library"""
         try:
-            return models.Game.objects.get(slug=slug, change_for=None)
-        except models.Game.DoesNotExist:
-            pass
-        games = list(
-            models.Game.objects.filter(aliases__slug=slug, change_for=None)
-            .distinct()
-            .order_by("id")
+            revision = int(self.request.GET["cursor"])
+        except (KeyError, ValueError):
+            return None
+        if revision < 0 or revision > library.revision:
+            return None
+        if revision < library.pruned_revision:
+            # Some deletions since that revision are forgotten
+            return None
+        return revision
+
+    def get_changes(self, library):
+        """Return the changes to the library since the client's cursor"""
+        # The revision is read before the games so no change can be missed
+        revision = self.get_cursor(library)
+        queryset = self.get_queryset(ignore_since=True)
+        tombstones = library.tombstones.none()
+        if revision is not None:
+            queryset = queryset.filter(revision__gt=revision)
+            tombstones = library.tombstones.filter(revision__gt=revision)
+        return Response(
+            {
+                "cursor": str(library.revision),
+                "games": serializers.serialize_library(queryset),
+                "deleted": list(tombstones.values("slug", "runner", "platform", "service")),
+            }
         )
-        if len(games) > 1:
-            LOGGER.warning(
-                "Alias slug '%s' matches multiple games: %s",
-                slug,
-                [g.id for g in games],
-            )
-        return games[0] if games else None
+
+    def list(self, request, *args, **kwargs):
+        if "cursor" in request.GET:
+            return self.get_changes(self.get_library())
+        return Response(serializers.serialize_library(self.get_queryset()))
 
     def post(self, request, *args, **kwargs):
-        client_library = defaultdict(list)
-        library = models.GameLibrary.objects.get(user=request.user)
-        for game in request.data:
-            client_library[game["slug"]].append(game)
-        stored_library = self.get_queryset(ignore_since=True)
-        stored_categories = {
-            c.name: c for c in models.LibraryCategory.objects.filter(gamelibrary=library)
-        }
-        updated_games = set()
-        stats = {
-            "user": request.user.username,
-            "unchanged": 0,
-            "updated": 0,
-            "created": 0,
-            "errors": 0,
-        }
-
-        def get_category(category_name):
-            if not category_name:
-                return None
-            if category_name not in stored_categories:
-                category = models.LibraryCategory.objects.create(
-                    gamelibrary=library, name=category_name
-                )
-                stored_categories[category_name] = category
-            else:
-                category = stored_categories[category_name]
-            return category
-
-        for game in stored_library:
-            if game.get_slug() in client_library:
-                client_games = client_library[game.get_slug()]
-                stored_key = (
-                    game.get_slug(),
-                    game.runner or "",
-                    game.platform or "",
-                    game.service or "",
-                )
-                for client_game in client_games:
-                    client_key = (
-                        client_game["slug"],
-                        client_game["runner"] or "",
-                        client_game["platform"] or "",
-                        client_game["service"] or "",
-                    )
-                    if client_key == stored_key or self.is_empty_key(stored_key):
-                        changed = False
-                        if not game.game:
-                            lutris_game = self.get_lutris_game(client_game["slug"])
-                            if lutris_game:
-                                game.game = lutris_game
-                                changed = True
-                        if game.name != client_game["name"]:
-                            game.name = client_game["name"]
-                            changed = True
-                        if game.runner != client_game["runner"]:
-                            game.runner = client_game["runner"]
-                            changed = True
-                        if game.platform != client_game["platform"]:
-                            game.platform = client_game["platform"]
-                            changed = True
-                        client_lastplayed = sanitize_lastplayed(client_game["lastplayed"])
-                        if not game.lastplayed or game.lastplayed < client_lastplayed:
-                            if game.lastplayed != client_lastplayed:
-                                game.lastplayed = client_lastplayed
-                                changed = True
-                        client_playtime = float(client_game["playtime"] or 0)
-                        if not game.playtime or game.playtime < client_playtime:
-                            if game.playtime != client_playtime:
-                                game.playtime = client_playtime
-                                changed = True
-                        if game.service != client_game["service"]:
-                            game.service = client_game["service"]
-                            game.service_id = client_game["service_id"]
-                            changed = True
-                        for category_name in client_game.get("categories", []):
-                            category = get_category(category_name)
-                            if category and category not in game.categories.all():
-                                game.categories.add(category)
-                                changed = True
-
-                        if changed:
-                            game.save()
-                            stats["updated"] += 1
-                        else:
-                            stats["unchanged"] += 1
-                        stored_key = client_key
-                        updated_games.add(stored_key)
-
-        for slug in client_library:
-            client_games = client_library[slug]
-            for client_game in client_games:
-                if (
-                    "runner" not in client_game
-                ):  # Skip invalid entries, I don't even know how there are created.
-                    continue
-                client_key = (
-                    client_game["slug"],
-                    client_game["runner"] or "",
-                    client_game["platform"] or "",
-                    client_game["service"] or "",
-                )
-                if client_key in updated_games:
-                    continue
-
-                game = self.get_lutris_game(client_game["slug"])
-                library_game = models.LibraryGame.objects.create(
-                    game=game,
-                    name=client_game["name"],
-                    slug=client_game["slug"],
-                    gamelibrary=library,
-                    playtime=client_game["playtime"] or 0,
-                    runner=client_game["runner"],
-                    platform=client_game["platform"],
-                    service=client_game["service"],
-                    lastplayed=sanitize_lastplayed(client_game["lastplayed"]),
-                )
-                for category_name in client_game.get("categories", []):
-                    category = get_category(category_name)
-                    if category:
-                        library_game.categories.add(category)
-                stats["created"] += 1
-                LOGGER.info("Create new Library game %s", client_game)
-        LOGGER.info(stats)
+        LibrarySync(self.get_library()).sync(request.data)
         return self.get(request)
 
-    def delete_game(self, game):
-        library_games = models.LibraryGame.objects.filter(
-            gamelibrary__user=self.request.user, slug=game["slug"]
-        )
+    def delete_game(self, library, game):
+        library_games = models.LibraryGame.objects.filter(gamelibrary=library, slug=game["slug"])
         if len(library_games) == 1:
-            return library_games[0].delete()
+            return library.delete_games(library_games)
 
         for library_game in library_games:
             if library_game.lastplayed == game["lastplayed"]:
-                return library_game.delete()
-        return [""]
+                return library.delete_games([library_game])
+        return ""
 
     def delete(self, request):
         stats = {"delete_results": {}}
+        library = self.get_library()
         for game in request.data:
             slug = game["slug"]
             if not slug:
                 LOGGER.warning("No slug provided")
                 return HttpResponseBadRequest("Missing slug")
-            result = self.delete_game(game)
-            stats["delete_results"][slug] = result[0]
+            stats["delete_results"][slug] = self.delete_game(library, game)
         return HttpResponse(json.dumps(stats))
@@ -1,27 +1,100 @@
-"""Cloudflare API utilities"""
+"""Cloudflare API utilities
+
+URLs to purge from Cloudflare's cache are not sent right away, they are
+collected in a Redis set and purged in batches by a scheduled task. Callers
+return immediately, a URL queued many times is purged once and a bulk re-render
+costs a handful of API calls instead of one per image.
+"""
 
 import logging
 
 import requests
 from django.conf import settings
+from django_redis import get_redis_connection
 
 LOGGER = logging.getLogger(__name__)
 
+PURGE_QUEUE_KEY = "cloudflare:purge"
+PURGE_FAILURES_KEY = "cloudflare:purge:failures"
+PURGE_BACKOFF_KEY = "cloudflare:purge:backoff"
+
+
+def is_configured():
+    """Return whether Cloudflare API credentials are set"""
+    return bool(settings.CLOUDFLARE_ZONE_ID and settings.CLOUDFLARE_API_TOKEN)
+
+
+def get_connection():
+    """Return the Redis connection holding the purge queue"""
+    return get_redis_connection("default")
+
 
 def purge_urls(urls):
-    """Purge a list of URLs from Cloudflare's cache"""
-    zone_id = settings.CLOUDFLARE_ZONE_ID
-    api_token = settings.CLOUDFLARE_API_TOKEN
-    if not zone_id or not api_token:
+    """Queue a list of URLs to be purged from Cloudflare's cache"""
+    if not urls or not is_configured():
         return
+    get_connection().sadd(PURGE_QUEUE_KEY, *urls)
+
+
+def send_purge_request(urls):
+    """Purge a batch of URLs from Cloudflare's cache.
+    Returns whether the URLs were purged and, on a transient failure, the number of
+    seconds to wait before retrying them. Batches rejected by the API are dropped.
+    """
     try:
         response = requests.post(
-            f"https://api.cloudflare.com/client/v4/zones/{zone_id}/purge_cache",
-            headers={"Authorization": f"Bearer {api_token}"},
+            f"{settings.CLOUDFLARE_API_URL}/zones/{settings.CLOUDFLARE_ZONE_ID}/purge_cache",
+            headers={"Authorization": f"Bearer {settings.CLOUDFLARE_API_TOKEN}"},
             json={"files": urls},
             timeout=10,
         )
-        if not response.ok:
-            LOGGER.error("Cloudflare purge failed: %s", response.text)
     except requests.RequestException as ex:
         LOGGER.error("Cloudflare purge request failed: %s", ex)
+        return False, 0
+    if response.ok:
+        return True, None
+    if response.status_code == 429 or response.status_code >= 500:
+        LOGGER.warning(
+            "Cloudflare purge will be retried (%s): %s", response.status_code, response.text
+        )
+        try:
+            return False, int(response.headers.get("Retry-After", 0))
+        except ValueError:
+            return False, 0
+    LOGGER.error("Cloudflare purge failed, dropping %s URLs: %s", len(urls), response.text)
+    return False, None
+
+
+def get_backoff_delay(failures, retry_after=0):
+    """Return how long to wait before the next purge after consecutive failures"""
+    delay = settings.CLOUDFLARE_PURGE_BACKOFF * 2 ** (failures - 1)
+    return max(retry_after, min(delay, settings.CLOUDFLARE_PURGE_MAX_BACKOFF))
+
+
+def flush_purge_queue():
+    """Purge the queued URLs, in batches as large as the API accepts.
+    Returns the number of URLs purged.
+    """
+    if not is_configured():
+        return 0
+    connection = get_connection()
+    if connection.exists(PURGE_BACKOFF_KEY):
+        return 0
+    purged_count = 0
+    for _batch in range(settings.CLOUDFLARE_PURGE_MAX_BATCHES):
+        urls = sorted(
+            url.decode()
+            for url in connection.spop(PURGE_QUEUE_KEY, settings.CLOUDFLARE_PURGE_BATCH_SIZE)
+        )
+        if not urls:
+            break
+        purged, retry_after = send_purge_request(urls)
+        if retry_after is not None:
+            connection.sadd(PURGE_QUEUE_KEY, *urls)
+            failures = connection.incr(PURGE_FAILURES_KEY)
+            connection.set(PURGE_BACKOFF_KEY, failures, ex=get_backoff_delay(failures, retry_after))
+            break
+        connection.delete(PURGE_FAILURES_KEY)
+        if purged:
+            purged_count += len(urls)
+    return purged_count
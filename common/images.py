@@ -0,0 +1,120 @@
+"""Image processing engine built on Pillow
+
+Thumbnails are rendered in process instead of through ImageMagick. JPEG sources
+are decoded at the smallest scale that still covers the thumbnail (Image.draft),
+which skips most of the decoding work for large banners and covers. Batches of
+images are spread over a pool of processes.
+
+A pool can't be started from a daemonic process such as a Celery worker, tasks
+run their batches with workers=1.
+"""
+
+import math
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Render source to size in image_format, written to dest if given. Without resize,
+# the source is only cropped to the ratio of size and keeps its resolution.
+ImageJob = namedtuple(
+    "ImageJob",
+    ("source", "size", "image_format", "dest", "resize"),
+    defaults=("JPEG", None, True),
+)
+
+
+def parse_size(size):
+    """Return the (width, height) tuple of a size such as '184x69'"""
+    if isinstance(size, str):
+        width, height = size.split("x")
+        return int(width), int(height)
+    return tuple(size)
+
+
+def get_crop_box(image_size, target_ratio):
+    """Return the box of the biggest area at the center of an image respecting target_ratio"""
+    image_width, image_height = image_size
+    if target_ratio > image_width / image_height:
+        crop_height = image_width / target_ratio
+        return (0, (image_height - crop_height) / 2, image_width, (image_height + crop_height) / 2)
+    crop_width = image_height * target_ratio
+    return ((image_width - crop_width) / 2, 0, (image_width + crop_width) / 2, image_height)
+
+
+def render_image(source, size, image_format="JPEG", resize=True):
+    """Return an image cropped to the center at the ratio of size and resized to size,
+    encoded in image_format. source is a path or a file object.
+    """
+    width, height = parse_size(size)
+    with Image.open(source) as image:
+        if resize:
+            # Decode JPEG images at a reduced scale, as long as it covers the thumbnail
+            scale = max(width / image.width, height / image.height)
+            if scale < 1:
+                image.draft(None, (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+        image = image.convert("RGBA" if image_format == "PNG" else "RGB")
+    if resize:
+        image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+    else:
+        image = image.crop(get_crop_box(image.size, width / height))
+    output = BytesIO()
+    if image_format == "JPEG":
+        image.save(output, image_format, quality=90, optimize=True)
+    else:
+        image.save(output, image_format, optimize=True)
+    return output.getvalue()
+
+
+def run_image_job(job):
+    """Render an image job, writing it to its destination if it has one"""
+    content = render_image(job.source, job.size, job.image_format, job.resize)
+    if job.dest:
+        # Readers never see a partially written file
+        temp_path = "%s.%s.tmp" % (job.dest, os.getpid())
+        with open(temp_path, "wb") as image_file:
+            image_file.write(content)
+        os.replace(temp_path, job.dest)
+    return content
+
+
+def _run_image_job(job):
+    try:
+        return job, run_image_job(job), None
+    except (OSError, ValueError) as ex:
+        return job, None, str(ex)
+
+
+def _verify_image(path):
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (OSError, ValueError, SyntaxError) as ex:
+        return path, str(ex)
+    return path, None
+
+
+def _map(function, items, workers, chunksize):
+    """Apply function to items, over a pool of processes unless workers is 1"""
+    items = list(items)
+    if workers == 1 or len(items) < 2:
+        yield from map(function, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(function, items, chunksize=chunksize)
+
+
+def process_images(jobs, workers=None, chunksize=8):
+    """Run image jobs, on all CPUs by default.
+    Yields a (job, content, error) tuple for each job, in order.
+    """
+    return _map(_run_image_job, jobs, workers, chunksize)
+
+
+def verify_images(paths, workers=None, chunksize=32):
+    """Check that image files can be decoded, on all CPUs by default.
+    Yields a (path, error) tuple for each file, in order.
+    """
+    return _map(_verify_image, paths, workers, chunksize)
@@ -0,0 +1,16 @@
+"""Celery tasks for shared services"""
+
+from celery.utils.log import get_task_logger
+
+from common.cloudflare import flush_purge_queue
+from lutrisweb.celery import app
+
+LOGGER = get_task_logger(__name__)
+
+
+@app.task
+def flush_cloudflare_purges():
+    """Purge the URLs queued for purging from Cloudflare's cache"""
+    purged_count = flush_purge_queue()
+    if purged_count:
+        LOGGER.info("Purged %s URLs from Cloudflare", purged_count)
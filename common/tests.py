@@ -1,6 +1,17 @@
 # pylint: disable=missing-docstring
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from unittest.mock import patch
 
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from common import cloudflare
+from common.images import ImageJob, process_images, render_image, verify_images
 from common.util import clean_html, romkan, slugify
 
 
@@ -41,3 +52,164 @@ class TestUtils(TestCase):
             clean_html(dirty_markup),
             'Visit <a href="https://lutris.net">Lutris.net</a> it\'s full of fun!',
         )
+
+
+class TestImages(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.banner_path = os.path.join(self.directory.name, "banner.jpg")
+        Image.new("RGB", (1200, 300), "red").save(self.banner_path)
+
+    def test_render_image_fits_size(self):
+        content = render_image(self.banner_path, "184x69")
+        with Image.open(BytesIO(content)) as image:
+            self.assertEqual(image.format, "JPEG")
+            self.assertEqual(image.size, (184, 69))
+
+    def test_render_image_converts_to_png(self):
+        content = render_image(self.banner_path, (32, 32), "PNG")
+        with Image.open(BytesIO(content)) as image:
+            self.assertEqual(image.format, "PNG")
+            self.assertEqual(image.mode, "RGBA")
+            self.assertEqual(image.size, (32, 32))
+
+    def test_render_image_only_crops_without_resize(self):
+        content = render_image(self.banner_path, (184, 69), resize=False)
+        with Image.open(BytesIO(content)) as image:
+            self.assertEqual(image.size, (800, 300))
+
+    def test_process_images_reports_errors(self):
+        dest = os.path.join(self.directory.name, "thumbnail.jpg")
+        missing_path = os.path.join(self.directory.name, "missing.jpg")
+        jobs = [ImageJob(self.banner_path, "184x69", dest=dest), ImageJob(missing_path, "184x69")]
+        results = list(process_images(jobs, workers=1))
+        self.assertEqual([job for job, _content, _error in results], jobs)
+        _job, content, error = results[0]
+        self.assertIsNone(error)
+        with open(dest, "rb") as thumbnail_file:
+            self.assertEqual(thumbnail_file.read(), content)
+        _job, content, error = results[1]
+        self.assertIsNone(content)
+        self.assertTrue(error)
+
+    def test_verify_images(self):
+        corrupt_path = os.path.join(self.directory.name, "corrupt.jpg")
+        with open(corrupt_path, "wb") as corrupt_file:
+            corrupt_file.write(b"<html></html>")
+        results = dict(verify_images([self.banner_path, corrupt_path], workers=1))
+        self.assertIsNone(results[self.banner_path])
+        self.assertTrue(results[corrupt_path])
+
+
+class FakeRedis:
+    """The subset of the Redis client the purge queue uses"""
+
+    def __init__(self):
+        self.data = {}
+        self.expiries = {}
+
+    def sadd(self, key, *values):
+        self.data.setdefault(key, set()).update(value.encode() for value in values)
+
+    def spop(self, key, count):
+        members = self.data.get(key, set())
+        return [members.pop() for _index in range(min(count, len(members)))]
+
+    def exists(self, key):
+        return key in self.data
+
+    def incr(self, key):
+        self.data[key] = self.data.get(key, 0) + 1
+        return self.data[key]
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+        self.expiries[key] = ex
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class PurgeAPIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.purges.append((self.path, json.loads(body)["files"]))
+        status, headers = self.server.responses.pop(0) if self.server.responses else (200, {})
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class TestCloudflarePurgeQueue(SimpleTestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), PurgeAPIHandler)
+        self.server.purges = []
+        self.server.responses = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        settings_override = override_settings(
+            CLOUDFLARE_API_URL="http://127.0.0.1:%s" % self.server.server_port,
+            CLOUDFLARE_ZONE_ID="zone",
+            CLOUDFLARE_API_TOKEN="token",
+            CLOUDFLARE_PURGE_BATCH_SIZE=30,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.redis = FakeRedis()
+        connection_patch = patch("common.cloudflare.get_connection", return_value=self.redis)
+        connection_patch.start()
+        self.addCleanup(connection_patch.stop)
+
+    def queue_banners(self, count):
+        for index in range(count):
+            cloudflare.purge_urls(["https://lutris.net/games/banner/game-%s.jpg" % index])
+
+    def test_purges_deduplicated_urls_in_batches(self):
+        self.queue_banners(70)
+        self.queue_banners(70)
+        self.assertEqual(cloudflare.flush_purge_queue(), 70)
+        self.assertEqual([len(urls) for _path, urls in self.server.purges], [30, 30, 10])
+        self.assertEqual(self.server.purges[0][0], "/zones/zone/purge_cache")
+        purged_urls = {url for _path, urls in self.server.purges for url in urls}
+        self.assertEqual(len(purged_urls), 70)
+        self.assertEqual(cloudflare.flush_purge_queue(), 0)
+        self.assertEqual(len(self.server.purges), 3)
+
+    def test_throttled_batches_are_retried_after_backoff(self):
+        self.server.responses = [(429, {"Retry-After": "120"})]
+        self.queue_banners(10)
+        self.assertEqual(cloudflare.flush_purge_queue(), 0)
+        self.assertEqual(len(self.redis.data[cloudflare.PURGE_QUEUE_KEY]), 10)
+        self.assertEqual(self.redis.expiries[cloudflare.PURGE_BACKOFF_KEY], 120)
+
+        self.assertEqual(cloudflare.flush_purge_queue(), 0)
+        self.assertEqual(len(self.server.purges), 1)
+
+        self.redis.delete(cloudflare.PURGE_BACKOFF_KEY)
+        self.assertEqual(cloudflare.flush_purge_queue(), 10)
+        self.assertNotIn(cloudflare.PURGE_FAILURES_KEY, self.redis.data)
+
+    def test_backoff_doubles_on_consecutive_failures(self):
+        self.assertEqual(cloudflare.get_backoff_delay(1), 60)
+        self.assertEqual(cloudflare.get_backoff_delay(3), 240)
+        self.assertEqual(cloudflare.get_backoff_delay(20), 3600)
+        self.assertEqual(cloudflare.get_backoff_delay(1, retry_after=300), 300)
+
+    def test_rejected_batches_are_dropped(self):
+        self.server.responses = [(400, {})]
+        self.queue_banners(10)
+        self.assertEqual(cloudflare.flush_purge_queue(), 0)
+        self.assertFalse(self.redis.data[cloudflare.PURGE_QUEUE_KEY])
+        self.assertNotIn(cloudflare.PURGE_BACKOFF_KEY, self.redis.data)
+
+    @override_settings(CLOUDFLARE_API_TOKEN=None)
+    def test_nothing_is_queued_without_credentials(self):
+        self.queue_banners(10)
+        self.assertEqual(self.redis.data, {})
@@ -9,11 +9,12 @@ except ImportError:
 from django.contrib.auth import get_user_model
 from django.utils.text import slugify as django_slugify
 from lxml.html.clean import Cleaner  # pylint: disable=no-name-in-module
-from PIL import Image
 from transliterate import translit
 from transliterate.exceptions import LanguageDetectionError
 from xpinyin import Pinyin
 
+from common.images import ImageJob, run_image_job
+
 SLUG_MAX_LENGTH = 50
 
 
@@ -121,25 +122,6 @@ def dump_yaml(native_data):
     return yaml.safe_dump(native_data, default_flow_style=False)
 
 
-def get_crop_size(image_size, target_ratio):
-    """Return size of the biggest image that can be cut out from the
-    original that will respect the target ratio.
-
-    Args:
-        size (tuple): Size of the original image
-        target_ratio (float): Ratio for the target image
-    """
-    image_width, image_height = image_size
-    original_ratio = image_width / float(image_height)
-    if target_ratio > original_ratio:
-        target_width = image_width
-        target_height = image_width / target_ratio
-    else:
-        target_width = image_height * target_ratio
-        target_height = image_height
-    return (target_width, target_height)
-
-
 def crop_banner(img_path, dest_path, banner_size=(184, 69)):
     """Crop an image to fit the banner ratio
 
@@ -147,20 +129,4 @@ def crop_banner(img_path, dest_path, banner_size=(184, 69)):
         img_path (str): path for the image to resize.
         dest_path (str): path to store the modified image.
     """
-    image = Image.open(img_path)
-
-    # Get current and desired ratio for the images
-    img_width = image.size[0]
-    img_height = image.size[1]
-    target_ratio = float(banner_size[0]) / float(banner_size[1])
-    target_width, target_height = get_crop_size(image.size, target_ratio)
-
-    img_ratio = img_width / float(img_height)
-    if target_ratio > img_ratio:
-        box = (0, (img_height - target_height) / 2, img_width, (img_height + target_height) / 2)
-    else:
-        box = ((img_width - target_width) / 2, 0, (img_width + target_width) / 2, img_height)
-
-    image = image.crop(box)
-    image.mode = "RGB"
-    image.save(dest_path, "JPEG")
+    run_image_job(ImageJob(img_path, banner_size, "JPEG", dest_path, resize=False))
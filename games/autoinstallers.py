@@ -0,0 +1,85 @@
+"""Catalogue of auto-installers
+
+Games can be installed without a script of their own, from the default
+installer of one of their platforms or from a store they are sold on. The slugs
+of these auto-installers are written to the AutoInstallerSlug table whenever a
+game, its platforms, its provider games or a platform change, so resolving an
+auto-installer slug is a single indexed lookup instead of trying every platform
+and game matching the slug. Written slugs are dropped from the cache of resolved
+installer slugs, they may have been requested while still unknown.
+"""
+
+# pylint: disable=no-member
+from django.db import connection
+
+from games.cache import forget_installer_slugs
+from games.models import AUTO_INSTALLER_PROVIDERS, AutoInstallerSlug, Game
+from platforms.models import Platform
+from providers.models import Provider, ProviderGame
+
+AUTO_INSTALLER_BATCH_SIZE = 5000
+
+
+def _get_platform_insert_sql(where_clause):
+    """Return the query writing the auto-installers of platforms, for the links matched
+    by where_clause
+    """
+    platform_links = Game.platforms.through._meta.db_table
+    return f"""
+        INSERT INTO {AutoInstallerSlug._meta.db_table} (slug, game_id, platform_id)
+        SELECT left(game.slug, 30) || '-' || left(platform.slug, 20), game.id, platform.id
+        FROM {Game._meta.db_table} game
+        JOIN {platform_links} link ON link.game_id = game.id
+        JOIN {Platform._meta.db_table} platform ON platform.id = link.platform_id
+        WHERE platform.default_installer LIKE '{{%%' AND platform.default_installer <> '{{}}'
+            AND {where_clause}
+        RETURNING slug
+    """
+
+
+def _get_provider_insert_sql(where_clause):
+    """Return the query writing the auto-installers of stores, for the links matched
+    by where_clause
+    """
+    provider_links = Game.provider_games.through._meta.db_table
+    return f"""
+        INSERT INTO {AutoInstallerSlug._meta.db_table} (slug, game_id, provider_game_id)
+        SELECT provider.name || ':' || provider_game.internal_id, game.id, provider_game.id
+        FROM {Game._meta.db_table} game
+        JOIN {provider_links} link ON link.game_id = game.id
+        JOIN {ProviderGame._meta.db_table} provider_game ON provider_game.id = link.providergame_id
+        JOIN {Provider._meta.db_table} provider ON provider.id = provider_game.provider_id
+        WHERE provider.name = ANY(%s) AND provider_game.internal_id IS NOT NULL
+            AND {where_clause}
+        RETURNING slug
+    """
+
+
+def update_auto_installers(game_ids):
+    """Write the auto-installers of some games"""
+    game_ids = list({game_id for game_id in game_ids if game_id})
+    with connection.cursor() as cursor:
+        for index in range(0, len(game_ids), AUTO_INSTALLER_BATCH_SIZE):
+            batch = game_ids[index : index + AUTO_INSTALLER_BATCH_SIZE]
+            AutoInstallerSlug.objects.filter(game_id__in=batch).delete()
+            cursor.execute(_get_platform_insert_sql("game.id = ANY(%s)"), [batch])
+            slugs = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                _get_provider_insert_sql("game.id = ANY(%s)"),
+                [list(AUTO_INSTALLER_PROVIDERS), batch],
+            )
+            slugs += [row[0] for row in cursor.fetchall()]
+            forget_installer_slugs(slugs)
+
+
+def update_platform_auto_installers(platform_id):
+    """Write the auto-installers of every game of a platform"""
+    AutoInstallerSlug.objects.filter(platform_id=platform_id).delete()
+    with connection.cursor() as cursor:
+        cursor.execute(_get_platform_insert_sql("platform.id = %s"), [platform_id])
+        forget_installer_slugs([row[0] for row in cursor.fetchall()])
+
+
+def delete_provider_game_auto_installers(provider_game_id):
+    """Remove the auto-installers of a provider game, when it gets unlinked from all games"""
+    AutoInstallerSlug.objects.filter(provider_game_id=provider_game_id).delete()
@@ -0,0 +1,94 @@
+"""Versioned cache of game detail pages and API payloads
+
+Everything cached for a game is keyed by a content version stored in the cache.
+Signals bump the version of a game when anything shown on its page changes, so
+stale entries are never read again and simply expire. A global version covers
+changes shared by many games, like the default installers of platforms.
+
+Installer slugs requested by the client are resolved once to the games and
+installers they designate. Unknown slugs are remembered for a short while, and
+forgotten as soon as something gets saved with that slug.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GAME_DETAIL_CACHE_TIMEOUT = 24 * 3600
+GAME_VERSION_KEY = "games:detail-version:%s"
+GLOBAL_VERSION_KEY = "games:detail-version"
+INSTALLER_SLUG_KEY = "games:installer-slug:%s"
+INSTALLER_SLUG_TIMEOUT = 24 * 3600
+UNKNOWN_INSTALLER_SLUG_TIMEOUT = 15 * 60
+
+
+def get_game_version(game_id):
+    """Return the content version of a game, creating it if the cache lost it"""
+    keys = [GAME_VERSION_KEY % game_id, GLOBAL_VERSION_KEY]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # Start a new version, entries cached under the lost one can't be trusted
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return "%s.%s" % (versions[keys[0]], versions[keys[1]])
+
+
+def _set_versions(keys):
+    version = time.time_ns()
+    cache.set_many({key: version for key in keys}, timeout=None)
+
+
+def bump_game_versions(game_ids):
+    """Invalidate everything cached for some games.
+    Versions are bumped again once the transaction is committed, pages read from the
+    old rows in the meantime would otherwise be cached under the new version.
+    """
+    keys = [GAME_VERSION_KEY % game_id for game_id in game_ids if game_id]
+    if not keys:
+        return
+    _set_versions(keys)
+    transaction.on_commit(lambda: _set_versions(keys))
+
+
+def bump_global_version():
+    """Invalidate everything cached for every game, again once the transaction is committed"""
+    _set_versions([GLOBAL_VERSION_KEY])
+    transaction.on_commit(lambda: _set_versions([GLOBAL_VERSION_KEY]))
+
+
+def get_game_detail_key(game_id, name):
+    """Return the cache key of a payload for a game, for its current version"""
+    return "games:detail:%s:%s:%s" % (name, game_id, get_game_version(game_id))
+
+
+def get_installers_key(slug, game_ids):
+    """Return the cache key of the installers returned for a slug, for the current version
+    of the games they belong to
+    """
+    versions = ".".join(get_game_version(game_id) for game_id in sorted(set(game_ids)))
+    return "games:installers:%s:%s" % (slug, versions)
+
+
+def get_installer_slug_targets(slug):
+    """Return the cached resolution of an installer slug, None if it isn't cached"""
+    return cache.get(INSTALLER_SLUG_KEY % slug)
+
+
+def set_installer_slug_targets(slug, targets):
+    """Cache the resolution of an installer slug, empty for unknown slugs"""
+    timeout = INSTALLER_SLUG_TIMEOUT if targets else UNKNOWN_INSTALLER_SLUG_TIMEOUT
+    cache.set(INSTALLER_SLUG_KEY % slug, targets, timeout=timeout)
+
+
+def forget_installer_slugs(slugs):
+    """Drop the cached resolution of installer slugs, when something gets saved with them.
+    They are dropped again once the transaction is committed, a slug resolved before
+    then would be cached as unknown.
+    """
+    keys = [INSTALLER_SLUG_KEY % slug for slug in slugs if slug]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,83 @@
+"""Benchmark the installer API on the different kinds of slugs the client requests"""
+
+import statistics
+import time
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from games.models import AutoInstallerSlug, GameAlias, Installer
+from games.views.installers import GameInstallerListView
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "OPTIONS": {"MAX_ENTRIES": 1000000},
+    }
+}
+
+
+class Command(BaseCommand):
+    help = "Report p50/p99 latencies of the installer API for each kind of installer slug"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=200, help="Slugs of each kind")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def get_slugs(self, count):
+        """Return sample slugs of each kind"""
+        return {
+            "installer": list(
+                Installer.objects.order_by("?").values_list("slug", flat=True)[:count]
+            ),
+            "game": list(
+                Installer.objects.filter(published=True)
+                .order_by("?")
+                .values_list("game__slug", flat=True)[:count]
+            ),
+            "alias": list(GameAlias.objects.order_by("?").values_list("slug", flat=True)[:count]),
+            "auto": list(
+                AutoInstallerSlug.objects.order_by("?").values_list("slug", flat=True)[:count]
+            ),
+            "unknown": ["no-such-installer-%s" % index for index in range(count)],
+        }
+
+    def get_durations(self, slugs, repeat, cold):
+        """Return the duration of each request for the slugs"""
+        view = GameInstallerListView.as_view(throttle_classes=())
+        request_factory = RequestFactory()
+        if not cold:
+            for slug in slugs:
+                view(request_factory.get("/api/installers/%s" % slug), slug=slug).render()
+        durations = []
+        for _index in range(repeat):
+            for slug in slugs:
+                if cold:
+                    cache.clear()
+                request = request_factory.get("/api/installers/%s" % slug)
+                start = time.perf_counter()
+                view(request, slug=slug).render()
+                durations.append(time.perf_counter() - start)
+        return durations
+
+    def report(self, label, durations):
+        if len(durations) < 2:
+            self.stdout.write(f"{label:<20} not enough samples")
+            return
+        percentiles = statistics.quantiles(durations, n=100)
+        self.stdout.write(
+            f"{label:<20} p50 {percentiles[49] * 1000:>8.2f} ms   "
+            f"p99 {percentiles[98] * 1000:>8.2f} ms   ({len(durations)} requests)"
+        )
+
+    def handle(self, *args, **options):
+        # Run on a local cache, cold requests clear it
+        with override_settings(CACHES=LOCMEM_CACHES):
+            for kind, slugs in self.get_slugs(options["count"]).items():
+                self.report(
+                    f"{kind} (cold)", self.get_durations(slugs, options["repeat"], cold=True)
+                )
+                self.report(
+                    f"{kind} (cached)", self.get_durations(slugs, options["repeat"], cold=False)
+                )
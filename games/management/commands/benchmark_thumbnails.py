@@ -0,0 +1,93 @@
+"""Benchmark the Pillow image engine against the sorl convert engine on game banners"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from common.images import ImageJob, process_images
+from games.models import Game
+
+
+class Command(BaseCommand):
+    help = "Compare the banner rendering throughput of the Pillow engine and the convert engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("banners", nargs="*", help="Banner files, game banners by default")
+        parser.add_argument("--count", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+
+    def get_banner_paths(self, count):
+        """Return the paths of existing game banners"""
+        paths = []
+        for name in Game.objects.exclude(title_logo="").values_list("title_logo", flat=True):
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            if os.path.exists(path):
+                paths.append(path)
+            if len(paths) == count:
+                break
+        return paths
+
+    def report(self, label, banner_count, duration):
+        self.stdout.write(
+            f"{label:<28} {duration:>8.2f} s {banner_count / duration:>10,.1f} banners/s"
+        )
+
+    def run_convert_engine(self, paths, output_dir):
+        """Render the banners like sorl's get_thumbnail does, without its key value store"""
+        backend = ThumbnailBackend()
+        options = dict(backend.default_options, crop="center", format="JPEG")
+        source_storage = FileSystemStorage(location="/")
+        output_storage = FileSystemStorage(location=output_dir)
+        for index, path in enumerate(paths):
+            source_image = default.engine.get_image(ImageFile(path, source_storage))
+            thumbnail = ImageFile("convert-%s.jpg" % index, output_storage)
+            # pylint: disable=protected-access
+            backend._create_thumbnail(source_image, settings.BANNER_SIZE, options, thumbnail)
+            default.engine.cleanup(source_image)
+
+    def run_pillow_engine(self, paths, output_dir, workers):
+        jobs = [
+            ImageJob(path, settings.BANNER_SIZE, "JPEG", os.path.join(output_dir, "%s.jpg" % index))
+            for index, path in enumerate(paths)
+        ]
+        errors = [error for _job, _content, error in process_images(jobs, workers) if error]
+        if errors:
+            self.stderr.write("%s banners could not be rendered: %s" % (len(errors), errors[0]))
+
+    def handle(self, *args, **options):
+        paths = options["banners"] or self.get_banner_paths(options["count"])
+        if not paths:
+            self.stderr.write("No banners to render")
+            return
+        self.stdout.write(f"Rendering {len(paths)} banners to {settings.BANNER_SIZE}")
+        output_dir = tempfile.mkdtemp()
+        try:
+            if shutil.which(thumbnail_settings.THUMBNAIL_CONVERT.split()[0]):
+                start = time.perf_counter()
+                self.run_convert_engine(paths, output_dir)
+                self.report("convert engine", len(paths), time.perf_counter() - start)
+            else:
+                self.stdout.write("ImageMagick isn't installed, skipping the convert engine")
+
+            start = time.perf_counter()
+            self.run_pillow_engine(paths, output_dir, workers=1)
+            self.report("Pillow engine, 1 process", len(paths), time.perf_counter() - start)
+
+            start = time.perf_counter()
+            self.run_pillow_engine(paths, output_dir, workers=options["workers"])
+            self.report(
+                f"Pillow engine, {options['workers']} processes",
+                len(paths),
+                time.perf_counter() - start,
+            )
+        finally:
+            shutil.rmtree(output_dir)
@@ -1,10 +1,12 @@
-"""Find and remove invalid game banners (0 bytes or HTML error pages)"""
+"""Find and remove invalid game banners (0 bytes, HTML error pages or undecodable images)"""
 
 import os
+from collections import defaultdict
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from common.images import verify_images
 from games.models import Game
 
 
@@ -17,10 +19,24 @@ class Command(BaseCommand):
             action="store_true",
             help="Only report invalid banners without deleting them",
         )
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of processes, all CPUs by default"
+        )
+
+    @staticmethod
+    def clear_banner(game, file_path, dry_run):
+        """Delete the banner file of a game and clear its title_logo"""
+        if dry_run:
+            return
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        game.title_logo = ""
+        game.save(update_fields=["title_logo"])
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
         invalid_count = 0
+        banners_to_decode = defaultdict(list)
 
         for game in Game.objects.exclude(title_logo=""):
             if not game.title_logo.name:
@@ -30,19 +46,14 @@ class Command(BaseCommand):
 
             if not os.path.exists(file_path):
                 self.stdout.write(f"[missing] {game.slug} (id={game.id}): {game.title_logo.name}")
-                if not dry_run:
-                    game.title_logo = ""
-                    game.save(update_fields=["title_logo"])
+                self.clear_banner(game, None, dry_run)
                 invalid_count += 1
                 continue
 
             file_size = os.path.getsize(file_path)
             if file_size == 0:
                 self.stdout.write(f"[empty] {game.slug} (id={game.id}): {game.title_logo.name}")
-                if not dry_run:
-                    os.remove(file_path)
-                    game.title_logo = ""
-                    game.save(update_fields=["title_logo"])
+                self.clear_banner(game, file_path, dry_run)
                 invalid_count += 1
                 continue
 
@@ -51,12 +62,20 @@ class Command(BaseCommand):
                 header = f.read(256)
             if b"<html" in header.lower() or b"<!doctype" in header.lower():
                 self.stdout.write(f"[html] {game.slug} (id={game.id}): {game.title_logo.name}")
-                if not dry_run:
-                    os.remove(file_path)
-                    game.title_logo = ""
-                    game.save(update_fields=["title_logo"])
+                self.clear_banner(game, file_path, dry_run)
                 invalid_count += 1
                 continue
 
+            banners_to_decode[file_path].append(game)
+
+        # Decoding is the slow part, it runs on all CPUs
+        for file_path, error in verify_images(banners_to_decode, workers=options["workers"]):
+            if not error:
+                continue
+            for game in banners_to_decode[file_path]:
+                self.stdout.write(f"[corrupt] {game.slug} (id={game.id}): {game.title_logo.name}")
+                self.clear_banner(game, file_path, dry_run)
+                invalid_count += 1
+
         action = "Found" if dry_run else "Cleaned"
         self.stdout.write(self.style.SUCCESS(f"{action} {invalid_count} invalid banners"))
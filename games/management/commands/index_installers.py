@@ -0,0 +1,33 @@
+"""Recompute the search tokens of every installer"""
+
+from django.core.management.base import BaseCommand
+
+from games.models import Installer
+from games.util.installer_tokens import get_installer_tokens
+
+
+class Command(BaseCommand):
+    """Index installers for search again, after the tokenizer changes"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        installers = []
+        changed_count = 0
+        for installer in (
+            Installer.objects.select_related("runner")
+            .only("id", "content", "search_tokens", "runner__slug")
+            .iterator(chunk_size=batch_size)
+        ):
+            search_tokens = get_installer_tokens(installer.content, installer.runner.slug)
+            if search_tokens == installer.search_tokens:
+                continue
+            installer.search_tokens = search_tokens
+            installers.append(installer)
+            if len(installers) >= batch_size:
+                changed_count += Installer.objects.bulk_update(installers, ["search_tokens"])
+                installers = []
+        changed_count += Installer.objects.bulk_update(installers, ["search_tokens"])
+        self.stdout.write(f"Indexed {changed_count} installers")
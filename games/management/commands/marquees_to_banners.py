@@ -7,7 +7,7 @@ from django.core.files.base import ContentFile
 from django.core.management.base import BaseCommand
 from PIL import Image
 
-from common.util import crop_banner
+from common.images import ImageJob, process_images
 from games.models import Game
 
 if settings.DEBUG:
@@ -20,36 +20,56 @@ BANNER_PATH = os.path.join(settings.MEDIA_ROOT, "mame/banners")
 class Command(BaseCommand):
     """Resize banners and icons"""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of processes, all CPUs by default"
+        )
+
     @staticmethod
-    def make_banner_from_marquee(game):
-        """Generate a banner for a game from available marquees"""
+    def get_marquee_path(game):
+        """Return the path of a marquee usable as a banner for a game"""
         mame_ids = [pgame.slug for pgame in game.provider_games.all()]
         for mame_id in mame_ids:
             marquee_path = os.path.join(MARQUEE_PATH, "%s.png" % mame_id)
             if not os.path.exists(marquee_path):
                 continue
-            marquee = Image.open(marquee_path)
-            ratio = marquee.size[0] / marquee.size[1]
+            # Only reads the header of the image
+            with Image.open(marquee_path) as marquee:
+                ratio = marquee.size[0] / marquee.size[1]
             max_ratio = 5
             min_ratio = 2
             if ratio < min_ratio or ratio > max_ratio:
                 continue
-            banner_filename = "%s.jpg" % mame_id
-            banner_path = os.path.join(BANNER_PATH, banner_filename)
-            crop_banner(marquee_path, banner_path)
-            with open(banner_path, "rb") as banner_file:
-                banner_content = banner_file.read()
-            game.title_logo = ContentFile(banner_content, banner_filename)
-            game.save()
-            print("Banner created for %s" % game)
-            return
+            return marquee_path
+        return None
 
-    def handle(self, *args, **_kwargs):
+    def handle(self, *args, **options):
         """Run command"""
         if not os.path.exists(BANNER_PATH):
             os.makedirs(BANNER_PATH)
 
-        for game in Game.objects.filter(provider_games__provider__name="MAME"):
+        games = {}
+        jobs = []
+        for game in (
+            Game.objects.filter(provider_games__provider__name="MAME")
+            .distinct()
+            .prefetch_related("provider_games")
+        ):
             if game.title_logo:
                 continue
-            self.make_banner_from_marquee(game)
+            marquee_path = self.get_marquee_path(game)
+            if not marquee_path:
+                continue
+            mame_id = os.path.splitext(os.path.basename(marquee_path))[0]
+            banner_path = os.path.join(BANNER_PATH, "%s.jpg" % mame_id)
+            games[banner_path] = game
+            jobs.append(ImageJob(marquee_path, (184, 69), "JPEG", banner_path, resize=False))
+
+        for job, content, error in process_images(jobs, workers=options["workers"]):
+            if error:
+                self.stderr.write("Could not crop %s: %s" % (job.source, error))
+                continue
+            game = games[job.dest]
+            game.title_logo = ContentFile(content, os.path.basename(job.dest))
+            game.save()
+            print("Banner created for %s" % game)
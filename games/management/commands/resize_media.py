@@ -2,20 +2,60 @@
 
 import os
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
+from common.images import ImageJob, process_images
+from games.media import render_games_media
 from games.models import Game
 
+BATCH_SIZE = 500
+
 
 class Command(BaseCommand):
     """Resize banners and icons"""
 
-    def handle(self, *args, **_kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None, help="Number of processes, all CPUs by default"
+        )
+
+    @staticmethod
+    def get_precache_jobs(games):
+        """Return the jobs rendering the banners and icons missing from the precache folders"""
+        jobs = []
+        for game in games:
+            icon_path = os.path.join(Game.ICON_PATH, "%s.png" % game.slug)
+            if game.icon and not os.path.exists(icon_path):
+                jobs.append(ImageJob(game.icon.path, settings.ICON_SIZE, "PNG", icon_path))
+            banner_path = os.path.join(Game.BANNER_PATH, "%s.jpg" % game.slug)
+            if game.title_logo and not os.path.exists(banner_path):
+                jobs.append(
+                    ImageJob(game.title_logo.path, settings.BANNER_SIZE, "JPEG", banner_path)
+                )
+        return jobs
+
+    def handle(self, *args, **options):
         """Run command"""
         if not os.path.exists(Game.ICON_PATH):
             os.makedirs(Game.ICON_PATH)
         if not os.path.exists(Game.BANNER_PATH):
             os.makedirs(Game.BANNER_PATH)
 
-        for game in Game.objects.all():
-            game.precache_media(force=False)
+        games = Game.objects.filter(change_for__isnull=True).exclude(
+            icon="", title_logo="", coverart=""
+        )
+        rendered_count = 0
+        last_id = 0
+        while True:
+            batch = list(games.filter(id__gt=last_id).order_by("id")[:BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            jobs = self.get_precache_jobs(batch)
+            for job, _content, error in process_images(jobs, workers=options["workers"]):
+                if error:
+                    self.stderr.write("Could not render %s: %s" % (job.source, error))
+            rendered = render_games_media(batch, workers=options["workers"])
+            rendered_count += sum(len(variants) for variants in rendered.values())
+        self.stdout.write("Rendered %s media variants" % rendered_count)
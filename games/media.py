@@ -0,0 +1,91 @@
+"""Pre-rendered game media
+
+Banners, icons and coverart are rendered to every size variant the site and the
+client use as soon as a game gets a new image, instead of on request. Rendered
+files are stored under a path derived from their content, so they never change
+once published and can be cached forever, and their location is recorded on the
+game where URL builders and serializers find it without rendering anything.
+"""
+
+import hashlib
+import logging
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from common.images import ImageJob, process_images
+from games.cache import bump_game_versions
+from games.models import Game
+
+LOGGER = logging.getLogger(__name__)
+RENDERED_MEDIA_DIR = "rendered"
+IMAGE_EXTENSIONS = {"JPEG": "jpg", "PNG": "png"}
+
+
+def get_rendered_path(variant, content, image_format):
+    """Return the content addressed storage path of a rendered image"""
+    digest = hashlib.sha256(content).hexdigest()
+    return "%s/%s/%s/%s.%s" % (
+        RENDERED_MEDIA_DIR,
+        variant,
+        digest[:2],
+        digest,
+        IMAGE_EXTENSIONS[image_format],
+    )
+
+
+def render_games_media(games, force=False, workers=1):
+    """Render the media variants of games whose source image changed and record them
+    on the games. Returns the rendered variants of each game, by game id.
+    """
+    games_media = []
+    jobs = []
+    job_variants = []
+    for game in games:
+        rendered_media = dict(game.rendered_media)
+        games_media.append((game, rendered_media))
+        for variant, (field_name, size, image_format) in Game.RENDERED_MEDIA.items():
+            source = getattr(game, field_name)
+            if not source:
+                rendered_media.pop(variant, None)
+                continue
+            if not force and rendered_media.get(variant, {}).get("source") == source.name:
+                continue
+            jobs.append(ImageJob(source.path, size, image_format))
+            job_variants.append((game, rendered_media, variant, source.name))
+
+    rendered_variants = {game.pk: [] for game, _rendered_media in games_media}
+    results = process_images(jobs, workers=workers)
+    for (game, rendered_media, variant, source_name), (job, content, error) in zip(
+        job_variants, results, strict=True
+    ):
+        if error:
+            LOGGER.error(
+                "Could not render the %s of %s from %s: %s", variant, game, job.source, error
+            )
+            continue
+        path = get_rendered_path(variant, content, job.image_format)
+        if not default_storage.exists(path):
+            path = default_storage.save(path, ContentFile(content))
+        rendered_media[variant] = {"source": source_name, "path": path}
+        rendered_variants[game.pk].append(variant)
+
+    changed_game_ids = []
+    for game, rendered_media in games_media:
+        if rendered_media == game.rendered_media:
+            continue
+        game.rendered_media = rendered_media
+        game.media_urls = game.get_media_urls()
+        Game.objects.filter(pk=game.pk).update(
+            rendered_media=game.rendered_media, media_urls=game.media_urls
+        )
+        changed_game_ids.append(game.pk)
+    bump_game_versions(changed_game_ids)
+    return rendered_variants
+
+
+def render_game_media(game, force=False):
+    """Render the media variants of a game whose source image changed.
+    Returns the rendered variants.
+    """
+    return render_games_media([game], force=force)[game.pk]
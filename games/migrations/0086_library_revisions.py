@@ -0,0 +1,37 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0085_alter_regression_bug_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelibrary',
+            name='revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='librarygame',
+            name='revision',
+            field=models.PositiveBigIntegerField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='LibraryGameTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(max_length=256, null=True)),
+                ('runner', models.CharField(max_length=64, null=True)),
+                ('platform', models.CharField(max_length=255, null=True)),
+                ('service', models.CharField(max_length=64, null=True)),
+                ('revision', models.PositiveBigIntegerField(db_index=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('gamelibrary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tombstones', to='games.gamelibrary')),
+            ],
+        ),
+    ]
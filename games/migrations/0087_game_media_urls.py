@@ -0,0 +1,58 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:10
+
+from django.conf import settings
+from django.db import migrations, models
+from django.urls import reverse
+
+
+def populate_media_urls(apps, schema_editor):
+    """Compute the URLs returned by Game.get_media_urls for existing games"""
+    Game = apps.get_model('games', 'Game')
+    games = (
+        Game.objects.exclude(icon='', title_logo='', coverart='')
+        .select_related('change_for')
+        .only('slug', 'icon', 'title_logo', 'coverart', 'change_for__slug')
+        .order_by('pk')
+    )
+    batch = []
+    for game in games.iterator(chunk_size=1000):
+        slug = game.change_for.slug if game.change_for else game.slug
+        if not slug:
+            continue
+        game.media_urls = {
+            'banner': (
+                settings.ROOT_URL + reverse('get_banner', kwargs={'slug': slug})
+                if game.title_logo
+                else ''
+            ),
+            'icon': (
+                settings.ROOT_URL + reverse('get_icon', kwargs={'slug': slug})
+                if game.icon
+                else ''
+            ),
+            'coverart': game.coverart.url if game.coverart else None,
+        }
+        batch.append(game)
+        if len(batch) == 1000:
+            Game.objects.bulk_update(batch, ['media_urls'])
+            batch = []
+    Game.objects.bulk_update(batch, ['media_urls'])
+    Game.objects.filter(icon='', title_logo='', coverart='').update(
+        media_urls={'banner': '', 'icon': '', 'coverart': None}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0086_library_revisions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='media_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(populate_media_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0087_game_media_urls'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GamePopularity',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity_counter', serialize=False, to='games.game')),
+                ('library_count', models.IntegerField(default=0)),
+                ('recent_play_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'game popularity',
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO games_gamepopularity (game_id, library_count, recent_play_count, updated_at)
+            SELECT game_id, COUNT(*), 0, NOW()
+            FROM games_librarygame
+            WHERE game_id IS NOT NULL
+            GROUP BY game_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
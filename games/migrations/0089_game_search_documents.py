@@ -0,0 +1,56 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0088_game_popularity'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name='GameSearchDocument',
+            fields=[
+                ('game', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='games.game')),
+                ('names', models.TextField()),
+                ('companies', models.TextField(blank=True)),
+                ('providers', models.TextField(blank=True)),
+                ('search_vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('names', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector('companies', config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), '||', django.contrib.postgres.search.SearchVector('providers', config='simple', weight='C'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField())),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='games_search_vector_idx'), django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('names'), name='gin_trgm_ops'), name='games_search_names_idx')],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO games_gamesearchdocument (game_id, names, companies, providers)
+            SELECT game.id,
+                concat_ws(
+                    ' ', game.name, game.slug,
+                    (SELECT string_agg(alias.name, ' ') FROM games_gamealias alias
+                     WHERE alias.game_id = game.id)
+                ),
+                concat_ws(' ', developer.name, publisher.name),
+                COALESCE(
+                    (SELECT string_agg(DISTINCT provider_game.name, ' ')
+                     FROM games_game_provider_games link
+                     JOIN providers_providergame provider_game
+                        ON provider_game.id = link.providergame_id
+                     WHERE link.game_id = game.id),
+                    ''
+                )
+            FROM games_game game
+            LEFT JOIN games_company developer ON developer.id = game.developer_id
+            LEFT JOIN games_company publisher ON publisher.id = game.publisher_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
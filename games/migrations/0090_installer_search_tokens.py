@@ -0,0 +1,25 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:30
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0089_game_search_documents'),
+        ('runners', '0017_runtime_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installer',
+            name='search_tokens',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, editable=False, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='installer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_tokens'], name='games_installer_tokens_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0090_installer_search_tokens'),
+        ('platforms', '0011_alter_platform_id'),
+        ('providers', '0014_igdb_upsert_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutoInstallerSlug',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.CharField(db_index=True, max_length=255)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auto_installer_slugs', to='games.game')),
+                ('platform', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='platforms.platform')),
+                ('provider_game', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='providers.providergame')),
+            ],
+        ),
+        migrations.RunSQL(
+            sql="""
+            INSERT INTO games_autoinstallerslug (slug, game_id, platform_id)
+            SELECT left(game.slug, 30) || '-' || left(platform.slug, 20), game.id, platform.id
+            FROM games_game game
+            JOIN games_game_platforms link ON link.game_id = game.id
+            JOIN platforms_platform platform ON platform.id = link.platform_id
+            WHERE platform.default_installer LIKE '{%' AND platform.default_installer <> '{}';
+            INSERT INTO games_autoinstallerslug (slug, game_id, provider_game_id)
+            SELECT provider.name || ':' || provider_game.internal_id, game.id, provider_game.id
+            FROM games_game game
+            JOIN games_game_provider_games link ON link.game_id = game.id
+            JOIN providers_providergame provider_game ON provider_game.id = link.providergame_id
+            JOIN providers_provider provider ON provider.id = provider_game.provider_id
+            WHERE provider.name IN ('gog', 'steam', 'humblebundle')
+                AND provider_game.internal_id IS NOT NULL;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
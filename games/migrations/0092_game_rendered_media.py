@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-18 05:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0091_auto_installer_slugs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='rendered_media',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
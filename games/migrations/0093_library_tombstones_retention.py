@@ -0,0 +1,23 @@
+# Generated by Django 5.2.11 on 2026-10-18 06:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0092_game_rendered_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamelibrary',
+            name='pruned_revision',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='librarygametombstone',
+            name='deleted_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
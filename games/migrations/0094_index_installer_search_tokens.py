@@ -0,0 +1,113 @@
+# Generated by Django 5.2.11 on 2026-10-18 09:12
+
+import os
+from urllib.parse import urlparse
+
+import yaml
+from django.db import migrations
+
+# Frozen copy of games.util.installer_tokens.get_installer_tokens, as it was when
+# search tokens were introduced. Installers saved later are tokenized on save and
+# the index_installers command reindexes everything when the tokenizer changes.
+MAX_TOKEN_LENGTH = 255
+
+
+def get_token(kind, value):
+    return f'{kind}:{str(value).strip().lower()}'[:MAX_TOKEN_LENGTH]
+
+
+def iter_file_urls(files):
+    for file_item in files if isinstance(files, list) else []:
+        if not isinstance(file_item, dict):
+            continue
+        for file_meta in file_item.values():
+            url = file_meta.get('url') if isinstance(file_meta, dict) else file_meta
+            if isinstance(url, str) and url.startswith(('http://', 'https://', 'ftp://')):
+                yield url
+
+
+def iter_step_tokens(steps):
+    for step in steps if isinstance(steps, list) else []:
+        if not isinstance(step, dict):
+            continue
+        for directive, params in step.items():
+            if not isinstance(params, dict):
+                continue
+            if directive == 'task':
+                task_name = params.get('name')
+                if not task_name:
+                    continue
+                yield get_token('task', task_name)
+                if task_name == 'winetricks':
+                    for verb in str(params.get('app') or '').split():
+                        yield get_token('winetricks', verb)
+                if params.get('executable'):
+                    yield get_token('exe', os.path.basename(str(params['executable'])))
+            elif directive == 'execute' and params.get('file'):
+                yield get_token('exe', os.path.basename(str(params['file'])))
+
+
+def get_installer_tokens(content, runner_slug):
+    tokens = set()
+    if runner_slug:
+        tokens.add(get_token('runner', runner_slug))
+    try:
+        script = yaml.load(content, Loader=yaml.SafeLoader)
+    except yaml.YAMLError:
+        script = None
+    if not isinstance(script, dict):
+        return sorted(tokens)
+
+    for section in ('wine', 'system'):
+        options = script.get(section)
+        if not isinstance(options, dict):
+            continue
+        for option, value in options.items():
+            if value is True:
+                tokens.add(get_token('option', option))
+        if section == 'wine' and options.get('version'):
+            tokens.add(get_token('wine', options['version']))
+
+    for url in iter_file_urls(script.get('files')):
+        tokens.add(get_token('url', url))
+        if urlparse(url).hostname:
+            tokens.add(get_token('host', urlparse(url).hostname))
+
+    tokens.update(iter_step_tokens(script.get('installer')))
+
+    game = script.get('game')
+    if isinstance(game, dict) and isinstance(game.get('exe'), str):
+        tokens.add(get_token('exe', os.path.basename(game['exe'])))
+    return sorted(tokens)
+
+
+def index_installers(apps, _schema_editor):
+    Installer = apps.get_model('games', 'Installer')
+    Runner = apps.get_model('runners', 'Runner')
+    runner_slugs = dict(Runner.objects.values_list('id', 'slug'))
+    installers = []
+    for installer in (
+        Installer.objects.filter(search_tokens=[])
+        .only('id', 'runner_id', 'content')
+        .iterator(chunk_size=1000)
+    ):
+        installer.search_tokens = get_installer_tokens(
+            installer.content, runner_slugs.get(installer.runner_id, '')
+        )
+        installers.append(installer)
+        if len(installers) >= 1000:
+            Installer.objects.bulk_update(installers, ['search_tokens'])
+            installers = []
+    Installer.objects.bulk_update(installers, ['search_tokens'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('games', '0093_library_tombstones_retention'),
+        ('runners', '0017_runtime_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_installers, migrations.RunPython.noop),
+    ]
@@ -1,32 +1,42 @@
 """Models for main lutris app"""
 
 # pylint: disable=no-member,too-few-public-methods,too-many-lines
+import copy
 import datetime
 import json
 import logging
 import os
 import random
 import re
-import shutil
+import time
+from collections import Counter, defaultdict
 from itertools import chain
 
 import six
 import yaml
 from bitfield import BitField
 from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.base import ContentFile
-from django.db import IntegrityError, models
-from django.db.models import Count, Q
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Upper
 from django.db.models.query import QuerySet
 from django.urls import reverse
-from sorl.thumbnail import get_thumbnail
+from django.utils import timezone
 
 from common.cloudflare import purge_urls
+from common.images import ImageJob, run_image_job
 from common.util import dump_yaml, get_auto_increment_slug, load_yaml, slugify
 from emails import messages
 from emails.messages import notify_rejected_installer
+from games.cache import get_installer_slug_targets, set_installer_slug_targets
 from games.util import gog, steam
+from games.util.installer_tokens import get_installer_tokens, get_search_tokens
 from platforms.models import Platform
 from providers.models import ProviderGame
 from runners.models import Runner
@@ -36,6 +46,17 @@ DEFAULT_INSTALLER = {
     "files": [{"file_id": "http://location"}, {"unredistribuable_file": "N/A"}],
     "installer": [{"move": {"src": "file_id", "dst": "$GAMEDIR"}}],
 }
+# Stores the Lutris client can install games from, with their display names
+AUTO_INSTALLER_PROVIDERS = {
+    "gog": "GOG",
+    "steam": "Steam",
+    "humblebundle": "Humble Bundle",
+}
+# Kinds of objects an installer slug can designate
+INSTALLER_SLUG = "installer"
+GAME_SLUG = "game"
+ALIAS_SLUG = "alias"
+AUTO_INSTALLER_SLUG = "auto"
 
 
 def clean_string(string):
@@ -187,6 +208,12 @@ class Game(models.Model):
 
     ICON_PATH = os.path.join(settings.MEDIA_ROOT, "game-icons/128")
     BANNER_PATH = os.path.join(settings.MEDIA_ROOT, "game-banners/184")
+    # Media variants rendered by games.media, with their source field, size and format
+    RENDERED_MEDIA = {
+        "banner": ("title_logo", settings.BANNER_SIZE, "JPEG"),
+        "icon": ("icon", settings.ICON_SIZE, "PNG"),
+        "coverart": ("coverart", settings.COVERART_SIZE, "JPEG"),
+    }
 
     name = models.CharField(max_length=255)
     slug = models.SlugField(max_length=255, unique=True, null=True, blank=True)
@@ -222,6 +249,10 @@ class Game(models.Model):
     flags = BitField(flags=GAME_FLAGS)
     popularity = models.IntegerField(default=0)
     provider_games = models.ManyToManyField(ProviderGame, related_name="games", blank=True)
+    # Banner, icon and coverart URLs, kept up to date on save for fast serialization
+    media_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # Source file and storage path of each pre-rendered media variant
+    rendered_media = models.JSONField(default=dict, blank=True, editable=False)
 
     # Indicates whether this data row is a changeset for another data row.
     # If so, this attribute is not NULL and the value is the ID of the
@@ -296,6 +327,9 @@ class Game(models.Model):
     @property
     def banner_url(self):
         """Return URL for the game banner"""
+        rendered_url = self.get_rendered_media_url("banner")
+        if rendered_url:
+            return rendered_url
         if self.title_logo:
             # Hardcoded domain isn't ideal but we have to find another solution for storing
             # and referencing banners and icons anyway so this will do for the time being.
@@ -309,6 +343,9 @@ class Game(models.Model):
     @property
     def icon_url(self):
         """Return URL for the game icon"""
+        rendered_url = self.get_rendered_media_url("icon")
+        if rendered_url:
+            return rendered_url
         if self.icon:
             if self.change_for:
                 slug = self.change_for.slug
@@ -317,6 +354,40 @@ class Game(models.Model):
             return settings.ROOT_URL + reverse("get_icon", kwargs={"slug": slug})
         return ""
 
+    def get_rendered_media_url(self, variant):
+        """Return the URL of a pre-rendered media variant, empty if it isn't rendered
+        from the current source file yet
+        """
+        field_name, _size, _format = self.RENDERED_MEDIA[variant]
+        source = getattr(self, field_name)
+        rendered = self.rendered_media.get(variant)
+        if not source or not rendered or rendered["source"] != source.name:
+            return ""
+        url = default_storage.url(rendered["path"])
+        if url.startswith("//"):
+            return "https:" + url
+        if url.startswith("/"):
+            return settings.ROOT_URL + url
+        return url
+
+    def has_unrendered_media(self):
+        """Return whether some media of the game has no pre-rendered variant yet"""
+        return any(
+            getattr(self, field_name) and not self.get_rendered_media_url(variant)
+            for variant, (field_name, _size, _format) in self.RENDERED_MEDIA.items()
+        )
+
+    def get_media_urls(self):
+        """Return the URLs of the game media, as stored in media_urls"""
+        return {
+            "banner": self.banner_url,
+            "icon": self.icon_url,
+            "coverart": (
+                self.get_rendered_media_url("coverart")
+                or (self.coverart.url if self.coverart else None)
+            ),
+        }
+
     @property
     def flag_labels(self):
         """Return labels of active flags, suitable for display"""
@@ -431,7 +502,7 @@ class Game(models.Model):
             self.platforms.add(platform)
 
         # Move user libraries
-        LibraryGame.objects.filter(game=other_game).update(game=self)
+        GameLibrary.move_games(other_game, self)
 
         # Move provider games
         for provider_game in other_game.provider_games.all():
@@ -524,11 +595,10 @@ class Game(models.Model):
             else:
                 return
         try:
-            thumbnail = get_thumbnail(self.icon, settings.ICON_SIZE, crop="center", format="PNG")
-        except AttributeError as ex:
+            run_image_job(ImageJob(self.icon.path, settings.ICON_SIZE, "PNG", dest_file))
+        except (OSError, ValueError) as ex:
             LOGGER.error("Icon failed for %s: %s", self, ex)
             return
-        shutil.copy(os.path.join(settings.MEDIA_ROOT, thumbnail.name), dest_file)
         if force:
             purge_urls(["https://%s/games/icon/%s.png" % (settings.DOMAIN_NAME, self.slug)])
 
@@ -541,8 +611,8 @@ class Game(models.Model):
             else:
                 return
         try:
-            thumbnail = get_thumbnail(self.title_logo, settings.BANNER_SIZE, crop="center")
-        except AttributeError as ex:
+            run_image_job(ImageJob(self.title_logo.path, settings.BANNER_SIZE, "JPEG", dest_file))
+        except (OSError, ValueError) as ex:
             LOGGER.error(
                 "Could not write banner to %s from %s for %s: %s",
                 dest_file,
@@ -551,7 +621,6 @@ class Game(models.Model):
                 ex,
             )
             return
-        shutil.copy(os.path.join(settings.MEDIA_ROOT, thumbnail.name), dest_file)
         if force:
             purge_urls(["https://%s/games/banner/%s.jpg" % (settings.DOMAIN_NAME, self.slug)])
 
@@ -589,44 +658,11 @@ class Game(models.Model):
         return True
 
     def get_default_installers(self):
-        """Return all auto-installers for this game's platforms"""
-        auto_installers = []
-        provider_with_autoinstallers = ["gog", "steam", "humblebundle"]
-        provider_names = {
-            "gog": "GOG",
-            "steam": "Steam",
-            "humblebundle": "Humble Bundle",
-        }
-        for platform in self.platforms.all():
-            if platform.default_installer:
-                installer = platform.default_installer
-                installer["name"] = self.name
-                installer["game_slug"] = self.slug
-                installer["version"] = platform.name
-                installer["slug"] = "-".join((self.slug[:30], platform.slug[:20]))
-                installer["platform"] = platform.slug
-                installer["description"] = ""
-                installer["published"] = True
-                installer["auto"] = True
-                auto_installers.append(installer)
-        for provider_game in self.provider_games.filter(
-            provider__name__in=provider_with_autoinstallers
-        ):
-            installer = {
-                "name": self.name,
-                "game_slug": self.slug,
-                "runner": "auto",
-                "version": provider_names[provider_game.provider.name] + "(Auto)",
-                "slug": "%s:%s" % (provider_game.provider.name, provider_game.internal_id),
-                "description": (
-                    "Make sure you have connected your %s account in Lutris and that you own this game."
-                    % provider_names[provider_game.provider.name]
-                ),
-                "published": True,
-                "auto": True,
-            }
-            auto_installers.append(installer)
-        return auto_installers
+        """Return all auto-installers for this game's platforms and stores"""
+        auto_installer_slugs = self.auto_installer_slugs.select_related(
+            "platform", "provider_game__provider"
+        ).order_by(F("platform__name").asc(nulls_last=True), "id")
+        return [auto_installer.get_installer() for auto_installer in auto_installer_slugs]
 
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         # Only create slug etc. if this is a game submission, no change submission
@@ -635,13 +671,27 @@ class Game(models.Model):
                 self.slug = slugify(self.name)[:50]
             if not self.slug:
                 raise ValueError("Can't generate a slug for name %s" % self.name)
-            self.set_logo_from_steam()
+            if update_fields is None or "title_logo" in update_fields:
+                self.set_logo_from_steam()
+        # Files assigned but not saved yet only get their final name once saved
+        uncommitted_media = any(
+            media and not media._committed  # pylint: disable=protected-access
+            for media in (self.icon, self.title_logo, self.coverart)
+        )
+        self.media_urls = self.get_media_urls()
+        if update_fields is not None:
+            update_fields = {*update_fields, "media_urls"}
         super().save(
             force_insert=force_insert,
             force_update=force_update,
             using=using,
             update_fields=update_fields,
         )
+        if uncommitted_media:
+            media_urls = self.get_media_urls()
+            if media_urls != self.media_urls:
+                self.media_urls = media_urls
+                Game.objects.filter(pk=self.pk).update(media_urls=media_urls)
 
 
 class GameAlias(models.Model):
@@ -652,6 +702,87 @@ class GameAlias(models.Model):
     name = models.CharField(max_length=255)
 
 
+class GameSearchDocument(models.Model):
+    """Text a game can be found by, written by games.search.update_search_documents"""
+
+    game = models.OneToOneField(
+        Game, primary_key=True, on_delete=models.CASCADE, related_name="search_document"
+    )
+    names = models.TextField()
+    companies = models.TextField(blank=True)
+    providers = models.TextField(blank=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("names", weight="A", config="simple")
+            + SearchVector("companies", weight="B", config="simple")
+            + SearchVector("providers", weight="C", config="simple")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        """Model configuration"""
+
+        indexes = [
+            GinIndex(fields=["search_vector"], name="games_search_vector_idx"),
+            GinIndex(OpClass(Upper("names"), name="gin_trgm_ops"), name="games_search_names_idx"),
+        ]
+
+    def __str__(self):
+        return self.names
+
+
+class AutoInstallerSlug(models.Model):
+    """Slug of an auto-installer of a game, written by games.autoinstallers.
+
+    Auto-installers come either from the default installer of one of the game's
+    platforms ('<game>-<platform>' slugs) or from a store the game is sold on
+    ('<provider>:<id>' slugs).
+    """
+
+    slug = models.CharField(max_length=255, db_index=True)
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name="auto_installer_slugs")
+    platform = models.ForeignKey(Platform, on_delete=models.CASCADE, null=True)
+    provider_game = models.ForeignKey(ProviderGame, on_delete=models.CASCADE, null=True)
+
+    def __str__(self):
+        return self.slug
+
+    def get_installer(self):
+        """Return the auto-installer script with its metadata"""
+        if self.platform_id:
+            # Copied, the default installer is shared by every game of the platform
+            installer = copy.deepcopy(self.platform.default_installer)
+            installer.update(
+                {
+                    "version": self.platform.name,
+                    "platform": self.platform.slug,
+                    "description": "",
+                }
+            )
+        else:
+            provider_name = AUTO_INSTALLER_PROVIDERS[self.provider_game.provider.name]
+            installer = {
+                "runner": "auto",
+                "version": provider_name + "(Auto)",
+                "description": (
+                    "Make sure you have connected your %s account in Lutris and that you own this game."
+                    % provider_name
+                ),
+            }
+        installer.update(
+            {
+                "name": self.game.name,
+                "game_slug": self.game.slug,
+                "slug": self.slug,
+                "published": True,
+                "auto": True,
+            }
+        )
+        return installer
+
+
 class ScreenshotManager(models.Manager):
     """Model manager for game screenshots"""
 
@@ -721,6 +852,7 @@ class InstallerManager(models.Manager):
             created_to (timestamp): installer creation period end
             updated_from (timestamp): installer modification period start
             updated_to (timestamp): installer modification period end
+            uses (str): script search tokens, installers using any of them are returned
         """
         filter_ = {}
         for f in {"published", "draft"}:
@@ -734,77 +866,105 @@ class InstallerManager(models.Manager):
             filter_["updated_at__gte"] = filter["updated_from"]
         if "updated_to" in filter:
             filter_["updated_at__lt"] = filter["updated_to"]
+        if "uses" in filter:
+            filter_["search_tokens__overlap"] = get_search_tokens(filter["uses"])
         return self.get_queryset().filter(**filter_)
 
-    def _fuzzy_search(self, slug, return_models=False):
-        try:
-            # Try returning installers by installer slug
-            installer = self.get_queryset().get(slug=slug)
-            return [installer]
-        except ObjectDoesNotExist:
-            # Try getting installers by game name
-            try:
-                game = Game.objects.get(slug=slug)
-            except ObjectDoesNotExist:
-                game = None
-
-            if not game:
-                try:
-                    game = Game.objects.get(aliases__slug=slug)
-                except ObjectDoesNotExist:
-                    game = None
-            if game:
-                installers = self.get_queryset().filter(game=game, published=True)
-
-                auto_installers = []
-                for platform in game.platforms.exclude(default_installer__isnull=True):
-                    auto_installers.append(AutoInstaller(game, platform))
-
-                if installers or auto_installers:
-                    return list(chain(installers, auto_installers))
-
-            # Try auto installers
-            for platform in Platform.objects.exclude(default_installer__isnull=True):
-                suffix = "-" + platform.slug
-                if slug.endswith(suffix):
-                    game_slug = slug[: -len(suffix)]
-                    try:
-                        games = [Game.objects.get(slug=game_slug)]
-                    except Game.DoesNotExist:
-                        if len(slug) > 40:
-                            games = Game.objects.filter(slug__startswith=game_slug)
-                        else:
-                            games = []
-
-                    for game in games:
-                        auto_installer = self.get_auto_installer(
-                            slug, game, platform, return_models=return_models
-                        )
-                        if auto_installer:
-                            return auto_installer
-
-            # A bit hackish, return_models is used for filter and not with get
-            if return_models:
-                return self.none()
-            raise
-
-    @staticmethod
-    def get_auto_installer(slug, game, platform, return_models=False):
-        """Doesn't make a lot of sense, this is game specific and
-        should probably not be here.
+    def resolve_slug(self, slug, use_cache=True):
+        """Return what an installer slug designates, as (kind, game_id, target_id) tuples
+        by order of precedence: an installer, a game, a game alias or an auto-installer.
+        All of them are looked up at once on their slug indexes.
         """
+        if use_cache:
+            targets = get_installer_slug_targets(slug)
+            if targets is not None:
+                return targets
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT * FROM (
+                    SELECT 0 AS precedence, %s, game_id, id
+                    FROM {Installer._meta.db_table} WHERE slug = %s
+                    UNION ALL
+                    SELECT 1, %s, id, id FROM {Game._meta.db_table} WHERE slug = %s
+                    UNION ALL
+                    (SELECT 2, %s, game_id, id FROM {GameAlias._meta.db_table}
+                     WHERE slug = %s ORDER BY id LIMIT 1)
+                    UNION ALL
+                    (SELECT 3, %s, game_id, id FROM {AutoInstallerSlug._meta.db_table}
+                     WHERE slug = %s ORDER BY game_id LIMIT 1)
+                ) targets
+                ORDER BY precedence
+                """,
+                [
+                    INSTALLER_SLUG,
+                    slug,
+                    GAME_SLUG,
+                    slug,
+                    ALIAS_SLUG,
+                    slug,
+                    AUTO_INSTALLER_SLUG,
+                    slug,
+                ],
+            )
+            targets = [tuple(row[1:]) for row in cursor.fetchall()]
+        set_installer_slug_targets(slug, targets)
+        return targets
+
+    def _get_target_installers(self, slug, kind, game_id, target_id, return_models):
+        """Return the installers designated by a slug target, None if the target is stale"""
+        if kind == INSTALLER_SLUG:
+            installer = (
+                self.get_queryset()
+                .select_related("game", "runner", "user")
+                .filter(pk=target_id, slug=slug)
+                .first()
+            )
+            return [installer] if installer else None
+        if kind in (GAME_SLUG, ALIAS_SLUG):
+            if kind == GAME_SLUG:
+                game = Game.objects.filter(pk=game_id, slug=slug).first()
+            else:
+                game = Game.objects.filter(
+                    pk=game_id, aliases__pk=target_id, aliases__slug=slug
+                ).first()
+            if not game:
+                return None
+            installers = self.get_queryset().filter(game=game, published=True)
+            auto_installers = [
+                AutoInstaller(game, auto_installer.platform)
+                for auto_installer in game.auto_installer_slugs.filter(
+                    platform__isnull=False
+                ).select_related("platform")
+            ]
+            return list(chain(installers.select_related("game", "runner", "user"), auto_installers))
+        auto_installer = (
+            AutoInstallerSlug.objects.filter(pk=target_id, slug=slug)
+            .select_related("game", "platform", "provider_game__provider")
+            .first()
+        )
+        if not auto_installer:
+            return None
+        if not return_models:
+            return [auto_installer.get_installer()]
+        # Store auto-installers only exist as scripts
+        if auto_installer.platform_id:
+            return [AutoInstaller(auto_installer.game, auto_installer.platform)]
+        return []
+
+    def _fuzzy_search(self, slug, return_models=False, use_cache=True):
+        for kind, game_id, target_id in self.resolve_slug(slug, use_cache=use_cache):
+            installers = self._get_target_installers(slug, kind, game_id, target_id, return_models)
+            if installers is None and use_cache:
+                # Something was renamed or deleted since the slug got resolved
+                return self._fuzzy_search(slug, return_models, use_cache=False)
+            if installers:
+                return installers
+
+        # A bit hackish, return_models is used for filter and not with get
         if return_models:
-            try:
-                auto_installer = AutoInstaller(game, platform)
-                if auto_installer.slug == slug:
-                    return [auto_installer]
-            except ObjectDoesNotExist:
-                pass
-        else:
-            auto_installers = game.get_default_installers()
-            for auto_installer in auto_installers:
-                if auto_installer["slug"] == slug:
-                    return [auto_installer]
+            return self.none()
+        raise Installer.DoesNotExist("No installer matches %s" % slug)
 
     def fuzzy_get(self, slug):
         """Return either the installer that matches exactly 'slug' or the
@@ -829,11 +989,11 @@ class InstallerManager(models.Manager):
                 installer_data = installers
             else:
                 installer_data = [installer.as_dict() for installer in installers]
-        try:
-            game = Game.objects.get(slug=slug)
+        game_ids = [
+            game_id for kind, game_id, _target_id in self.resolve_slug(slug) if kind == GAME_SLUG
+        ]
+        for game in Game.objects.filter(pk__in=game_ids):
             installer_data += game.get_default_installers()
-        except ObjectDoesNotExist:
-            pass
         if not installer_data:
             raise Installer.DoesNotExist
         return json.dumps(installer_data, indent=2)
@@ -964,6 +1124,10 @@ class Installer(BaseInstaller):
     notes = models.TextField(blank=True)
     credits = models.TextField(blank=True)
     content = models.TextField()
+    # Tokens extracted from the script by games.util.installer_tokens, updated on save
+    search_tokens = ArrayField(
+        models.CharField(max_length=255), default=list, blank=True, editable=False
+    )
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     updated_at = models.DateTimeField(auto_now=True)
     published = models.BooleanField(default=False)
@@ -1005,6 +1169,7 @@ class Installer(BaseInstaller):
         """Model configuration"""
 
         ordering = ("version",)
+        indexes = [GinIndex(fields=["search_tokens"], name="games_installer_tokens_idx")]
 
     def __str__(self):
         return self.slug
@@ -1035,6 +1200,9 @@ class Installer(BaseInstaller):
 
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         self.slug = self.build_slug(self.version)
+        self.search_tokens = get_installer_tokens(self.content, self.runner.slug)
+        if update_fields is not None:
+            update_fields = {*update_fields, "search_tokens"}
         return super(Installer, self).save(
             force_insert=force_insert,
             force_update=force_update,
@@ -1190,6 +1358,10 @@ class GameLibrary(models.Model):
     """Model to store user libraries"""
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Incremented on every change to the library, clients use it as a sync cursor
+    revision = models.PositiveBigIntegerField(default=0)
+    # Revision of the last tombstone pruned, clients with an older cursor missed it
+    pruned_revision = models.PositiveBigIntegerField(default=0)
 
     class Meta:
         """Model configuration"""
@@ -1199,6 +1371,84 @@ class GameLibrary(models.Model):
     def __str__(self):
         return "%s's library" % self.user.username
 
+    def next_revision(self):
+        """Reserve the revision for a change to the library.
+        The library row stays locked until the end of the transaction, so
+        revisions become visible to readers in order.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {GameLibrary._meta.db_table} SET revision = revision + 1 "
+                "WHERE id = %s RETURNING revision",
+                [self.pk],
+            )
+            self.revision = cursor.fetchone()[0]
+        return self.revision
+
+    def delete_games(self, library_games):
+        """Delete games from the library, leaving tombstones for clients to sync"""
+        library_games = list(library_games)
+        if not library_games:
+            return 0
+        with transaction.atomic():
+            revision = self.next_revision()
+            LibraryGameTombstone.objects.bulk_create(
+                [
+                    LibraryGameTombstone.from_library_game(library_game, revision)
+                    for library_game in library_games
+                ]
+            )
+            deleted, _details = LibraryGame.objects.filter(
+                pk__in=[library_game.pk for library_game in library_games]
+            ).delete()
+            GamePopularity.add_library_games(
+                [library_game.game_id for library_game in library_games], -1
+            )
+        return deleted
+
+    @classmethod
+    def move_games(cls, old_game, new_game):
+        """Point the library games of a game at another one in every library, used when
+        merging games. Entries that were only identified by the old game are replaced by
+        a tombstone. Returns the number of library games moved.
+        """
+        library_games = LibraryGame.objects.filter(game=old_game)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE {cls._meta.db_table} SET revision = revision + 1
+                    WHERE id IN (
+                        SELECT gamelibrary_id FROM {LibraryGame._meta.db_table} WHERE game_id = %s
+                    )
+                    RETURNING id, revision
+                    """,
+                    [old_game.pk],
+                )
+                revisions = dict(cursor.fetchall())
+            if not revisions:
+                return 0
+            LibraryGameTombstone.objects.bulk_create(
+                [
+                    LibraryGameTombstone.from_library_game(
+                        library_game, revisions[library_game.gamelibrary_id]
+                    )
+                    for library_game in library_games.filter(
+                        Q(slug__isnull=True) | Q(slug="")
+                    ).select_related("game")
+                ]
+            )
+            moved = library_games.update(
+                game=new_game,
+                revision=Subquery(
+                    cls.objects.filter(pk=OuterRef("gamelibrary_id")).values("revision")
+                ),
+                updated_at=timezone.now(),
+            )
+            GamePopularity.add_library_games([old_game.pk], -moved)
+            GamePopularity.add_library_games([new_game.pk], moved)
+        return moved
+
 
 class LibraryCategory(models.Model):
     """Model to represent a user defined category"""
@@ -1221,6 +1471,7 @@ class LibraryGame(models.Model):
     service_id = models.CharField(max_length=255, null=True)
     lastplayed = models.IntegerField(null=True, default=0)
     updated_at = models.DateTimeField(auto_now=True)
+    revision = models.PositiveBigIntegerField(default=0, db_index=True)
     categories = models.ManyToManyField(LibraryCategory, blank=True)
 
     def __str__(self):
@@ -1243,6 +1494,21 @@ class LibraryGame(models.Model):
     def get_category_names(self):
         return [c.name for c in self.categories.all()]
 
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        with transaction.atomic():
+            adding = self._state.adding
+            self.revision = self.gamelibrary.next_revision()
+            if update_fields is not None:
+                update_fields = {*update_fields, "revision"}
+            super().save(
+                force_insert=force_insert,
+                force_update=force_update,
+                using=using,
+                update_fields=update_fields,
+            )
+            if adding:
+                GamePopularity.add_library_games([self.game_id])
+
     @property
     def coverart(self):
         if self.game and self.game.coverart:
@@ -1264,6 +1530,154 @@ class LibraryGame(models.Model):
         ordering = ("slug",)
 
 
+class LibraryGameTombstone(models.Model):
+    """Record of a game removed from a library, until clients have synced the removal.
+
+    Tombstones are kept for RETENTION, clients that haven't synced for longer get the
+    whole library again.
+    """
+
+    RETENTION = datetime.timedelta(days=90)
+
+    gamelibrary = models.ForeignKey(
+        GameLibrary, on_delete=models.CASCADE, related_name="tombstones"
+    )
+    slug = models.CharField(max_length=256, null=True)
+    runner = models.CharField(max_length=64, null=True)
+    platform = models.CharField(max_length=255, null=True)
+    service = models.CharField(max_length=64, null=True)
+    revision = models.PositiveBigIntegerField(db_index=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.slug} (deleted at revision {self.revision})"
+
+    @classmethod
+    def from_library_game(cls, library_game, revision):
+        """Return an unsaved tombstone for a library game"""
+        return cls(
+            gamelibrary_id=library_game.gamelibrary_id,
+            slug=library_game.get_slug(),
+            runner=library_game.runner,
+            platform=library_game.platform,
+            service=library_game.service,
+            revision=revision,
+        )
+
+    @classmethod
+    def prune(cls):
+        """Delete the tombstones older than the retention window, recording the last pruned
+        revision of each library. Returns the number of tombstones deleted.
+        """
+        expired = cls.objects.filter(deleted_at__lt=timezone.now() - cls.RETENTION)
+        with transaction.atomic():
+            pruned_revisions = dict(
+                expired.order_by()
+                .values("gamelibrary_id")
+                .annotate(pruned_revision=models.Max("revision"))
+                .values_list("gamelibrary_id", "pruned_revision")
+            )
+            libraries = GameLibrary.objects.only("id", "pruned_revision").in_bulk(
+                list(pruned_revisions)
+            )
+            for library_id, library in libraries.items():
+                library.pruned_revision = max(library.pruned_revision, pruned_revisions[library_id])
+            GameLibrary.objects.bulk_update(libraries.values(), ["pruned_revision"])
+            deleted, _details = expired.delete()
+        return deleted
+
+
+class GamePopularity(models.Model):
+    """Materialized library counters of a game, used to sort games by popularity.
+
+    library_count is kept up to date as games are added to and removed from
+    libraries. Both counters are recomputed from scratch by the
+    populate_popularity task, which also corrects any drift.
+    """
+
+    game = models.OneToOneField(
+        Game, primary_key=True, on_delete=models.CASCADE, related_name="popularity_counter"
+    )
+    library_count = models.IntegerField(default=0)
+    recent_play_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """Model configuration"""
+
+        verbose_name_plural = "game popularity"
+
+    def __str__(self):
+        return f"{self.game_id}: {self.library_count}"
+
+    @classmethod
+    def add_library_games(cls, game_ids, delta=1):
+        """Add delta to the library count of each game ID, which may be repeated.
+        The counters are updated once the current transaction is committed.
+        """
+        increments = defaultdict(list)
+        for game_id, count in Counter(game_id for game_id in game_ids if game_id).items():
+            increments[count * delta].append(game_id)
+        if not increments:
+            return
+
+        def update_counters():
+            cls.objects.bulk_create(
+                [
+                    cls(game_id=game_id)
+                    for increment, increment_game_ids in increments.items()
+                    if increment > 0
+                    for game_id in increment_game_ids
+                ],
+                ignore_conflicts=True,
+            )
+            for increment, increment_game_ids in increments.items():
+                cls.objects.filter(game_id__in=increment_game_ids).update(
+                    library_count=F("library_count") + increment, updated_at=timezone.now()
+                )
+
+        transaction.on_commit(update_counters)
+
+    @classmethod
+    def recompute(cls, recent_days=30):
+        """Recompute the counters of every game with set based queries and copy
+        the library counts to Game.popularity. Returns the number of counters changed.
+        """
+        recent_timestamp = int(time.time()) - recent_days * 24 * 3600
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {cls._meta.db_table}
+                    (game_id, library_count, recent_play_count, updated_at)
+                SELECT game.id,
+                    COUNT(library_game.id),
+                    COUNT(library_game.id) FILTER (WHERE library_game.lastplayed >= %s),
+                    NOW()
+                FROM {Game._meta.db_table} game
+                LEFT JOIN {LibraryGame._meta.db_table} library_game
+                    ON library_game.game_id = game.id
+                GROUP BY game.id
+                ON CONFLICT (game_id) DO UPDATE SET
+                    library_count = EXCLUDED.library_count,
+                    recent_play_count = EXCLUDED.recent_play_count,
+                    updated_at = EXCLUDED.updated_at
+                WHERE {cls._meta.db_table}.library_count <> EXCLUDED.library_count
+                    OR {cls._meta.db_table}.recent_play_count <> EXCLUDED.recent_play_count
+                """,
+                [recent_timestamp],
+            )
+            changed = cursor.rowcount
+            cursor.execute(
+                f"""
+                UPDATE {Game._meta.db_table} game
+                SET popularity = counter.library_count
+                FROM {cls._meta.db_table} counter
+                WHERE counter.game_id = game.id AND game.popularity <> counter.library_count
+                """
+            )
+        return changed
+
+
 class StoreLibrary(models.Model):
     """Model to keep track of a user's library for a given store"""
 
@@ -1385,11 +1799,13 @@ class AutoInstaller(BaseInstaller):  # pylint: disable=too-many-instance-attribu
     updated_at = None
 
     def __init__(self, game, platform):
+        """Build the auto-installer of a game for one of its platforms,
+        as listed in the game's auto_installer_slugs
+        """
         super(AutoInstaller, self).__init__()
         self.game = game
-        if platform not in game.platforms.all():
-            raise ObjectDoesNotExist
-        self.script = platform.default_installer
+        # Copied, the default installer is shared by every game of the platform
+        self.script = copy.deepcopy(platform.default_installer)
         self.content = json.dumps(self.script)
         self.name = game.name
         self.version = platform.name
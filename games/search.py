@@ -0,0 +1,115 @@
+"""Full text and trigram search of games
+
+Every game has a search document holding the text it can be found by: its
+name, slug and aliases, its developer and publisher and the names it has on
+providers. The document table is indexed with GIN indexes, a weighted tsvector
+for word matches and a trigram index on names for substrings and typos, so
+searching doesn't scan the games and alias tables.
+"""
+
+# pylint: disable=no-member
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, Q, Value
+from django.db.models.functions import Upper
+from rest_framework import filters
+
+from games.models import Company, Game, GameAlias, GameSearchDocument
+from providers.models import ProviderGame
+
+SEARCH_BATCH_SIZE = 5000
+
+
+def _get_update_sql(where_clause):
+    """Return the query writing the search documents of the games matched by where_clause"""
+    provider_links = Game.provider_games.through._meta.db_table
+    return f"""
+        INSERT INTO {GameSearchDocument._meta.db_table} (game_id, names, companies, providers)
+        SELECT game.id,
+            concat_ws(
+                ' ', game.name, game.slug,
+                (SELECT string_agg(alias.name, ' ') FROM {GameAlias._meta.db_table} alias
+                 WHERE alias.game_id = game.id)
+            ),
+            concat_ws(' ', developer.name, publisher.name),
+            COALESCE(
+                (SELECT string_agg(DISTINCT provider_game.name, ' ')
+                 FROM {provider_links} link
+                 JOIN {ProviderGame._meta.db_table} provider_game
+                    ON provider_game.id = link.providergame_id
+                 WHERE link.game_id = game.id),
+                ''
+            )
+        FROM {Game._meta.db_table} game
+        LEFT JOIN {Company._meta.db_table} developer ON developer.id = game.developer_id
+        LEFT JOIN {Company._meta.db_table} publisher ON publisher.id = game.publisher_id
+        WHERE {where_clause}
+        ON CONFLICT (game_id) DO UPDATE SET
+            names = EXCLUDED.names,
+            companies = EXCLUDED.companies,
+            providers = EXCLUDED.providers
+        WHERE ({GameSearchDocument._meta.db_table}.names,
+               {GameSearchDocument._meta.db_table}.companies,
+               {GameSearchDocument._meta.db_table}.providers)
+            IS DISTINCT FROM (EXCLUDED.names, EXCLUDED.companies, EXCLUDED.providers)
+    """
+
+
+def update_search_documents(game_ids):
+    """Write the search documents of some games, returns the number of documents changed"""
+    game_ids = list({game_id for game_id in game_ids if game_id})
+    changed = 0
+    with connection.cursor() as cursor:
+        for index in range(0, len(game_ids), SEARCH_BATCH_SIZE):
+            cursor.execute(
+                _get_update_sql("game.id = ANY(%s)"),
+                [game_ids[index : index + SEARCH_BATCH_SIZE]],
+            )
+            changed += cursor.rowcount
+    return changed
+
+
+def rebuild_search_documents():
+    """Write the search documents of all games, returns the number of documents changed"""
+    with connection.cursor() as cursor:
+        cursor.execute(_get_update_sql("TRUE"))
+        return cursor.rowcount
+
+
+def get_search_query(text):
+    """Return a full text query matching the words of text, the last one as a prefix"""
+    words = re.findall(r"\w+", text)
+    if not words:
+        return None
+    return SearchQuery(
+        " & ".join(words[:-1] + [words[-1] + ":*"]), search_type="raw", config="simple"
+    )
+
+
+def search_games(queryset, text):
+    """Filter a game queryset with a search, annotating the rank of each game as search_rank"""
+    text = text.strip()
+    # Both lookups use the trigram index on UPPER(names)
+    queryset = queryset.alias(search_names=Upper("search_document__names"))
+    matches = Q(search_names__contains=text.upper()) | Q(search_names__trigram_word_similar=text)
+    # Games named like the search come first
+    rank = TrigramSimilarity("name", text)
+    search_query = get_search_query(text)
+    if search_query is not None:
+        matches |= Q(search_document__search_vector=search_query)
+        rank = rank + SearchRank(
+            F("search_document__search_vector"), search_query, normalization=Value(2)
+        )
+    return queryset.filter(matches).annotate(search_rank=rank)
+
+
+class GameSearchFilter(filters.SearchFilter):
+    """Search filter for the game API, ranking the results by relevance"""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, "")
+        if not text.strip():
+            return queryset
+        return search_games(queryset, text).order_by("-search_rank", "name")
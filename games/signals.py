@@ -0,0 +1,204 @@
+"""Games related signals"""
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from games import stats, tasks
+from games.autoinstallers import (
+    delete_provider_game_auto_installers,
+    update_auto_installers,
+    update_platform_auto_installers,
+)
+from games.cache import bump_game_versions, bump_global_version, forget_installer_slugs
+from games.models import (
+    Company,
+    Game,
+    GameAlias,
+    GameLink,
+    GameSubmission,
+    Genre,
+    Installer,
+    InstallerDraft,
+    Screenshot,
+    ShaderCache,
+)
+from games.search import update_search_documents
+from platforms.models import Platform
+from providers.models import ProviderGame
+
+
+@receiver(post_save, sender=Game)
+def update_game_search_document(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Keep the search document of a game in sync with its name and companies"""
+    update_search_documents([instance.pk])
+
+
+@receiver(post_save, sender=GameAlias)
+@receiver(post_delete, sender=GameAlias)
+def update_alias_search_document(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Update the search document of a game when its aliases change"""
+    update_search_documents([instance.game_id])
+
+
+@receiver(post_save, sender=Company)
+def update_company_search_documents(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Update the search documents and cached pages of the games of a renamed company"""
+    if created:
+        return
+    game_ids = list(
+        Game.objects.filter(Q(developer=instance) | Q(publisher=instance)).values_list(
+            "id", flat=True
+        )
+    )
+    update_search_documents(game_ids)
+    bump_game_versions(game_ids)
+
+
+@receiver(m2m_changed, sender=Game.provider_games.through)
+def update_provider_links_search_documents(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Update the search documents of games linked to or unlinked from provider games"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        update_search_documents([instance.pk])
+    elif pk_set:
+        update_search_documents(pk_set)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def bump_game_version(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached pages of a changed game"""
+    bump_game_versions([instance.pk])
+
+
+@receiver(post_save, sender=GameAlias)
+@receiver(post_delete, sender=GameAlias)
+@receiver(post_save, sender=GameLink)
+@receiver(post_delete, sender=GameLink)
+@receiver(post_save, sender=Installer)
+@receiver(post_delete, sender=Installer)
+@receiver(post_save, sender=Screenshot)
+@receiver(post_delete, sender=Screenshot)
+@receiver(post_save, sender=ShaderCache)
+@receiver(post_delete, sender=ShaderCache)
+def bump_related_game_version(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached pages of a game when something shown on them changes"""
+    bump_game_versions([instance.game_id])
+
+
+@receiver(post_save, sender=ProviderGame)
+def bump_provider_game_versions(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached pages of the games linked to a provider game"""
+    if created:
+        return
+    bump_game_versions(instance.games.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Game.provider_games.through)
+@receiver(m2m_changed, sender=Game.genres.through)
+@receiver(m2m_changed, sender=Game.platforms.through)
+def bump_m2m_game_versions(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached pages of games when their providers, genres or platforms change"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        bump_game_versions([instance.pk])
+    elif pk_set:
+        bump_game_versions(pk_set)
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Platform)
+def bump_all_game_versions(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached pages of all games, genres and platforms are shared by many games"""
+    bump_global_version()
+
+
+@receiver(post_save, sender=Game)
+def update_game_auto_installers(sender, instance, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """Keep the auto-installer slugs of a game in sync with its slug"""
+    if update_fields and "slug" not in update_fields:
+        return
+    update_auto_installers([instance.pk])
+
+
+@receiver(post_save, sender=Platform)
+def update_platform_auto_installer_slugs(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Add or remove the auto-installers of a platform when its default installer changes"""
+    update_platform_auto_installers(instance.pk)
+
+
+@receiver(post_save, sender=ProviderGame)
+def update_provider_game_auto_installers(sender, instance, created, **kwargs):  # pylint: disable=unused-argument
+    """Update the auto-installers of the games linked to a provider game"""
+    if created:
+        return
+    update_auto_installers(instance.games.values_list("id", flat=True))
+
+
+@receiver(m2m_changed, sender=Game.provider_games.through)
+@receiver(m2m_changed, sender=Game.platforms.through)
+def update_m2m_auto_installers(sender, instance, action, reverse, pk_set, **kwargs):  # pylint: disable=unused-argument
+    """Update the auto-installers of games when their platforms or provider games change"""
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        update_auto_installers([instance.pk])
+    elif pk_set:
+        update_auto_installers(pk_set)
+    elif action == "post_clear" and isinstance(instance, Platform):
+        update_platform_auto_installers(instance.pk)
+    elif action == "post_clear":
+        delete_provider_game_auto_installers(instance.pk)
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+@receiver(post_save, sender=GameAlias)
+@receiver(post_delete, sender=GameAlias)
+@receiver(post_save, sender=Installer)
+@receiver(post_delete, sender=Installer)
+def forget_installer_slug(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Resolve the slug of a saved installer, game or alias again on the next request"""
+    forget_installer_slugs([instance.slug])
+
+
+@receiver(post_save, sender=Game)
+def render_game_media(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Render the size variants of new banners, icons and coverart once they are saved"""
+    if instance.change_for_id or not instance.has_unrendered_media():
+        return
+    transaction.on_commit(lambda: tasks.render_media.delay(instance.pk))
+
+
+@receiver(post_init, sender=Game)
+@receiver(post_init, sender=GameSubmission)
+@receiver(post_init, sender=Installer)
+@receiver(post_init, sender=InstallerDraft)
+@receiver(post_init, sender=Screenshot)
+def record_statistics_values(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Remember the state an instance is counted in by the site statistics"""
+    instance.statistics_values = stats.get_tracked_values(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Game)
+@receiver(post_save, sender=GameSubmission)
+@receiver(post_save, sender=Installer)
+@receiver(post_save, sender=InstallerDraft)
+@receiver(post_save, sender=Screenshot)
+def update_saved_statistics(sender, instance, created, update_fields=None, **kwargs):  # pylint: disable=unused-argument
+    """Count saved instances in the site statistics"""
+    stats.track_saved_instance(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=Game)
+@receiver(post_delete, sender=GameSubmission)
+@receiver(post_delete, sender=Installer)
+@receiver(post_delete, sender=InstallerDraft)
+@receiver(post_delete, sender=Screenshot)
+def update_deleted_statistics(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Stop counting deleted instances in the site statistics"""
+    stats.track_deleted_instance(instance)
@@ -0,0 +1,228 @@
+"""Site statistics shown on the moderation dashboard
+
+Every counter is computed with one aggregate query per model and kept in the
+cache, one key per counter. Signals then move the counters an instance belongs
+to as it gets created, changed or deleted, so reading the statistics doesn't
+touch the database. Bulk queries bypass signals, the counters are recomputed and
+recorded in the KeyValueStore periodically, which also provides their history.
+"""
+
+import datetime
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from common.models import KeyValueStore, save_action_log
+from games.models import Game, GameSubmission, Installer, InstallerDraft, Screenshot
+
+STATISTICS_KEY = "games:stats:%s"
+STATISTICS_HISTORY_KEY = "game_statistics"
+# Longest history that can be requested, in days
+MAX_HISTORY_DAYS = 3650
+
+# Counters of each model, with the lookups an instance must match to be counted
+COUNTERS = {
+    Game: {
+        "games": {},
+        "published_games": {"is_public": True},
+        "unpublished_games": {"is_public": False},
+        "game_changes": {"change_for__isnull": False},
+    },
+    GameSubmission: {
+        "game_submissions": {},
+        "accepted_game_submissions": {"accepted_at__isnull": False},
+        "pending_game_submissions": {
+            "accepted_at__isnull": True,
+            "game__change_for__isnull": True,
+        },
+        "pending_game_changes": {
+            "accepted_at__isnull": True,
+            "game__change_for__isnull": False,
+        },
+    },
+    Installer: {
+        "installers": {},
+        "published_installers": {"published": True},
+    },
+    InstallerDraft: {
+        "submitted_drafts": {"draft": False},
+        "drafts": {},
+    },
+    Screenshot: {
+        "screenshots": {},
+        "published_screenshots": {"published": True},
+        "unpublished_screenshots": {"published": False},
+    },
+}
+
+
+def _get_tracked_fields(model):
+    """Return the fields of a model the counters depend on, by attribute name"""
+    fields = {}
+    for lookups in COUNTERS[model].values():
+        for lookup in lookups:
+            field = model._meta.get_field(lookup.split("__")[0])
+            fields[field.attname] = field.name
+    return fields
+
+
+TRACKED_FIELDS = {model: _get_tracked_fields(model) for model in COUNTERS}
+
+
+def compute_statistics():
+    """Count everything, with a single query per model"""
+    statistics = {}
+    for model, counters in COUNTERS.items():
+        statistics.update(
+            model.objects.aggregate(
+                **{
+                    name: Count("pk", filter=Q(**lookups) if lookups else None)
+                    for name, lookups in counters.items()
+                }
+            )
+        )
+    return statistics
+
+
+def update_statistics():
+    """Recompute the statistics and cache them"""
+    statistics = compute_statistics()
+    cache.set_many({STATISTICS_KEY % name: count for name, count in statistics.items()}, None)
+    return statistics
+
+
+def get_statistics():
+    """Return the cached statistics, computing them if the cache lost any counter"""
+    names = [name for counters in COUNTERS.values() for name in counters]
+    cached = cache.get_many([STATISTICS_KEY % name for name in names])
+    if len(cached) != len(names):
+        return update_statistics()
+    return {name: cached[STATISTICS_KEY % name] for name in names}
+
+
+def record_statistics():
+    """Recompute the statistics and add them to their history"""
+    statistics = update_statistics()
+    save_action_log(STATISTICS_HISTORY_KEY, json.dumps(statistics))
+    return statistics
+
+
+def get_statistics_history(days):
+    """Return the statistics recorded over the last days, oldest first"""
+    since = timezone.now() - datetime.timedelta(days=days)
+    return [
+        {"date": created_at.isoformat(), **json.loads(value)}
+        for created_at, value in KeyValueStore.objects.filter(
+            key=STATISTICS_HISTORY_KEY, created_at__gte=since
+        )
+        .order_by("created_at")
+        .values_list("created_at", "value")
+    ]
+
+
+def get_tracked_values(instance):
+    """Return the values of an instance the counters depend on, None if some were not
+    loaded from the database
+    """
+    values = {}
+    for attname in TRACKED_FIELDS[type(instance)]:
+        if attname not in instance.__dict__:
+            return None
+        values[attname] = instance.__dict__[attname]
+    return values
+
+
+def _matches(instance, values, lookups):
+    """Return whether an instance whose own fields have values matches lookups"""
+    for lookup, expected in lookups.items():
+        path = lookup.split("__")
+        isnull = path[-1] == "isnull"
+        if isnull:
+            path = path[:-1]
+        if len(path) == 1:
+            value = values[instance._meta.get_field(path[0]).attname]
+        else:
+            related = instance
+            for name in path[:-1]:
+                related = getattr(related, name)
+            value = getattr(related, related._meta.get_field(path[-1]).attname)
+        if ((value is None) if isnull else value) != expected:
+            return False
+    return True
+
+
+def get_instance_counters(instance, values):
+    """Return the names of the counters an instance is counted in"""
+    return {
+        name
+        for name, lookups in COUNTERS[type(instance)].items()
+        if _matches(instance, values, lookups)
+    }
+
+
+def _apply_deltas(deltas):
+    for name, delta in deltas.items():
+        try:
+            cache.incr(STATISTICS_KEY % name, delta)
+        except ValueError:
+            # The counter was lost, recompute everything on the next read
+            cache.delete_many([STATISTICS_KEY % counter for counter in deltas])
+            return
+
+
+def forget_statistics(model):
+    """Drop the counters of a model once the transaction is committed, they are
+    recomputed on the next read
+    """
+    keys = [STATISTICS_KEY % name for name in COUNTERS[model]]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def update_instance_counters(instance, previous_values, values):
+    """Move the counters of an instance from its previous state to its new one, once the
+    transaction is committed. A None state means the instance isn't counted.
+    """
+    try:
+        previous = set()
+        if previous_values is not None:
+            previous = get_instance_counters(instance, previous_values)
+        current = set()
+        if values is not None:
+            current = get_instance_counters(instance, values)
+    except ObjectDoesNotExist:
+        forget_statistics(type(instance))
+        return
+    deltas = {name: 1 for name in current - previous}
+    deltas.update({name: -1 for name in previous - current})
+    if deltas:
+        transaction.on_commit(lambda: _apply_deltas(deltas))
+
+
+def track_saved_instance(instance, created, update_fields):
+    """Update the counters after an instance is saved"""
+    model = type(instance)
+    if update_fields is not None and not created:
+        tracked_fields = {*TRACKED_FIELDS[model], *TRACKED_FIELDS[model].values()}
+        if not tracked_fields & set(update_fields):
+            return
+    values = get_tracked_values(instance)
+    if created:
+        update_instance_counters(instance, None, values)
+    elif values is None or instance.statistics_values is None:
+        forget_statistics(model)
+    else:
+        update_instance_counters(instance, instance.statistics_values, values)
+    instance.statistics_values = values
+
+
+def track_deleted_instance(instance):
+    """Update the counters after an instance is deleted"""
+    values = get_tracked_values(instance)
+    if values is None:
+        forget_statistics(type(instance))
+    else:
+        update_instance_counters(instance, values, None)
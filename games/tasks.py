@@ -9,6 +9,9 @@ from django.db.models import Q
 from common.models import KeyValueStore
 from common.util import dump_yaml, load_yaml
 from games import models
+from games.media import render_game_media
+from games.search import rebuild_search_documents
+from games.stats import record_statistics
 from lutrisweb.celery import app
 from runners.models import Runner, RunnerVersion
 
@@ -162,6 +165,36 @@ INVALID_INSTALLER_KEYS_DELETE = (
 )
 
 
+@app.task
+def fetch_steam_media(game_id, img_logo_url="", img_icon_url=""):
+    """Download the banner and icon of a game created from a Steam library"""
+    try:
+        game = models.Game.objects.get(pk=game_id)
+    except models.Game.DoesNotExist:
+        LOGGER.warning("Game %s was deleted before its Steam media was fetched", game_id)
+        return
+    changed = False
+    if img_logo_url and not game.title_logo:
+        game.set_logo_from_steam_api(img_logo_url)
+        changed = True
+    if img_icon_url and not game.icon:
+        game.set_icon_from_steam_api(img_icon_url)
+        changed = True
+    if changed:
+        game.save()
+
+
+@app.task
+def render_media(game_id, force=False):
+    """Render the banner, icon and coverart variants of a game"""
+    try:
+        game = models.Game.objects.get(pk=game_id)
+    except models.Game.DoesNotExist:
+        LOGGER.warning("Game %s was deleted before its media was rendered", game_id)
+        return []
+    return render_game_media(game, force=force)
+
+
 @app.task
 def action_log_cleanup():
     """Remove zero value entries from log"""
@@ -170,20 +203,38 @@ def action_log_cleanup():
     ).delete()
 
 
+@app.task
+def prune_library_tombstones():
+    """Delete the tombstones of library games removed longer ago than their retention"""
+    deleted = models.LibraryGameTombstone.prune()
+    LOGGER.info("Pruned %s library tombstones", deleted)
+    return deleted
+
+
 @app.task
 def populate_popularity():
-    """Update the popularity field for all"""
-    i = 0
-    total_games = models.Game.objects.all().count()
-    for game in models.Game.objects.all():
-        i += 1
-        if i % 10000 == 0:
-            LOGGER.info("updated %s/%s games", i, total_games)
-        library_count = game.libraries.all().count()
-        # Only update games in libraries to speed up the process
-        if library_count:
-            game.popularity = library_count
-            game.save()
+    """Recompute the popularity counters of all games from the libraries.
+    Counters are updated as libraries change, this corrects any drift.
+    """
+    changed = models.GamePopularity.recompute()
+    LOGGER.info("Updated the popularity of %s games", changed)
+    return changed
+
+
+@app.task
+def update_search_documents():
+    """Rebuild the search documents of games changed without signals, like provider renames"""
+    changed = rebuild_search_documents()
+    LOGGER.info("Updated the search documents of %s games", changed)
+    return changed
+
+
+@app.task
+def record_game_statistics():
+    """Snapshot the site statistics for the moderation dashboard history, refreshing
+    the cached counters that bulk queries left behind on the way.
+    """
+    return record_statistics()
 
 
 @app.task
@@ -0,0 +1,84 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.test import TestCase
+
+from games import models
+from providers.models import Provider, ProviderGame
+
+from . import factories
+
+SNES_INSTALLER = {
+    "runner": "snes9x",
+    "files": [{"rom": "N/A"}],
+    "game": {"main_file": "rom"},
+}
+
+
+class TestAutoInstallers(TestCase):
+    def setUp(self):
+        factories.RunnerFactory(name="Snes9x", slug="snes9x")
+        self.snes = factories.PlatformFactory(name="SNES", slug="snes")
+        self.snes.default_installer = SNES_INSTALLER
+        self.snes.save()
+        self.game = factories.GameFactory(name="The Legend of Zelda: A Link to the Past")
+        self.game.platforms.add(self.snes)
+        provider = Provider.objects.create(name="gog", website="https://gog.com")
+        self.provider_game = ProviderGame.objects.create(
+            provider=provider, name="Zelda", slug="zelda", internal_id="1207"
+        )
+        self.game.provider_games.add(self.provider_game)
+
+    def test_get_default_installers(self):
+        with self.assertNumQueries(1):
+            installers = self.game.get_default_installers()
+        self.assertEqual(
+            [installer["slug"] for installer in installers],
+            ["the-legend-of-zelda-a-link-to--snes", "gog:1207"],
+        )
+        self.assertEqual(installers[0]["runner"], "snes9x")
+        self.assertEqual(installers[0]["version"], "SNES")
+        self.assertEqual(installers[1]["version"], "GOG(Auto)")
+        installers[0]["files"].append({"patch": "N/A"})
+        self.snes.refresh_from_db()
+        self.assertEqual(self.snes.default_installer, SNES_INSTALLER)
+
+    def test_fuzzy_get_resolves_auto_installer_slugs(self):
+        with self.assertNumQueries(2):
+            installers = models.Installer.objects.fuzzy_get("the-legend-of-zelda-a-link-to--snes")
+        self.assertEqual(installers[0]["game_slug"], self.game.slug)
+        installers = models.Installer.objects.fuzzy_get("gog:1207")
+        self.assertEqual(installers[0]["runner"], "auto")
+        with self.assertRaises(ObjectDoesNotExist):
+            models.Installer.objects.fuzzy_get("the-legend-of-zelda-a-link-to--nes")
+
+    def test_fuzzy_filter_returns_auto_installer_models(self):
+        installers = models.Installer.objects.fuzzy_filter("the-legend-of-zelda-a-link-to--snes")
+        self.assertEqual(len(installers), 1)
+        self.assertEqual(installers[0].game, self.game)
+        self.assertEqual(installers[0].runner.slug, "snes9x")
+        installers = models.Installer.objects.fuzzy_filter(self.game.slug)
+        self.assertEqual(
+            [installer.slug for installer in installers], ["the-legend-of-zelda-a-link-to--snes"]
+        )
+        self.assertFalse(models.Installer.objects.fuzzy_filter("gog:1207"))
+
+    def test_catalogue_follows_changes(self):
+        self.game.slug = "alttp"
+        self.game.save()
+        self.assertTrue(models.Installer.objects.fuzzy_get("alttp-snes"))
+
+        self.provider_game.internal_id = "1208"
+        self.provider_game.save()
+        self.assertTrue(models.Installer.objects.fuzzy_get("gog:1208"))
+        self.provider_game.games.clear()
+        self.assertEqual(
+            [installer["slug"] for installer in self.game.get_default_installers()],
+            ["alttp-snes"],
+        )
+
+        self.snes.default_installer = None
+        self.snes.save()
+        self.assertFalse(self.game.get_default_installers())
+        self.snes.default_installer = SNES_INSTALLER
+        self.snes.save()
+        self.game.platforms.remove(self.snes)
+        self.assertFalse(self.game.get_default_installers())
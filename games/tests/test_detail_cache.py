@@ -0,0 +1,75 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from games.cache import bump_game_versions, get_game_version
+from games.models import GameLink, LibraryGame
+from games.tests import factories
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestGameDetailCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.game = factories.GameFactory(name="Quake")
+        self.installer = factories.InstallerFactory(
+            game=self.game, version="GOG", content="game:\n  exe: quake.exe"
+        )
+
+    def get_page(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_detail_page_fragments_are_cached(self):
+        url = reverse("game_detail", kwargs={"slug": self.game.slug})
+        response, uncached_queries = self.get_page(url)
+        self.assertContains(response, "GOG version")
+        response, cached_queries = self.get_page(url)
+        self.assertContains(response, "GOG version")
+        self.assertLess(cached_queries, uncached_queries)
+
+        factories.InstallerFactory(game=self.game, version="Steam", content="game:\n  exe: a")
+        response, _queries = self.get_page(url)
+        self.assertContains(response, "Steam version")
+
+        GameLink.objects.create(game=self.game, website="github", url="https://github.com/q")
+        response, _queries = self.get_page(url)
+        self.assertContains(response, "https://github.com/q")
+
+    def test_api_payload_is_cached(self):
+        url = reverse("api_game_detail", kwargs={"slug": self.game.slug})
+        response, uncached_queries = self.get_page(url)
+        self.assertEqual(
+            [installer["version"] for installer in response.json()["installers"]], ["GOG"]
+        )
+        response, cached_queries = self.get_page(url)
+        self.assertEqual(cached_queries, 1)
+        self.assertLess(cached_queries, uncached_queries)
+
+        self.installer.version = "Retail"
+        self.installer.save()
+        response, _queries = self.get_page(url)
+        self.assertEqual(
+            [installer["version"] for installer in response.json()["installers"]], ["Retail"]
+        )
+
+    def test_api_user_count_is_current(self):
+        url = reverse("api_game_detail", kwargs={"slug": self.game.slug})
+        self.assertEqual(self.get_page(url)[0].json()["user_count"], 0)
+        user = factories.UserFactory()
+        with self.captureOnCommitCallbacks(execute=True):
+            LibraryGame.objects.create(gamelibrary=user.gamelibrary, game=self.game)
+        self.assertEqual(self.get_page(url)[0].json()["user_count"], 1)
+
+    def test_versions_are_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_game_versions([self.game.pk])
+            # A request reading the uncommitted rows caches them under this version
+            version = get_game_version(self.game.pk)
+        self.assertNotEqual(get_game_version(self.game.pk), version)
@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from games import models
+from games.cache import set_installer_slug_targets
+
+from . import factories
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestInstallerSlugResolution(TestCase):
+    def setUp(self):
+        cache.clear()
+        factories.RunnerFactory(name="Linux", slug="linux")
+        self.platform = factories.PlatformFactory(name="Linux", slug="linux")
+        self.platform.default_installer = {"runner": "linux", "game": {"exe": "game"}}
+        self.platform.save()
+        self.game = factories.GameFactory(name="Quake")
+        self.game.platforms.add(self.platform)
+        self.installer = factories.InstallerFactory(game=self.game, version="GOG", published=True)
+        models.GameAlias.objects.create(game=self.game, slug="quake-1", name="Quake 1")
+
+    def test_resolve_slug(self):
+        resolve_slug = models.Installer.objects.resolve_slug
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                resolve_slug("quake-gog"),
+                [(models.INSTALLER_SLUG, self.game.id, self.installer.id)],
+            )
+        with self.assertNumQueries(0):
+            resolve_slug("quake-gog")
+        self.assertEqual(resolve_slug("quake")[0], (models.GAME_SLUG, self.game.id, self.game.id))
+        self.assertEqual(resolve_slug("quake-1")[0][:2], (models.ALIAS_SLUG, self.game.id))
+        self.assertEqual(
+            resolve_slug("quake-linux")[0][:2], (models.AUTO_INSTALLER_SLUG, self.game.id)
+        )
+
+    def test_fuzzy_filter(self):
+        self.assertEqual(models.Installer.objects.fuzzy_filter("quake-gog"), [self.installer])
+        self.assertEqual(
+            [installer.slug for installer in models.Installer.objects.fuzzy_filter("quake-1")],
+            ["quake-gog", "quake-linux"],
+        )
+        self.assertFalse(models.Installer.objects.fuzzy_filter("quake-steam"))
+
+    def test_unknown_slugs_are_cached_until_used(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(models.Installer.objects.resolve_slug("quake-steam"), [])
+        with self.assertNumQueries(0):
+            self.assertFalse(models.Installer.objects.fuzzy_filter("quake-steam"))
+        factories.InstallerFactory(game=self.game, version="Steam", published=True)
+        self.assertEqual(len(models.Installer.objects.fuzzy_filter("quake-steam")), 1)
+
+        self.assertEqual(models.Installer.objects.resolve_slug("quake-snes"), [])
+        snes = factories.PlatformFactory(name="SNES", slug="snes")
+        snes.default_installer = {"runner": "linux", "game": {"rom": "game"}}
+        snes.save()
+        self.game.platforms.add(snes)
+        self.assertEqual(len(models.Installer.objects.fuzzy_filter("quake-snes")), 1)
+
+    def test_slugs_are_forgotten_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            factories.InstallerFactory(game=self.game, version="Steam", published=True)
+            # A concurrent request doesn't see the uncommitted installer yet
+            set_installer_slug_targets("quake-steam", [])
+        self.assertEqual(len(models.Installer.objects.fuzzy_filter("quake-steam")), 1)
+
+    def test_renamed_installers_are_resolved_again(self):
+        self.assertEqual(models.Installer.objects.fuzzy_filter("quake-gog"), [self.installer])
+        self.installer.version = "GOG Galaxy"
+        self.installer.save()
+        self.assertEqual(
+            [installer.slug for installer in models.Installer.objects.fuzzy_filter("quake-gog")],
+            [],
+        )
+
+    def test_renamed_aliases_are_resolved_again(self):
+        self.assertTrue(models.Installer.objects.fuzzy_filter("quake-1"))
+        alias = models.GameAlias.objects.get(slug="quake-1")
+        alias.slug = "quake-one"
+        alias.save()
+        self.assertFalse(models.Installer.objects.fuzzy_filter("quake-1"))
+        self.assertTrue(models.Installer.objects.fuzzy_filter("quake-one"))
+
+    def test_installer_list_api_is_cached(self):
+        url = reverse("api_game_installer_list", kwargs={"slug": "quake"})
+        response = self.client.get(url)
+        self.assertEqual(
+            [installer["slug"] for installer in response.json()["results"]],
+            ["quake-gog", "quake-linux"],
+        )
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["count"], 2)
+
+        self.installer.version = "Retail"
+        self.installer.save()
+        response = self.client.get(url)
+        self.assertEqual(response.json()["results"][0]["version"], "Retail")
+
+    def test_game_for_installer(self):
+        response = self.client.get(reverse("game_for_installer", kwargs={"slug": "quake-linux"}))
+        self.assertRedirects(response, reverse("game_detail", kwargs={"slug": "quake"}))
+        response = self.client.get(reverse("game_for_installer", kwargs={"slug": "quake-snes"}))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,117 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from common.util import dump_yaml
+from games import models
+from games.util.installer_tokens import get_installer_tokens, get_search_tokens
+
+from . import factories
+
+WINE_SCRIPT = {
+    "files": [
+        {"setup": "https://example.com/downloads/setup_game.exe"},
+        {"patch": {"url": "https://cdn.example.org/patch.zip", "filename": "patch.zip"}},
+        {"disc": "N/A:Select the game disc"},
+    ],
+    "game": {"exe": "drive_c/Game/GAME.EXE", "prefix": "$GAMEDIR"},
+    "installer": [
+        {"task": {"name": "create_prefix", "prefix": "$GAMEDIR"}},
+        {"task": {"name": "winetricks", "app": "vcrun2019 d3dx9", "prefix": "$GAMEDIR"}},
+        {"task": {"name": "wineexec", "executable": "setup", "prefix": "$GAMEDIR"}},
+        {"execute": {"file": "$CACHE/fix.sh"}},
+        {"extract": {"file": "patch", "dst": "$GAMEDIR"}},
+    ],
+    "wine": {"version": "lutris-GE-Proton8-26-x86_64", "dxvk": True, "esync": False},
+    "system": {"disable_compositor": True},
+}
+
+
+class TestInstallerTokens(TestCase):
+    def test_get_installer_tokens(self):
+        self.assertEqual(
+            get_installer_tokens(dump_yaml(WINE_SCRIPT), "wine"),
+            [
+                "exe:fix.sh",
+                "exe:game.exe",
+                "exe:setup",
+                "host:cdn.example.org",
+                "host:example.com",
+                "option:disable_compositor",
+                "option:dxvk",
+                "runner:wine",
+                "task:create_prefix",
+                "task:wineexec",
+                "task:winetricks",
+                "url:https://cdn.example.org/patch.zip",
+                "url:https://example.com/downloads/setup_game.exe",
+                "wine:lutris-ge-proton8-26-x86_64",
+                "winetricks:d3dx9",
+                "winetricks:vcrun2019",
+            ],
+        )
+
+    def test_invalid_scripts(self):
+        self.assertEqual(get_installer_tokens("game: [", "linux"), ["runner:linux"])
+        self.assertEqual(get_installer_tokens("- just a list", ""), [])
+        self.assertEqual(
+            get_installer_tokens(dump_yaml({"installer": ["oops", {"task": "nope"}]})), []
+        )
+
+    def test_get_search_tokens(self):
+        self.assertEqual(get_search_tokens("winetricks:VCRUN2019"), ["winetricks:vcrun2019"])
+        self.assertIn("option:dxvk", get_search_tokens("dxvk"))
+        self.assertIn("winetricks:dxvk", get_search_tokens("dxvk"))
+        self.assertIn("url:https://example.com", get_search_tokens("https://example.com"))
+
+
+class TestInstallerSearch(TestCase):
+    def setUp(self):
+        self.wine = factories.RunnerFactory(name="Wine", slug="wine")
+        self.linux = factories.RunnerFactory(name="Linux", slug="linux")
+        self.wine_game = factories.GameFactory(name="Wine Game")
+        self.linux_game = factories.GameFactory(name="Linux Game")
+        self.wine_installer = factories.InstallerFactory(
+            game=self.wine_game, runner=self.wine, content=dump_yaml(WINE_SCRIPT)
+        )
+        self.linux_installer = factories.InstallerFactory(
+            game=self.linux_game, runner=self.linux, content="game:\n  exe: game.sh"
+        )
+
+    def search(self, text):
+        return set(models.Installer.objects.filter(search_tokens__overlap=get_search_tokens(text)))
+
+    def test_tokens_are_refreshed_on_save(self):
+        self.assertEqual(self.search("dxvk vcrun2019"), {self.wine_installer})
+        self.assertEqual(self.search("game.sh"), {self.linux_installer})
+        self.linux_installer.content = dump_yaml(
+            {
+                "game": {"exe": "game.sh"},
+                "installer": [{"task": {"name": "winetricks", "app": "dxvk"}}],
+            }
+        )
+        self.linux_installer.save(update_fields=["content"])
+        self.assertEqual(self.search("dxvk"), {self.wine_installer, self.linux_installer})
+        self.assertEqual(self.search("option:dxvk"), {self.wine_installer})
+
+    def test_index_installers_command(self):
+        models.Installer.objects.update(search_tokens=[])
+        output = StringIO()
+        call_command("index_installers", stdout=output)
+        self.assertEqual(output.getvalue().strip(), "Indexed 2 installers")
+        self.assertEqual(self.search("dxvk vcrun2019"), {self.wine_installer})
+        self.assertEqual(self.search("game.sh"), {self.linux_installer})
+
+    def test_game_list_installer_search(self):
+        response = self.client.get(
+            reverse("game_list"), {"q": "vcrun2019", "search-installers": "on"}
+        )
+        self.assertEqual([game.name for game in response.context["games"]], ["Wine Game"])
+        response = self.client.get(
+            reverse("game_list"), {"q": "runner:linux runner:wine", "search-installers": "on"}
+        )
+        self.assertEqual(
+            [game.name for game in response.context["games"]], ["Linux Game", "Wine Game"]
+        )
@@ -0,0 +1,79 @@
+import io
+import shutil
+import tempfile
+from unittest.mock import patch
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from games.media import render_game_media
+from games.models import Game
+
+from . import factories
+
+
+def get_image_file(name, size=(640, 480), image_format="PNG"):
+    output = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(output, image_format)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+class TestRenderedMedia(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.game = factories.GameFactory(name="Quake")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def add_media(self):
+        self.game.title_logo = get_image_file("quake.jpg", image_format="JPEG")
+        self.game.icon = get_image_file("quake.png", size=(256, 256))
+        with patch("games.signals.tasks.render_media.delay") as render_mock:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.game.save()
+        render_mock.assert_called_once_with(self.game.pk)
+
+    def test_media_is_rendered_to_content_addressed_files(self):
+        self.add_media()
+        self.assertTrue(self.game.media_urls["banner"].endswith("/games/banner/quake.jpg"))
+        self.assertEqual(render_game_media(self.game), ["banner", "icon"])
+        self.assertEqual(render_game_media(self.game), [])
+        self.assertFalse(self.game.has_unrendered_media())
+
+        game = Game.objects.get(pk=self.game.pk)
+        banner_path = game.rendered_media["banner"]["path"]
+        self.assertRegex(banner_path, r"^rendered/banner/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+        self.assertTrue(game.media_urls["banner"].endswith("/media/" + banner_path))
+        self.assertTrue(game.media_urls["icon"].endswith(".png"))
+        with Image.open(f"{self.media_root}/{banner_path}") as banner:
+            self.assertEqual(banner.size, (184, 69))
+
+        game.icon = get_image_file("quake-new.png", size=(64, 64))
+        game.save()
+        self.assertTrue(game.has_unrendered_media())
+        self.assertEqual(render_game_media(game), ["icon"])
+
+    def test_views_redirect_to_rendered_media(self):
+        self.add_media()
+        render_game_media(self.game)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("get_banner", kwargs={"slug": "quake"}))
+        self.assertRedirects(
+            response, self.game.media_urls["banner"], fetch_redirect_response=False
+        )
+        response = self.client.get(reverse("get_icon", kwargs={"slug": "quake"}))
+        self.assertRedirects(response, self.game.media_urls["icon"], fetch_redirect_response=False)
+        response = self.client.get(reverse("get_coverart", kwargs={"slug": "quake"}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_broken_images_are_skipped(self):
+        self.game.title_logo = SimpleUploadedFile("broken.jpg", b"not an image")
+        self.game.save()
+        self.assertEqual(render_game_media(self.game), [])
+        self.assertTrue(self.game.has_unrendered_media())
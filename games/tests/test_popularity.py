@@ -0,0 +1,106 @@
+import time
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.library import LibrarySync
+from common.util import create_user
+from games.models import Game, GameLibrary, GamePopularity, LibraryGame
+from games.tasks import populate_popularity
+
+
+class TestGamePopularity(TestCase):
+    def setUp(self):
+        self.quake = Game.objects.create(name="Quake", slug="quake")
+        self.doom = Game.objects.create(name="Doom", slug="doom")
+        self.hexen = Game.objects.create(name="Hexen", slug="hexen")
+        self.libraries = [
+            GameLibrary.objects.get(user=create_user(username=f"player{index}"))
+            for index in range(3)
+        ]
+
+    def get_library_count(self, game):
+        try:
+            return GamePopularity.objects.get(game=game).library_count
+        except GamePopularity.DoesNotExist:
+            return 0
+
+    def add_games(self, library, *games):
+        with self.captureOnCommitCallbacks(execute=True):
+            LibrarySync(library).sync(
+                [
+                    {
+                        "name": game.name,
+                        "slug": game.slug,
+                        "runner": "linux",
+                        "platform": "Linux",
+                        "service": "",
+                        "playtime": 1,
+                        "lastplayed": int(time.time()) - 3600,
+                    }
+                    for game in games
+                ]
+            )
+
+    def test_library_sync_increments_counters(self):
+        for library in self.libraries:
+            self.add_games(library, self.quake)
+        self.add_games(self.libraries[0], self.doom)
+        self.add_games(self.libraries[0], self.quake, self.doom)
+        self.assertEqual(self.get_library_count(self.quake), 3)
+        self.assertEqual(self.get_library_count(self.doom), 1)
+        self.assertEqual(self.get_library_count(self.hexen), 0)
+
+    def test_library_game_save_and_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            library_game = LibraryGame.objects.create(
+                gamelibrary=self.libraries[0], game=self.hexen, slug="hexen"
+            )
+            LibraryGame.objects.create(gamelibrary=self.libraries[1], game=self.hexen)
+        self.assertEqual(self.get_library_count(self.hexen), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            library_game.playtime = 10
+            library_game.save()
+            self.libraries[0].delete_games([library_game])
+        self.assertEqual(self.get_library_count(self.hexen), 1)
+
+    def test_merge_moves_counters(self):
+        self.add_games(self.libraries[0], self.quake)
+        self.add_games(self.libraries[1], self.doom)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quake.merge_with_game(self.doom)
+        self.assertEqual(self.get_library_count(self.quake), 2)
+        self.assertFalse(GamePopularity.objects.filter(game_id=self.doom.id).exists())
+
+    def test_recompute_fixes_drift(self):
+        for library in self.libraries:
+            self.add_games(library, self.quake)
+        LibraryGame.objects.create(gamelibrary=self.libraries[0], game=self.doom, lastplayed=0)
+        GamePopularity.objects.filter(game=self.quake).update(library_count=42)
+
+        self.assertEqual(populate_popularity(), 3)
+        quake_counter = GamePopularity.objects.get(game=self.quake)
+        self.assertEqual(quake_counter.library_count, 3)
+        self.assertEqual(quake_counter.recent_play_count, 3)
+        doom_counter = GamePopularity.objects.get(game=self.doom)
+        self.assertEqual(doom_counter.library_count, 1)
+        self.assertEqual(doom_counter.recent_play_count, 0)
+        self.assertEqual(GamePopularity.objects.get(game=self.hexen).library_count, 0)
+        self.assertEqual(
+            dict(Game.objects.values_list("slug", "popularity")),
+            {"quake": 3, "doom": 1, "hexen": 0},
+        )
+        self.assertEqual(populate_popularity(), 0)
+
+    def test_game_list_sorted_by_popularity(self):
+        for library in self.libraries:
+            self.add_games(library, self.doom)
+        self.add_games(self.libraries[0], self.quake)
+        response = self.client.get(reverse("game_list"), {"ordering": "-popularity"})
+        self.assertEqual(
+            [game.slug for game in response.context["games"]], ["doom", "quake", "hexen"]
+        )
+        response = self.client.get(reverse("game_list"), {"ordering": "popularity"})
+        self.assertEqual(
+            [game.slug for game in response.context["games"]], ["hexen", "quake", "doom"]
+        )
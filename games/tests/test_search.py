@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from games.models import Company, Game, GameAlias, GameSearchDocument
+from games.search import rebuild_search_documents
+from providers.models import Provider, ProviderGame
+
+from . import factories
+
+
+class TestGameSearch(TestCase):
+    def setUp(self):
+        self.id_software = Company.objects.create(name="id Software", slug="id-software")
+        self.raven = Company.objects.create(name="Raven Software", slug="raven-software")
+        self.quake = factories.GameFactory(name="Quake", developer=self.id_software)
+        self.quake_2 = factories.GameFactory(name="Quake II", developer=self.id_software)
+        self.heretic = factories.GameFactory(name="Heretic", developer=self.raven)
+        self.unreal = factories.GameFactory(name="Unreal Tournament")
+        GameAlias.objects.create(game=self.heretic, name="Shadow of the Serpent Riders")
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("game_list"), {"q": query, **params})
+        return [game.name for game in response.context["games"]]
+
+    def test_search_by_name(self):
+        self.assertEqual(self.search("quake"), ["Quake", "Quake II"])
+        self.assertEqual(self.search("tournament unreal"), ["Unreal Tournament"])
+
+    def test_search_by_prefix_and_substring(self):
+        self.assertEqual(self.search("unre"), ["Unreal Tournament"])
+        self.assertEqual(self.search("urnamen"), ["Unreal Tournament"])
+
+    def test_search_with_typo(self):
+        self.assertEqual(self.search("heretik"), ["Heretic"])
+
+    def test_search_by_alias_and_company(self):
+        self.assertEqual(self.search("serpent"), ["Heretic"])
+        self.assertEqual(self.search("raven"), ["Heretic"])
+        self.assertCountEqual(self.search("id software"), ["Quake", "Quake II"])
+
+    def test_search_is_ranked(self):
+        self.assertEqual(self.search("quake ii"), ["Quake II", "Quake"])
+        self.assertEqual(self.search("quake ii", ordering="name"), ["Quake", "Quake II"])
+
+    def test_documents_follow_changes(self):
+        GameAlias.objects.create(game=self.unreal, name="UT99")
+        self.assertEqual(self.search("ut99"), ["Unreal Tournament"])
+
+        self.raven.name = "Raven"
+        self.raven.save()
+        self.assertEqual(GameSearchDocument.objects.get(game=self.heretic).companies, "Raven")
+
+        provider = Provider.objects.create(name="gog", website="https://gog.com")
+        provider_game = ProviderGame.objects.create(
+            provider=provider, slug="1207658930", name="Heretic: Shadow of the Serpent Riders"
+        )
+        self.quake.provider_games.add(provider_game)
+        self.assertIn("Heretic", GameSearchDocument.objects.get(game=self.quake).providers)
+        self.quake.provider_games.clear()
+        self.assertEqual(GameSearchDocument.objects.get(game=self.quake).providers, "")
+
+    def test_rebuild_search_documents(self):
+        self.assertEqual(rebuild_search_documents(), 0)
+        Game.objects.filter(pk=self.quake.pk).update(name="Quake Champions")
+        GameSearchDocument.objects.filter(game=self.unreal).delete()
+        self.assertEqual(rebuild_search_documents(), 2)
+        self.assertEqual(self.search("champions"), ["Quake Champions"])
+        self.assertEqual(self.search("unreal"), ["Unreal Tournament"])
+
+    def test_api_search(self):
+        response = self.client.get(reverse("api_game_list"), {"search": "quake ii"})
+        self.assertEqual(
+            [game["name"] for game in response.json()["results"]], ["Quake II", "Quake"]
+        )
@@ -0,0 +1,104 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from common.models import KeyValueStore
+from common.util import create_user
+from games import models, stats
+from games.tests.factories import GameChangeFactory, GameFactory, InstallerFactory
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TestGameStatistics(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.game = GameFactory(name="Quake")
+        self.change = GameChangeFactory(change_for=self.game)
+        self.submission = models.GameSubmission.objects.create(user=self.user, game=self.change)
+        InstallerFactory(game=self.game)
+        InstallerFactory(game=self.game, published=False, version="beta")
+        models.Screenshot.objects.create(game=self.game, uploaded_by=self.user, image="a.jpg")
+
+    def tearDown(self):
+        # The cache is shared by every test using it
+        stats.cache.clear()
+
+    def assertCountersAreCurrent(self):
+        with self.assertNumQueries(0):
+            cached = stats.get_statistics()
+        self.assertEqual(cached, stats.compute_statistics())
+
+    def test_computes_every_counter_with_a_query_per_model(self):
+        with self.assertNumQueries(5):
+            statistics = stats.get_statistics()
+        self.assertEqual(statistics["games"], 2)
+        self.assertEqual(statistics["published_games"], 1)
+        self.assertEqual(statistics["game_changes"], 1)
+        self.assertEqual(statistics["pending_game_changes"], 1)
+        self.assertEqual(statistics["pending_game_submissions"], 0)
+        self.assertEqual(statistics["installers"], 2)
+        self.assertEqual(statistics["published_installers"], 1)
+        self.assertEqual(statistics["unpublished_screenshots"], 1)
+        self.assertCountersAreCurrent()
+
+    def test_counters_follow_saved_and_deleted_instances(self):
+        stats.get_statistics()
+        with self.captureOnCommitCallbacks(execute=True):
+            game = models.Game.objects.create(name="Doom", slug="doom")
+            submission = models.GameSubmission.objects.create(user=self.user, game=game)
+        self.assertCountersAreCurrent()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            submission.accept()
+        self.assertCountersAreCurrent()
+        self.assertEqual(stats.get_statistics()["accepted_game_submissions"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            screenshot = models.Screenshot.objects.get()
+            screenshot.published = True
+            screenshot.save()
+            models.Installer.objects.filter(published=False).get().delete()
+        self.assertCountersAreCurrent()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change.delete()
+        self.assertCountersAreCurrent()
+        self.assertEqual(stats.get_statistics()["pending_game_changes"], 0)
+
+    def test_saving_partially_loaded_instances_invalidates_counters(self):
+        stats.get_statistics()
+        with self.captureOnCommitCallbacks(execute=True):
+            game = models.Game.objects.only("id", "name", "slug").get(pk=self.game.pk)
+            game.save(update_fields=["name"])
+        self.assertCountersAreCurrent()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            game.is_public = False
+            game.save(update_fields=["is_public"])
+        self.assertEqual(stats.get_statistics()["unpublished_games"], 2)
+        self.assertCountersAreCurrent()
+
+    def test_records_history(self):
+        stats.record_statistics()
+        self.assertEqual(KeyValueStore.objects.filter(key=stats.STATISTICS_HISTORY_KEY).count(), 1)
+        admin = create_user(username="admin")
+        admin.is_staff = True
+        admin.save()
+        self.client.force_login(admin)
+        response = self.client.get(reverse("api_game_stats"), {"history": 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["games"], 2)
+        self.assertEqual(len(response.json()["history"]), 1)
+        self.assertEqual(response.json()["history"][0]["installers"], 2)
+
+    def test_history_range_is_validated(self):
+        admin = create_user(username="admin")
+        admin.is_staff = True
+        admin.save()
+        self.client.force_login(admin)
+        for days in ("week", "0", "-1", "3651", "99999999999"):
+            response = self.client.get(reverse("api_game_stats"), {"history": days})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("api_game_stats"), {"history": 3650})
+        self.assertEqual(response.status_code, 200)
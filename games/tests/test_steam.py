@@ -1,6 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from mock import patch
 
+from accounts.tasks import sync_steam_library
+from common.util import create_user
+from games.cache import get_game_version
+from games.models import Game, LibraryGame
 from games.util import steam
 
 
@@ -39,3 +43,59 @@ class TestSteamSync(TestCase):
         self.assertEqual(len(games), 2)
         self.assertEqual(games[0]["appid"], 440)
         self.assertEqual(games[1]["name"], "Dota 2")
+
+
+class TestSyncSteamLibrary(TestCase):
+    def setUp(self):
+        self.user = create_user(username="steamer", password="password")
+        self.user.steamid = "123"
+        self.user.save()
+        # Saving a game with a Steam ID downloads its banner
+        self.tf2 = Game.objects.create(name="TF2", slug="tf2")
+        Game.objects.filter(pk=self.tf2.pk).update(steamid=440)
+        self.dota = Game.objects.create(name="Dota 2", slug="dota-2")
+
+    def sync(self, steam_games):
+        with (
+            patch("games.util.steam.steam_sync", return_value=steam_games),
+            patch("accounts.tasks.fetch_steam_media.delay") as media_mock,
+        ):
+            stats = sync_steam_library(self.user.id)
+        return stats, media_mock
+
+    def get_steam_games(self):
+        return SteamMock().json()["response"]["games"] + [
+            {"appid": 620, "img_icon_url": "f0d7", "img_logo_url": "d2a5", "name": "Portal 2"},
+            {"appid": 630, "img_icon_url": "", "name": "No icon"},
+        ]
+
+    def test_resolves_and_creates_games(self):
+        stats, media_mock = self.sync(self.get_steam_games())
+        self.assertEqual(stats, {"games": 3, "created": 1, "added": 3})
+        self.dota.refresh_from_db()
+        self.assertEqual(self.dota.steamid, 570)
+        portal = Game.objects.get(slug="portal-2")
+        self.assertEqual(portal.steamid, 620)
+        self.assertTrue(portal.is_public)
+        media_mock.assert_called_once_with(portal.id, "d2a5", "f0d7")
+        library_games = LibraryGame.objects.filter(gamelibrary__user=self.user)
+        self.assertEqual(
+            sorted(library_games.values_list("slug", flat=True)), ["dota-2", "portal-2", "tf2"]
+        )
+        self.assertEqual(set(library_games.values_list("service", flat=True)), {"steam"})
+        self.assertFalse(Game.objects.filter(slug="no-icon").exists())
+
+    def test_sync_is_idempotent(self):
+        self.sync(self.get_steam_games())
+        stats, media_mock = self.sync(self.get_steam_games())
+        self.assertEqual(stats, {"games": 3, "created": 0, "added": 0})
+        media_mock.assert_not_called()
+        self.assertEqual(LibraryGame.objects.filter(gamelibrary__user=self.user).count(), 3)
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+    )
+    def test_games_given_a_steam_id_are_invalidated(self):
+        version = get_game_version(self.dota.pk)
+        self.sync(self.get_steam_games())
+        self.assertNotEqual(get_game_version(self.dota.pk), version)
@@ -0,0 +1,105 @@
+"""Search tokens extracted from installer scripts
+
+Installers are indexed by the structured parts of their script, stored as
+'kind:value' tokens: runner, wine version, wine and system options, winetricks
+verbs, task names, file URLs and hosts and executables. Searching for installers
+using something is then an array overlap on an indexed column instead of a
+substring scan of every script.
+"""
+
+import os
+from urllib.parse import urlparse
+
+import yaml
+
+from common.util import load_yaml
+
+INSTALLER_TOKEN_KINDS = ("runner", "wine", "option", "winetricks", "task", "url", "host", "exe")
+# Tokens are stored in a GIN index, whose entries have a size limit
+MAX_TOKEN_LENGTH = 255
+
+
+def _get_token(kind, value):
+    return f"{kind}:{str(value).strip().lower()}"[:MAX_TOKEN_LENGTH]
+
+
+def _iter_file_urls(files):
+    """Yield the URLs of the files section of a script"""
+    for file_item in files if isinstance(files, list) else []:
+        if not isinstance(file_item, dict):
+            continue
+        for file_meta in file_item.values():
+            url = file_meta.get("url") if isinstance(file_meta, dict) else file_meta
+            if isinstance(url, str) and url.startswith(("http://", "https://", "ftp://")):
+                yield url
+
+
+def _iter_step_tokens(steps):
+    """Yield the tokens of the steps of an installer section"""
+    for step in steps if isinstance(steps, list) else []:
+        if not isinstance(step, dict):
+            continue
+        for directive, params in step.items():
+            if not isinstance(params, dict):
+                continue
+            if directive == "task":
+                task_name = params.get("name")
+                if not task_name:
+                    continue
+                yield _get_token("task", task_name)
+                if task_name == "winetricks":
+                    for verb in str(params.get("app") or "").split():
+                        yield _get_token("winetricks", verb)
+                if params.get("executable"):
+                    yield _get_token("exe", os.path.basename(str(params["executable"])))
+            elif directive == "execute" and params.get("file"):
+                yield _get_token("exe", os.path.basename(str(params["file"])))
+
+
+def get_installer_tokens(content, runner_slug=""):
+    """Return the sorted search tokens of an installer script"""
+    tokens = set()
+    if runner_slug:
+        tokens.add(_get_token("runner", runner_slug))
+    try:
+        script = load_yaml(content)
+    except yaml.YAMLError:
+        script = None
+    if not isinstance(script, dict):
+        return sorted(tokens)
+
+    for section in ("wine", "system"):
+        options = script.get(section)
+        if not isinstance(options, dict):
+            continue
+        for option, value in options.items():
+            if value is True:
+                tokens.add(_get_token("option", option))
+        if section == "wine" and options.get("version"):
+            tokens.add(_get_token("wine", options["version"]))
+
+    for url in _iter_file_urls(script.get("files")):
+        tokens.add(_get_token("url", url))
+        if urlparse(url).hostname:
+            tokens.add(_get_token("host", urlparse(url).hostname))
+
+    tokens.update(_iter_step_tokens(script.get("installer")))
+
+    game = script.get("game")
+    if isinstance(game, dict) and isinstance(game.get("exe"), str):
+        tokens.add(_get_token("exe", os.path.basename(game["exe"])))
+    return sorted(tokens)
+
+
+def get_search_tokens(text):
+    """Return the tokens matching a search such as 'dxvk winetricks:vcrun2019'.
+    Terms with a known kind only match that kind, other terms match any kind.
+    """
+    tokens = []
+    for term in text.split():
+        kind, _separator, value = term.partition(":")
+        if kind in INSTALLER_TOKEN_KINDS and value:
+            tokens.append(_get_token(kind, value))
+        else:
+            tokens.extend(_get_token(kind, term) for kind in INSTALLER_TOKEN_KINDS)
+    return tokens
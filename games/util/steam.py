@@ -1,14 +1,15 @@
 """Steam related utilities"""
 
 import logging
+from collections import defaultdict
 
 import requests
 from django.conf import settings
-from django.db import IntegrityError, transaction
 
 from accounts.models import User
 from common.util import slugify
 from games import models
+from games.cache import bump_game_versions, forget_installer_slugs
 
 LOGGER = logging.getLogger(__name__)
 STEAM_API_URL = "https://api.steampowered.com/"
@@ -62,30 +63,67 @@ def steam_sync(steamid):
     return []
 
 
-def create_game(game):
-    """Create game object from Steam API call"""
-    slug = slugify(game["name"])[:50]
-    try:
-        with transaction.atomic():
-            steam_game = models.Game(
-                name=game["name"],
-                steamid=game["appid"],
-                slug=slug,
-                is_public=True,
-            )
-            if game.get("img_logo_url"):
-                steam_game.set_logo_from_steam_api(game["img_logo_url"])
-
-            if game.get("img_icon_url"):
-                steam_game.set_icon_from_steam_api(game["img_icon_url"])
-            steam_game.save()
-    except IntegrityError:
-        LOGGER.warning("Slug '%s' already exists, fetching existing game", slug)
-        steam_game = models.Game.objects.get(slug=slug)
-        if not steam_game.steamid:
-            steam_game.steamid = game["appid"]
-            steam_game.save()
-    return steam_game
+def resolve_steam_games(steam_games):
+    """Return the Lutris game ID of each Steam game, creating the games that don't exist.
+
+    Games are matched by Steam ID, then by slug, with a constant number of queries.
+
+    Returns:
+        tuple: Lutris game IDs by appid and the IDs of the created games by appid
+    """
+    games_by_appid = defaultdict(list)
+    for game_id, steamid in models.Game.objects.filter(
+        steamid__in={steam_game["appid"] for steam_game in steam_games}
+    ).values_list("id", "steamid"):
+        games_by_appid[steamid].append(game_id)
+    game_ids = {}
+    unmatched_games = defaultdict(list)
+    for steam_game in steam_games:
+        appid = steam_game["appid"]
+        if len(games_by_appid[appid]) > 1:
+            LOGGER.error("Multiple games with appid '%s'", appid)
+        elif games_by_appid[appid]:
+            game_ids[appid] = games_by_appid[appid][0]
+        else:
+            slug = slugify(steam_game["name"])[:50]
+            if slug:
+                unmatched_games[slug].append(steam_game)
+            else:
+                LOGGER.warning("Can't generate a slug for %s", steam_game["name"])
+
+    games_without_steamid = []
+    for game_id, slug, steamid in models.Game.objects.filter(
+        slug__in=list(unmatched_games)
+    ).values_list("id", "slug", "steamid"):
+        appid = unmatched_games[slug][0]["appid"]
+        if not steamid:
+            games_without_steamid.append(models.Game(pk=game_id, steamid=appid))
+        for steam_game in unmatched_games.pop(slug):
+            game_ids[steam_game["appid"]] = game_id
+    models.Game.objects.bulk_update(games_without_steamid, ["steamid"])
+    bump_game_versions(game.pk for game in games_without_steamid)
+
+    new_games = []
+    for slug, slug_steam_games in unmatched_games.items():
+        game = models.Game(
+            name=slug_steam_games[0]["name"],
+            steamid=slug_steam_games[0]["appid"],
+            slug=slug,
+            is_public=True,
+        )
+        game.media_urls = game.get_media_urls()
+        new_games.append(game)
+    # Games created concurrently are ignored here and picked up by the query below
+    models.Game.objects.bulk_create(new_games, ignore_conflicts=True)
+    forget_installer_slugs(unmatched_games)
+    created_ids = {}
+    for game_id, slug in models.Game.objects.filter(slug__in=list(unmatched_games)).values_list(
+        "id", "slug"
+    ):
+        for steam_game in unmatched_games[slug]:
+            game_ids[steam_game["appid"]] = game_id
+        created_ids[unmatched_games[slug][0]["appid"]] = game_id
+    return game_ids, created_ids
 
 
 def create_steam_installer(game):
@@ -3,23 +3,25 @@
 # lint: disable=too-few-public-methods
 from __future__ import absolute_import
 
-from django.core.exceptions import PermissionDenied
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db.models import Q
 from django.shortcuts import get_object_or_404
-from rest_framework import filters, generics, permissions, status
+from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import User
-from games import models, serializers
+from games import models, serializers, stats
+from games.cache import GAME_DETAIL_CACHE_TIMEOUT, get_game_detail_key
+from games.search import GameSearchFilter
 from providers.models import Provider
 
 
 class GameListView(generics.GenericAPIView):
     """Return a list of games"""
 
-    filter_backends = (filters.SearchFilter,)
-    search_fields = ("slug", "name")
+    filter_backends = (GameSearchFilter,)
 
     def get_queryset(self):
         """Return the query set for the game list
@@ -158,7 +160,24 @@ class GameDetailView(generics.RetrieveAPIView):
 
     serializer_class = serializers.GameDetailSerializer
     lookup_field = "slug"
-    queryset = models.Game.objects.filter(change_for__isnull=True)
+    queryset = models.Game.objects.filter(change_for__isnull=True).select_related(
+        "popularity_counter"
+    )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the payload from the cache while the game is unchanged"""
+        game = self.get_object()
+        cache_key = get_game_detail_key(game.id, "api")
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_serializer(game).data
+            cache.set(cache_key, data, GAME_DETAIL_CACHE_TIMEOUT)
+        # Library changes don't invalidate the payload, the user count is read from the counter
+        try:
+            data["user_count"] = game.popularity_counter.library_count
+        except ObjectDoesNotExist:
+            data["user_count"] = 0
+        return Response(data)
 
 
 class GameInstallersView(generics.RetrieveAPIView):
@@ -175,41 +194,20 @@ class GameStatsView(APIView):
     permission_classes = (permissions.IsAdminUser,)
 
     @staticmethod
-    def get(_request, _format=None):
-        """Return game statistics"""
-        statistics = {}
-
-        statistics["games"] = models.Game.objects.all().count()
-        statistics["published_games"] = models.Game.objects.filter(is_public=True).count()
-        statistics["unpublished_games"] = models.Game.objects.filter(is_public=False).count()
-        statistics["game_changes"] = models.Game.objects.filter(change_for__isnull=False).count()
-
-        statistics["game_submissions"] = models.GameSubmission.objects.all().count()
-        statistics["accepted_game_submissions"] = models.GameSubmission.objects.filter(
-            accepted_at__isnull=False
-        ).count()
-        statistics["pending_game_submissions"] = models.GameSubmission.objects.filter(
-            accepted_at__isnull=True,
-            game__change_for__isnull=True,
-        ).count()
-        statistics["pending_game_changes"] = models.GameSubmission.objects.filter(
-            accepted_at__isnull=True,
-            game__change_for__isnull=False,
-        ).count()
-        statistics["installers"] = models.Installer.objects.all().count()
-        statistics["published_installers"] = models.Installer.objects.get_filtered(
-            {"published": True}
-        ).count()
-        statistics["submitted_drafts"] = models.InstallerDraft.objects.filter(draft=False).count()
-        statistics["drafts"] = models.InstallerDraft.objects.all().count()
-        statistics["screenshots"] = models.Screenshot.objects.all().count()
-        statistics["published_screenshots"] = models.Screenshot.objects.filter(
-            published=True
-        ).count()
-        statistics["unpublished_screenshots"] = models.Screenshot.objects.filter(
-            published=False
-        ).count()
-
+    def get(request, _format=None):
+        """Return game statistics, with their history over the last days if requested"""
+        statistics = stats.get_statistics()
+        if "history" in request.GET:
+            try:
+                days = int(request.GET["history"])
+            except ValueError:
+                days = 0
+            if not 1 <= days <= stats.MAX_HISTORY_DAYS:
+                return Response(
+                    {"history": "Expected a number of days up to %s" % stats.MAX_HISTORY_DAYS},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            statistics["history"] = stats.get_statistics_history(days)
         return Response(statistics)
 
 
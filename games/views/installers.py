@@ -5,6 +5,7 @@ from __future__ import absolute_import
 
 import logging
 
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
 from rest_framework import generics, permissions, status
@@ -14,6 +15,7 @@ from rest_framework.views import APIView
 
 from common.permissions import IsAdminOrReadOnly
 from games import models, serializers
+from games.cache import GAME_DETAIL_CACHE_TIMEOUT, get_installers_key
 
 LOGGER = logging.getLogger(__name__)
 
@@ -36,6 +38,8 @@ class InstallerListView(generics.ListAPIView):
         created_to: installer creation period end
         updated_from: installer modification period start
         updated_to: installer modification period end
+        uses: script search tokens such as "dxvk winetricks:vcrun2019", installers
+            using any of them are returned
         order: order results by creation date (oldest, newest), default=newest
     """
 
@@ -54,7 +58,7 @@ class InstallerListView(generics.ListAPIView):
                 filter["draft"] = True
             elif params["revision"] == "final":
                 filter["draft"] = False
-        for param in {"created_from", "created_to", "updated_from", "updated_to"}:
+        for param in {"created_from", "created_to", "updated_from", "updated_to", "uses"}:
             if param in params:
                 filter[param] = params[param]
         order = self.request.GET.get("order")
@@ -88,6 +92,18 @@ class GameInstallerListView(generics.ListAPIView):
         slug = self.request.parser_context["kwargs"]["slug"]
         return models.Installer.objects.fuzzy_filter(slug)
 
+    def list(self, request, *args, **kwargs):
+        targets = models.Installer.objects.resolve_slug(kwargs["slug"])
+        if not targets or request.GET:
+            return super().list(request, *args, **kwargs)
+        # Cached until any of the games the slug could designate changes
+        cache_key = get_installers_key(kwargs["slug"], [game_id for _kind, game_id, _id in targets])
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, GAME_DETAIL_CACHE_TIMEOUT)
+        return Response(data)
+
 
 class SmallResultsSetPagination(PageNumberPagination):
     """Pagination used for heavier serializers that don't need a lot of data returned at once."""
@@ -10,7 +10,7 @@ from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.syndication.views import Feed
-from django.db.models import Q
+from django.db.models import F, Q
 from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -23,6 +23,7 @@ from sorl.thumbnail import get_thumbnail
 from accounts.decorators import user_confirmed_required
 from emails.messages import send_email
 from games import models
+from games.cache import GAME_DETAIL_CACHE_TIMEOUT, get_game_version
 from games.forms import (
     GameEditForm,
     GameForm,
@@ -41,6 +42,8 @@ from games.models import (
     InstallerIssue,
     Regression,
 )
+from games.search import search_games
+from games.util.installer_tokens import get_search_tokens
 from games.webhooks import (
     notify_installer,
     notify_issue_creation,
@@ -117,24 +120,32 @@ class GameList(ListView):
             "genres", "publisher", "developer", "platforms", "installers"
         )
         ordering = self.get_ordering()
-        if ordering:
-            if self.q_params["q"] and not self.q_params["search-installers"]:
-                queryset = queryset.order_by(ordering)
+        if ordering and ordering.lstrip("-") == "popularity":
+            # Library counters are current, Game.popularity is only refreshed daily
+            library_count = F("popularity_counter__library_count")
+            if ordering.startswith("-"):
+                ordering = library_count.desc(nulls_last=True)
             else:
-                queryset = queryset.order_by(ordering)
-        return self.get_filtered_queryset(queryset)
+                ordering = library_count.asc(nulls_first=True)
+        if ordering:
+            queryset = queryset.order_by(ordering)
+        queryset = self.get_filtered_queryset(queryset)
+        if self.q_params["q"] and not self.q_params["search-installers"]:
+            # Search results are ranked by relevance unless an order is requested
+            if "ordering" not in self.request.GET:
+                queryset = queryset.order_by("-search_rank", "name")
+        return queryset
 
     def get_filtered_queryset(self, queryset):
         """Build search query from the search parameters"""
         self.clean_search_query()
         if self.q_params["q"]:
             if self.q_params["search-installers"]:
-                queryset = queryset.filter(installers__content__icontains=self.q_params["q"])
-            else:
-                search_query = self.q_params["q"]
                 queryset = queryset.filter(
-                    Q(name__icontains=search_query) | Q(aliases__name__icontains=search_query)
+                    installers__search_tokens__overlap=get_search_tokens(self.q_params["q"])
                 )
+            else:
+                queryset = search_games(queryset, self.q_params["q"])
         if self.q_params["platforms"]:
             queryset = queryset.filter(platforms__pk__in=self.q_params["platforms"])
         if self.q_params["genres"]:
@@ -227,11 +238,11 @@ class GameList(ListView):
 
 def game_for_installer(_request, slug):
     """Redirects to the game details page from a valid installer slug"""
-    try:
-        installers = models.Installer.objects.fuzzy_get(slug)
-    except Installer.DoesNotExist:
+    targets = Installer.objects.resolve_slug(slug)
+    if not targets:
         raise Http404
-    return redirect(reverse("game_detail", kwargs={"slug": installers[0].game.slug}))
+    game = get_object_or_404(Game, pk=targets[0][1])
+    return redirect(reverse("game_detail", kwargs={"slug": game.slug}))
 
 
 def game_detail(request, slug):
@@ -250,8 +261,8 @@ def game_detail(request, slug):
             LOGGER.error("The slug '%s' was used multiple times", slug)
             return redirect(reverse("game_detail", kwargs={"slug": games[0].slug}))
     user = request.user
+    # Querysets and callables are only evaluated if the cached fragments are stale
     installers = game.installers.get_filtered({"published": True})
-    provider_links = game.get_provider_links()
 
     pending_change_subm_count = 0
 
@@ -285,6 +296,8 @@ def game_detail(request, slug):
         "games/detail.html",
         {
             "game": game,
+            "detail_version": get_game_version(game.id),
+            "cache_timeout": GAME_DETAIL_CACHE_TIMEOUT,
             "banner_options": {"crop": "top", "blur": "14x6"},
             "banner_size": "940x352",
             "in_library": in_library,
@@ -292,10 +305,10 @@ def game_detail(request, slug):
             "can_publish": user.is_staff and user.has_perm("games.can_publish_game"),
             "can_edit": user.is_staff and user.has_perm("games.change_game"),
             "installers": installers,
-            "auto_installers": game.get_default_installers(),
+            "auto_installers": game.get_default_installers,
             "unpublished_installers": unpublished_installers,
             "screenshots": screenshots,
-            "provider_links": provider_links,
+            "provider_links": game.get_provider_links,
             "no_ac_recommendations": no_ac_recommendations,
             "active_regressions": active_regressions,
         },
@@ -413,12 +426,12 @@ class InstallerFeed(Feed):
 
 def get_banner(request, slug):
     """Serve game title in an appropriate format for the client."""
-    try:
-        game = Game.objects.get(slug=slug)
-    except Game.DoesNotExist:
-        game = None
-    if not game or not game.title_logo:
+    game = get_object_or_404(Game.objects.only("slug", "title_logo", "rendered_media"), slug=slug)
+    if not game.title_logo:
         raise Http404
+    rendered_url = game.get_rendered_media_url("banner")
+    if rendered_url:
+        return redirect(rendered_url)
     try:
         thumbnail = get_thumbnail(game.title_logo, settings.BANNER_SIZE, crop="center")
     except AttributeError:
@@ -428,12 +441,12 @@ def get_banner(request, slug):
 
 
 def get_icon(request, slug):
-    try:
-        game = Game.objects.get(slug=slug)
-    except Game.DoesNotExist:
-        game = None
-    if not game or not game.icon:
+    game = get_object_or_404(Game.objects.only("slug", "icon", "rendered_media"), slug=slug)
+    if not game.icon:
         raise Http404
+    rendered_url = game.get_rendered_media_url("icon")
+    if rendered_url:
+        return redirect(rendered_url)
     try:
         thumbnail = get_thumbnail(game.icon, settings.ICON_SIZE, crop="center", format="PNG")
     except AttributeError:
@@ -443,10 +456,10 @@ def get_icon(request, slug):
 
 
 def get_coverart(request, slug):
-    game = get_object_or_404(Game, slug=slug)
+    game = get_object_or_404(Game.objects.only("slug", "coverart", "rendered_media"), slug=slug)
     if not game.coverart:
         raise Http404
-    return redirect(game.coverart.url)
+    return redirect(game.get_rendered_media_url("coverart") or game.coverart.url)
 
 
 def game_list(request):
@@ -0,0 +1,121 @@
+# pylint: disable=no-member
+"""In-memory index of the PCI ID database
+
+Resolving a PCI ID against the database takes several queries (vendor, device,
+subvendor, generation and features). The index loads those tables once per
+process and answers lookups without touching the database. Processes notice that
+the tables were reloaded through a version stamp stored in the cache.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+
+from hardware import models
+
+PCI_INDEX_VERSION_KEY = "hardware:pci-index:version"
+
+_PCI_INDEX = None
+_PCI_INDEX_VERSION = None
+_PCI_INDEX_LOCK = threading.Lock()
+
+
+def parse_pci_id(pci_id):
+    """Split a PCI ID in the form 'xxxx:xxxx xxxx:xxxx' into its 4 components"""
+    try:
+        device_pci_id, subdevice_pci_id = pci_id.split()
+    except ValueError as ex:
+        raise ValueError("Incomplete PCI ID. Use following format: xxxx:xxxx xxxx:xxxx") from ex
+    vendor_id, device_id = device_pci_id.split(":")
+    subvendor_id, subsystem_id = subdevice_pci_id.split(":")
+    return vendor_id, device_id, subvendor_id, subsystem_id
+
+
+class PCIIndex:
+    """Lookup tables for vendors, devices and GPU generations"""
+
+    __slots__ = ("devices", "generations", "vendors")
+
+    def __init__(self, vendors, devices, generations):
+        self.vendors = vendors  # vendor_id -> name
+        self.devices = devices  # (vendor_id, device_id) -> (name, generation_id)
+        self.generations = generations  # generation_id -> (name, features)
+
+    @classmethod
+    def load(cls):
+        """Build the index from the hardware tables"""
+        vendors = dict(models.Vendor.objects.values_list("vendor_id", "name"))
+        devices = {
+            (vendor_id, device_id): (name, generation_id)
+            for vendor_id, device_id, name, generation_id in models.Device.objects.values_list(
+                "vendor__vendor_id", "device_id", "name", "generation_id"
+            ).order_by("id")
+        }
+        generation_features = models.Generation.features.through.objects.values_list(
+            "generation_id", "feature__name", "feature__version", "feature__feature_level"
+        ).order_by("id")
+        features = {}
+        for generation_id, name, version, feature_level in generation_features:
+            features.setdefault(generation_id, []).append(
+                str(models.Feature(name=name, version=version, feature_level=feature_level))
+            )
+        generations = {
+            generation_id: (name, tuple(features.get(generation_id, ())))
+            for generation_id, name in models.Generation.objects.values_list("id", "name")
+        }
+        return cls(vendors, devices, generations)
+
+    def get_features(self, pci_id):
+        """Return hardware capabilities from a PCI ID"""
+        vendor_id, device_id, subvendor_id, _subsystem_id = parse_pci_id(pci_id)
+        try:
+            vendor_name = self.vendors[vendor_id]
+        except KeyError as ex:
+            raise ValueError(f"Invalid vendor {vendor_id}") from ex
+        try:
+            device_name, generation_id = self.devices[(vendor_id, device_id)]
+        except KeyError as ex:
+            raise ValueError(f"Unkown device {vendor_id}:{device_id}") from ex
+        generation_name, features = self.generations.get(generation_id, ("", ()))
+        return {
+            "vendor": vendor_name,
+            "device": device_name,
+            "subvendor": self.vendors.get(subvendor_id, "Unknown"),
+            "generation": generation_name,
+            "features": list(features),
+        }
+
+    def get_features_many(self, pci_ids):
+        """Return hardware capabilities for a comma separated list of PCI IDs.
+        Invalid or unknown PCI IDs are left out.
+        """
+        hardware_features = {}
+        for pci_id in pci_ids.split(","):
+            try:
+                hardware_features[pci_id] = self.get_features(pci_id)
+            except ValueError:
+                continue
+        return hardware_features
+
+
+def get_pci_index():
+    """Return the PCI index for this process, loading it if needed"""
+    global _PCI_INDEX, _PCI_INDEX_VERSION  # pylint: disable=global-statement
+    version = cache.get(PCI_INDEX_VERSION_KEY)
+    pci_index = _PCI_INDEX
+    if pci_index is not None and version == _PCI_INDEX_VERSION:
+        return pci_index
+    with _PCI_INDEX_LOCK:
+        if _PCI_INDEX is None or version != _PCI_INDEX_VERSION:
+            _PCI_INDEX = PCIIndex.load()
+            _PCI_INDEX_VERSION = version
+        return _PCI_INDEX
+
+
+def reset_pci_index():
+    """Discard the PCI index in every process after the hardware tables changed"""
+    global _PCI_INDEX  # pylint: disable=global-statement
+    cache.set(PCI_INDEX_VERSION_KEY, time.time_ns(), timeout=None)
+    with _PCI_INDEX_LOCK:
+        _PCI_INDEX = None
@@ -3,8 +3,10 @@ import json
 import logging
 
 from django.conf import settings
+from django.db import transaction
 
 from hardware import models
+from hardware.index import reset_pci_index
 
 LOGGER = logging.getLogger(__name__)
 
@@ -57,75 +59,229 @@ GPU_GENERATION_FEATURE_MAP = {
 }
 
 
-def load_from_pci_ids():
-    """Load IDs from https://pci-ids.ucw.cz/v2.2/pci.ids"""
-    pci_ids_path = settings.MEDIA_ROOT + "/pci.ids"
-    LOGGER.info("Reading PCI IDs from %s", pci_ids_path)
-    data_started = False
+PCI_IDS_BATCH_SIZE = 2000
+# Rows missing from a pci.ids file with less than this share of the existing rows
+# are kept, the file is most likely truncated
+PCI_IDS_MIN_SIZE_RATIO = 0.5
+
+
+def parse_pci_ids(lines):
+    """Parse the vendor, device and subsystem sections of a pci.ids file
+
+    Returns:
+        tuple: Vendor names by vendor ID, (name, comment) by (vendor ID, device ID)
+        and subsystem names by (vendor ID, device ID, subvendor ID, subdevice ID).
+    """
+    vendors = {}
+    devices = {}
+    subsystems = {}
+    vendor_id = device_id = None
     comment_for_next_dev = ""
-    device = None
-    with open(pci_ids_path, encoding="utf-8") as pci_ids_file:
-        for line in pci_ids_file.readlines():
-            if line and line[0].isdigit():
-                data_started = True
-            if not data_started:
+    for line in lines:
+        line = line.rstrip("\n")
+        if not line:
+            continue
+        if line.startswith("#"):
+            if vendor_id:
+                comment_for_next_dev = line[2:].strip()
+            continue
+        if line.startswith("\t\t"):
+            if not device_id:
                 continue
-            if line.startswith("#"):
-                comment_for_next_dev = line[2:]
+            subvendor_id, subdevice_id, name = line.strip().split(maxsplit=2)
+            subsystems[(vendor_id, device_id, subvendor_id, subdevice_id)] = name
+        elif line.startswith("\t"):
+            if not vendor_id:
                 continue
-            if line[0].isdigit():
-                vendor_id, vendor_name = line.strip().split(maxsplit=1)
-                vendor, created = models.Vendor.objects.get_or_create(
-                    vendor_id=vendor_id, name=vendor_name
-                )
-                if created:
-                    LOGGER.info("Created vendor %s", vendor)
-            if line.startswith("\t\t"):
-                subvendor_id, subdevice_id, name = line.strip().split(maxsplit=2)
-                try:
-                    subsystem = models.Subsystem.objects.get(
-                        device=device, subvendor_id=subvendor_id, subdevice_id=subdevice_id
-                    )
-                    if subsystem.name != name:
-                        subsystem.name = name
-                        subsystem.save()
-                except models.Subsystem.DoesNotExist:
-                    subsystem = models.Subsystem.objects.create(
-                        device=device,
-                        subvendor_id=subvendor_id,
-                        subdevice_id=subdevice_id,
-                        name=name,
-                    )
-                    LOGGER.info("Created subsystem %s", subsystem)
-            elif line.startswith("\t"):
-                device_id, name = line.strip().split(maxsplit=1)
-                try:
-                    device = models.Device.objects.get(
-                        vendor=vendor,
-                        device_id=device_id,
-                    )
-                    device_changed = False
-                    if device.name != name:
-                        device.name = name
-                        device_changed = True
-                    if comment_for_next_dev:
-                        device.comment = comment_for_next_dev
-                        comment_for_next_dev = ""
-                        device_changed = True
-                    if device_changed:
-                        device.save()
-                except models.Device.DoesNotExist:
-                    device = models.Device.objects.create(
-                        vendor=vendor,
-                        device_id=device_id,
-                        name=name,
-                        comment=comment_for_next_dev,
-                    )
-                    if comment_for_next_dev:
-                        comment_for_next_dev = ""
-                    LOGGER.info("Created device %s", device)
-            elif line.startswith("ffff"):
-                return
+            device_id, name = line.strip().split(maxsplit=1)
+            devices[(vendor_id, device_id)] = (name, comment_for_next_dev)
+            comment_for_next_dev = ""
+        elif line.startswith("ffff") or line.startswith("C "):
+            # The device classes list starts after the last vendor
+            break
+        else:
+            vendor_id, name = line.strip().split(maxsplit=1)
+            vendors[vendor_id] = name
+            device_id = None
+    return vendors, devices, subsystems
+
+
+def _bulk_delete(queryset, pks):
+    """Delete rows by primary key in batches"""
+    pks = list(pks)
+    for index in range(0, len(pks), PCI_IDS_BATCH_SIZE):
+        queryset.filter(pk__in=pks[index : index + PCI_IDS_BATCH_SIZE]).delete()
+
+
+def _is_safe_to_remove(vendors, devices, subsystems):
+    """Return whether a parsed pci.ids file is complete enough to remove the rows
+    missing from it
+    """
+    parsed_count = len(vendors) + len(devices) + len(subsystems)
+    existing_count = (
+        models.Vendor.objects.count()
+        + models.Device.objects.count()
+        + models.Subsystem.objects.count()
+    )
+    if not parsed_count or parsed_count < existing_count * PCI_IDS_MIN_SIZE_RATIO:
+        LOGGER.error(
+            "Not removing hardware missing from pci.ids, it has %s entries for %s in the database",
+            parsed_count,
+            existing_count,
+        )
+        return False
+    return True
+
+
+def load_from_pci_ids(pci_ids_path=None, remove_missing=False):
+    """Load IDs from https://pci-ids.ucw.cz/v2.2/pci.ids
+
+    The file is parsed in memory and compared to the existing vendors, devices
+    and subsystems, only the differences are written to the database.
+    Rows missing from the file are only removed with remove_missing, and never when
+    the file is much smaller than the existing tables. Devices linked to a generation
+    are always kept, along with their vendor.
+    """
+    pci_ids_path = pci_ids_path or settings.MEDIA_ROOT + "/pci.ids"
+    LOGGER.info("Reading PCI IDs from %s", pci_ids_path)
+    with open(pci_ids_path, encoding="utf-8") as pci_ids_file:
+        vendors, devices, subsystems = parse_pci_ids(pci_ids_file)
+    remove_missing = remove_missing and _is_safe_to_remove(vendors, devices, subsystems)
+    stats = {}
+
+    existing_vendors = {
+        vendor_id: (pk, name)
+        for pk, vendor_id, name in models.Vendor.objects.values_list("pk", "vendor_id", "name")
+    }
+    new_vendors = [
+        models.Vendor(vendor_id=vendor_id, name=name)
+        for vendor_id, name in vendors.items()
+        if vendor_id not in existing_vendors
+    ]
+    changed_vendors = [
+        models.Vendor(pk=pk, name=vendors[vendor_id])
+        for vendor_id, (pk, name) in existing_vendors.items()
+        if vendor_id in vendors and vendors[vendor_id] != name
+    ]
+    removed_vendors = []
+    if remove_missing:
+        curated_vendors = set(
+            models.Device.objects.filter(generation__isnull=False).values_list(
+                "vendor__vendor_id", flat=True
+            )
+        )
+        removed_vendors = [
+            pk
+            for vendor_id, (pk, _name) in existing_vendors.items()
+            if vendor_id not in vendors and vendor_id not in curated_vendors
+        ]
+    with transaction.atomic():
+        models.Vendor.objects.bulk_create(new_vendors, batch_size=PCI_IDS_BATCH_SIZE)
+        models.Vendor.objects.bulk_update(changed_vendors, ["name"], batch_size=PCI_IDS_BATCH_SIZE)
+        _bulk_delete(models.Vendor.objects, removed_vendors)
+    stats["vendors"] = {
+        "added": len(new_vendors),
+        "changed": len(changed_vendors),
+        "removed": len(removed_vendors),
+    }
+    vendor_pks = {vendor_id: pk for vendor_id, (pk, _name) in existing_vendors.items()}
+    vendor_pks.update({vendor.vendor_id: vendor.pk for vendor in new_vendors})
+
+    existing_devices = {}
+    removed_devices = []
+    device_rows = models.Device.objects.values_list(
+        "pk", "vendor__vendor_id", "device_id", "name", "comment", "generation_id"
+    ).order_by("pk")
+    for pk, vendor_id, device_id, name, comment, generation_id in device_rows:
+        key = (vendor_id, device_id)
+        if key in existing_devices:
+            # Duplicates are removed, unless someone linked them to a generation
+            if generation_id is None:
+                removed_devices.append(pk)
+        elif key not in devices:
+            if remove_missing and generation_id is None:
+                removed_devices.append(pk)
+        else:
+            existing_devices[key] = (pk, name, comment)
+    new_device_keys = [key for key in devices if key not in existing_devices]
+    new_devices = [
+        models.Device(
+            vendor_id=vendor_pks[vendor_id],
+            device_id=device_id,
+            name=devices[(vendor_id, device_id)][0],
+            comment=devices[(vendor_id, device_id)][1],
+        )
+        for vendor_id, device_id in new_device_keys
+    ]
+    changed_devices = [
+        models.Device(pk=pk, name=devices[key][0], comment=devices[key][1])
+        for key, (pk, name, comment) in existing_devices.items()
+        if devices[key] != (name, comment)
+    ]
+    with transaction.atomic():
+        _bulk_delete(models.Device.objects, removed_devices)
+        models.Device.objects.bulk_create(new_devices, batch_size=PCI_IDS_BATCH_SIZE)
+        models.Device.objects.bulk_update(
+            changed_devices, ["name", "comment"], batch_size=PCI_IDS_BATCH_SIZE
+        )
+    stats["devices"] = {
+        "added": len(new_devices),
+        "changed": len(changed_devices),
+        "removed": len(removed_devices),
+    }
+    device_pks = {key: pk for key, (pk, _name, _comment) in existing_devices.items()}
+    device_pks.update(
+        {key: device.pk for key, device in zip(new_device_keys, new_devices, strict=True)}
+    )
+
+    existing_subsystems = {}
+    removed_subsystems = []
+    subsystem_rows = models.Subsystem.objects.values_list(
+        "pk",
+        "device__vendor__vendor_id",
+        "device__device_id",
+        "subvendor_id",
+        "subdevice_id",
+        "name",
+    ).order_by("pk")
+    for pk, vendor_id, device_id, subvendor_id, subdevice_id, name in subsystem_rows:
+        key = (vendor_id, device_id, subvendor_id, subdevice_id)
+        if key in existing_subsystems:
+            removed_subsystems.append(pk)
+        elif key not in subsystems:
+            if remove_missing:
+                removed_subsystems.append(pk)
+        else:
+            existing_subsystems[key] = (pk, name)
+    new_subsystems = [
+        models.Subsystem(
+            device_id=device_pks[(vendor_id, device_id)],
+            subvendor_id=subvendor_id,
+            subdevice_id=subdevice_id,
+            name=name,
+        )
+        for (vendor_id, device_id, subvendor_id, subdevice_id), name in subsystems.items()
+        if (vendor_id, device_id, subvendor_id, subdevice_id) not in existing_subsystems
+    ]
+    changed_subsystems = [
+        models.Subsystem(pk=pk, name=subsystems[key])
+        for key, (pk, name) in existing_subsystems.items()
+        if subsystems[key] != name
+    ]
+    with transaction.atomic():
+        _bulk_delete(models.Subsystem.objects, removed_subsystems)
+        models.Subsystem.objects.bulk_create(new_subsystems, batch_size=PCI_IDS_BATCH_SIZE)
+        models.Subsystem.objects.bulk_update(
+            changed_subsystems, ["name"], batch_size=PCI_IDS_BATCH_SIZE
+        )
+    stats["subsystems"] = {
+        "added": len(new_subsystems),
+        "changed": len(changed_subsystems),
+        "removed": len(removed_subsystems),
+    }
+    LOGGER.info("PCI IDs loaded: %s", stats)
+    reset_pci_index()
+    return stats
 
 
 def load_features():
@@ -197,3 +353,4 @@ def load_generations_to_devices():
                 if device.generation != generations[generation_name]:
                     device.generation = generations[generation_name]
                     device.save()
+    reset_pci_index()
@@ -1 +1,170 @@
-# Create your tests here.
+# pylint: disable=missing-docstring
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.urls import reverse
+
+from hardware import models, tasks
+from hardware.index import get_pci_index, reset_pci_index
+
+
+class TestPCIIndex(TestCase):
+    def setUp(self):
+        nvidia = models.Vendor.objects.create(vendor_id="10de", name="NVIDIA Corporation")
+        models.Vendor.objects.create(vendor_id="1462", name="Micro-Star International")
+        generation = models.Generation.objects.create(
+            vendor=nvidia, name="Pascal", year=2016, introduced_with="GeForce GTX 1080"
+        )
+        generation.features.add(
+            models.Feature.objects.create(name="Vulkan", version="1.3"),
+            models.Feature.objects.create(name="Direct3D", version="12", feature_level="12_1"),
+        )
+        models.Device.objects.create(
+            vendor=nvidia, device_id="1b80", name="GP104 [GeForce GTX 1080]", generation=generation
+        )
+        models.Device.objects.create(vendor=nvidia, device_id="0020", name="NV4 [Riva TNT]")
+        reset_pci_index()
+
+    def test_lookup_returns_hardware_features(self):
+        self.assertEqual(
+            get_pci_index().get_features("10de:1b80 1462:3362"),
+            {
+                "vendor": "NVIDIA Corporation",
+                "device": "GP104 [GeForce GTX 1080]",
+                "subvendor": "Micro-Star International",
+                "generation": "Pascal",
+                "features": ["Vulkan 1.3", "Direct3D 12 (12_1)"],
+            },
+        )
+
+    def test_lookup_without_generation(self):
+        features = get_pci_index().get_features("10de:0020 ffff:0000")
+        self.assertEqual(features["subvendor"], "Unknown")
+        self.assertEqual(features["generation"], "")
+        self.assertEqual(features["features"], [])
+
+    def test_invalid_pci_ids_raise_value_error(self):
+        pci_index = get_pci_index()
+        for pci_id in ("10de:1b80", "abcd:1b80 1462:3362", "10de:ffff 1462:3362"):
+            with self.assertRaises(ValueError):
+                pci_index.get_features(pci_id)
+
+    def test_batch_lookup_runs_no_queries(self):
+        get_pci_index()
+        with self.assertNumQueries(0):
+            hardware_features = get_pci_index().get_features_many(
+                "10de:1b80 1462:3362,10de:0020 1462:0000,invalid"
+            )
+        self.assertEqual(list(hardware_features), ["10de:1b80 1462:3362", "10de:0020 1462:0000"])
+
+    def test_index_is_rebuilt_after_reset(self):
+        get_pci_index()
+        models.Device.objects.filter(device_id="0020").update(name="NV4")
+        reset_pci_index()
+        self.assertEqual(get_pci_index().get_features("10de:0020 1462:0000")["device"], "NV4")
+
+    def test_features_view(self):
+        response = self.client.get(reverse("hardware_features"), {"pci_ids": "10DE:1B80 1462:3362"})
+        self.assertEqual(response.json()["10de:1b80 1462:3362"]["generation"], "Pascal")
+
+
+PCI_IDS = """# List of PCI ID's
+#
+# Syntax:
+# vendor  vendor_name
+#	device  device_name				<-- single tab
+#		subvendor subdevice  subsystem_name	<-- two tabs
+
+0001  SafeNet (wrong ID)
+10de  NVIDIA Corporation
+# Tesla
+	0020  NV4 [Riva TNT]
+		1043 0200  V3400 TNT
+	1b80  GP104 [GeForce GTX 1080]
+		1462 3362  GeForce GTX 1080 Gaming X
+abcd  Hex Vendor
+	0001  Hex Device
+ffff  Illegal Vendor ID
+
+# List of known device classes, subclasses and programming interfaces
+C 00  Unclassified device
+	00  Non-VGA unclassified device
+"""
+
+
+class TestLoadFromPCIIds(TestCase):
+    def setUp(self):
+        self.pci_ids_path = os.path.join(tempfile.mkdtemp(), "pci.ids")
+        self.write_pci_ids(PCI_IDS)
+
+    def tearDown(self):
+        shutil.rmtree(os.path.dirname(self.pci_ids_path))
+
+    def write_pci_ids(self, content):
+        with open(self.pci_ids_path, "w", encoding="utf-8") as pci_ids_file:
+            pci_ids_file.write(content)
+
+    def test_initial_import(self):
+        stats = tasks.load_from_pci_ids(self.pci_ids_path)
+        self.assertEqual(stats["vendors"]["added"], 3)
+        self.assertEqual(stats["devices"]["added"], 3)
+        self.assertEqual(stats["subsystems"]["added"], 2)
+        device = models.Device.objects.get(vendor__vendor_id="10de", device_id="0020")
+        self.assertEqual(device.comment, "Tesla")
+        self.assertTrue(models.Device.objects.filter(vendor__vendor_id="abcd").exists())
+        self.assertFalse(models.Vendor.objects.filter(vendor_id="ffff").exists())
+
+    def write_updated_pci_ids(self):
+        self.write_pci_ids(
+            PCI_IDS.replace("# Tesla\n\t0020  NV4 [Riva TNT]\n\t\t1043 0200  V3400 TNT\n", "")
+            .replace("GeForce GTX 1080 Gaming X", "GTX 1080 Gaming X 8G")
+            .replace("Hex Vendor", "Hexadecimal Vendor")
+        )
+
+    def test_reimport_only_applies_differences(self):
+        tasks.load_from_pci_ids(self.pci_ids_path)
+        self.write_updated_pci_ids()
+        stats = tasks.load_from_pci_ids(self.pci_ids_path, remove_missing=True)
+        self.assertEqual(stats["vendors"], {"added": 0, "changed": 1, "removed": 0})
+        self.assertEqual(stats["devices"], {"added": 0, "changed": 0, "removed": 1})
+        self.assertEqual(stats["subsystems"], {"added": 0, "changed": 1, "removed": 0})
+        self.assertEqual(
+            models.Subsystem.objects.get(subvendor_id="1462").name, "GTX 1080 Gaming X 8G"
+        )
+        self.assertFalse(models.Subsystem.objects.filter(subvendor_id="1043").exists())
+
+    def test_missing_rows_are_kept_by_default(self):
+        tasks.load_from_pci_ids(self.pci_ids_path)
+        self.write_updated_pci_ids()
+        stats = tasks.load_from_pci_ids(self.pci_ids_path)
+        self.assertEqual(stats["devices"], {"added": 0, "changed": 0, "removed": 0})
+        self.assertEqual(stats["subsystems"], {"added": 0, "changed": 1, "removed": 0})
+        self.assertTrue(models.Subsystem.objects.filter(subvendor_id="1043").exists())
+
+    def test_truncated_file_removes_nothing(self):
+        tasks.load_from_pci_ids(self.pci_ids_path)
+        self.write_pci_ids("0001  SafeNet (wrong ID)\n")
+        stats = tasks.load_from_pci_ids(self.pci_ids_path, remove_missing=True)
+        for table_stats in stats.values():
+            self.assertEqual(table_stats["removed"], 0)
+        self.assertEqual(models.Device.objects.count(), 3)
+
+    def test_devices_with_a_generation_are_kept(self):
+        tasks.load_from_pci_ids(self.pci_ids_path)
+        vendor = models.Vendor.objects.get(vendor_id="abcd")
+        generation = models.Generation.objects.create(vendor=vendor, name="Hex", year=2000)
+        models.Device.objects.filter(vendor=vendor).update(generation=generation)
+        self.write_pci_ids(PCI_IDS.replace("abcd  Hex Vendor\n\t0001  Hex Device\n", ""))
+        stats = tasks.load_from_pci_ids(self.pci_ids_path, remove_missing=True)
+        self.assertEqual(stats["vendors"]["removed"], 0)
+        self.assertEqual(stats["devices"]["removed"], 0)
+        device = models.Device.objects.get(vendor__vendor_id="abcd")
+        self.assertEqual(device.generation, generation)
+
+    def test_unchanged_reimport_is_a_noop(self):
+        tasks.load_from_pci_ids(self.pci_ids_path)
+        stats = tasks.load_from_pci_ids(self.pci_ids_path)
+        for table_stats in stats.values():
+            self.assertEqual(table_stats, {"added": 0, "changed": 0, "removed": 0})
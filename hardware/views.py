@@ -1,10 +1,9 @@
-# pylint: disable=no-member
 """Hardware API views"""
 
 from rest_framework import views
 from rest_framework.response import Response
 
-from hardware import models
+from hardware.index import get_pci_index
 
 
 class HardwareInfoView(views.APIView):
@@ -15,10 +14,11 @@ class HardwareInfoView(views.APIView):
         pci_ids = request.GET.get("pci_ids", "").lower()
         if not pci_ids:
             return Response({"error": "No pci_ids given"})
+        pci_index = get_pci_index()
         response = {}
         for pci_id in pci_ids.split(","):
             try:
-                response[pci_id] = models.get_hardware_features(pci_id)
+                response[pci_id] = pci_index.get_features(pci_id)
             except ValueError as ex:
                 return Response({"error": str(ex)})
         return Response(response)
@@ -138,6 +138,7 @@ INSTALLED_APPS = [
     "django.contrib.humanize",
     "django.contrib.admin",
     "django.contrib.admindocs",
+    "django.contrib.postgres",
     "sorl.thumbnail",
     "rest_framework",
     "rest_framework.authtoken",
@@ -167,6 +168,7 @@ INSTALLED_APPS = [
 BANNER_SIZE = "184x69"
 ICON_SIZE = "128x128"
 ICON_LARGE_SIZE = "256x256"
+COVERART_SIZE = "264x352"
 THUMBNAIL_ENGINE = "sorl.thumbnail.engines.convert_engine.Engine"
 THUMBNAIL_COLORSPACE = "sRGB"
 
@@ -199,6 +201,13 @@ TWITCH_CLIENT_SECRET = os.environ.get("TWITCH_CLIENT_SECRET")
 
 CLOUDFLARE_ZONE_ID = os.environ.get("CLOUDFLARE_ZONE_ID")
 CLOUDFLARE_API_TOKEN = os.environ.get("CLOUDFLARE_API_TOKEN")
+CLOUDFLARE_API_URL = "https://api.cloudflare.com/client/v4"
+# Cloudflare accepts up to 30 URLs per purge request, 500 on Enterprise plans
+CLOUDFLARE_PURGE_BATCH_SIZE = int(os.environ.get("CLOUDFLARE_PURGE_BATCH_SIZE", 30))
+CLOUDFLARE_PURGE_MAX_BATCHES = 20
+# Seconds to wait after a failed purge, doubled on each consecutive failure
+CLOUDFLARE_PURGE_BACKOFF = 60
+CLOUDFLARE_PURGE_MAX_BACKOFF = 3600
 
 # django-allauth configuration
 ACCOUNT_LOGIN_METHODS = {"username"}
@@ -253,6 +262,10 @@ EMAIL_SUBJECT_PREFIX = "[Lutris] "
 # Celery
 CELERY_WORKER_HIJACK_ROOT_LOGGER = False
 CELERY_BEAT_SCHEDULE = {
+    "flush-cloudflare-purges": {
+        "task": "common.tasks.flush_cloudflare_purges",
+        "schedule": crontab(),
+    },
     "clear-spammers": {
         "task": "accounts.tasks.clear_spammers",
         "schedule": crontab(minute=4),
@@ -273,6 +286,22 @@ CELERY_BEAT_SCHEDULE = {
         "task": "games.tasks.remove_empty_game_changes",
         "schedule": crontab(hour=7, minute=9),
     },
+    "prune_library_tombstones": {
+        "task": "games.tasks.prune_library_tombstones",
+        "schedule": crontab(hour=4, minute=20),
+    },
+    "populate_popularity": {
+        "task": "games.tasks.populate_popularity",
+        "schedule": crontab(hour=4, minute=30),
+    },
+    "update_search_documents": {
+        "task": "games.tasks.update_search_documents",
+        "schedule": crontab(hour=4, minute=40),
+    },
+    "record_game_statistics": {
+        "task": "games.tasks.record_game_statistics",
+        "schedule": crontab(minute=15),
+    },
     "auto_accept_installers": {
         "task": "games.tasks.auto_accept_installers",
         "schedule": crontab(hour=7, minute=12),
@@ -325,6 +354,10 @@ CELERY_BEAT_SCHEDULE = {
         "task": "providers.tasks.umu.update_umu_games",
         "schedule": crontab(hour=5, minute=45),
     },
+    "import-tosec": {
+        "task": "tosec.tasks.import_tosec",
+        "schedule": crontab(hour=6, minute=15),
+    },
 }
 
 REDIS_HOST = os.environ.get("REDIS_HOST", "localhost")
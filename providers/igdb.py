@@ -1,7 +1,17 @@
 """Support for IDGB"""
 
+import threading
+import time
+
 import requests
 
+# IGDB allows 4 requests per second and up to 8 open requests
+# https://api-docs.igdb.com/#rate-limits
+IGDB_REQUESTS_PER_SECOND = 4
+IGDB_MAX_OPEN_REQUESTS = 8
+# Connection and read timeouts of API requests, in seconds
+IGDB_TIMEOUT = (10, 60)
+
 GAME_CATEGORIES = {
     0: "main_game",
     1: "dlc_addon",
@@ -19,40 +29,94 @@ GAME_CATEGORIES = {
 }
 
 
+class RateLimiter:
+    """Token bucket shared by the threads sending requests to an API"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request can be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now >= self.updated_at:
+                    self.tokens = min(
+                        self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                    )
+                    self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = max(self.updated_at - now, 0) + (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, delay):
+        """Stop handing out tokens for the given number of seconds, after a 429 for example"""
+        with self.lock:
+            self.tokens = 0
+            self.updated_at = max(self.updated_at, time.monotonic() + delay)
+
+
 class IGDBClient:
     """API client for the IGDB API"""
 
     base_url = "https://api.igdb.com/v4/"
+    auth_url = "https://id.twitch.tv/oauth2/token"
     page_size = 200
 
     def __init__(self, client_id, client_secret):
         self.client_id = client_id
         self.client_secret = client_secret
         self.access_token = None
+        self.rate_limiter = RateLimiter(IGDB_REQUESTS_PER_SECOND)
 
     def get_authentication_token(self):
         """Request a new token from Twitch"""
         if not self.client_id:
             raise RuntimeError("No client ID set for Twitch")
         response = requests.post(
-            "https://id.twitch.tv/oauth2/token",
+            self.auth_url,
             data={
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
                 "grant_type": "client_credentials",
             },
+            timeout=IGDB_TIMEOUT,
         )
         self.access_token = response.json()["access_token"]
         return self.access_token
 
-    def get_resources(self, url, page):
-        """Generic method to access all API endpoints"""
+    def query(self, url, query):
+        """Send an APICalypse query to an endpoint.
+        Safe to call from several threads, requests are throttled by the rate limiter.
+        """
+        self.rate_limiter.acquire()
         return requests.post(
             self.base_url + url,
-            data=(
-                f"fields: *; sort updated_at desc;"
-                f" limit {self.page_size};"
-                f" offset {self.page_size * page - 1};"
-            ),
+            data=query,
             headers={"Client-ID": self.client_id, "Authorization": f"Bearer {self.access_token}"},
+            timeout=IGDB_TIMEOUT,
         )
+
+    def get_resources(self, url, after_id, until_id):
+        """Return the response listing the resources of an endpoint whose IDs are greater
+        than after_id and up to until_id, in ID order. A range of page_size IDs fits in a
+        single response.
+        """
+        return self.query(
+            url,
+            f"fields *; where id > {after_id} & id <= {until_id};"
+            f" sort id asc; limit {self.page_size};",
+        )
+
+    def get_last_id(self, url):
+        """Return the highest resource ID of an endpoint, 0 if it has no resources"""
+        response = self.query(url, "fields id; sort id desc; limit 1;")
+        response.raise_for_status()
+        resources = response.json()
+        return resources[0]["id"] if resources else 0
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.11 on 2026-10-18 04:59
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep only the most recent row for each key, required by the unique constraints"""
+    for model_name, key in (
+        ('ProviderCover', 'image_id'),
+        ('ProviderGenre', 'slug'),
+        ('ProviderPlatform', 'slug'),
+    ):
+        model = apps.get_model('providers', model_name)
+        duplicates = (
+            model.objects.values('provider', key)
+            .annotate(count=Count('id'), keep_id=Max('id'))
+            .filter(count__gt=1)
+        )
+        for duplicate in duplicates:
+            model.objects.filter(
+                provider=duplicate['provider'], **{key: duplicate[key]}
+            ).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0013_alter_providergame_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='providercover',
+            unique_together={('image_id', 'provider')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='providergenre',
+            unique_together={('slug', 'provider')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='providerplatform',
+            unique_together={('slug', 'provider')},
+        ),
+    ]
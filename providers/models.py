@@ -7,6 +7,8 @@ import logging
 from django.db import models
 from django.utils.timezone import make_aware
 
+from games.cache import bump_game_versions
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -25,22 +27,73 @@ class Provider(models.Model):
 class ProviderResource(models.Model):
     """Base model with functionality to import from IGDB API"""
 
+    # Field identifying a resource within a provider, used as upsert key
+    igdb_key = "slug"
+    # Fields written on bulk upserts of IGDB payloads
+    igdb_fields = ("name", "internal_id", "updated_at", "metadata")
+
     class Meta:
         """Set as abstract model"""
 
         abstract = True
 
     @classmethod
-    def create_from_igdb_api(cls, provider, api_payload):
-        """Create an instance from an IGDB payload"""
+    def from_igdb_api(cls, provider, api_payload):
+        """Return an unsaved instance built from an IGDB payload"""
         if "slug" not in api_payload:
             raise ValueError("API payload missing 'slug' field in {}".format(api_payload))
-        resource, _created = cls.objects.get_or_create(provider=provider, slug=api_payload["slug"])
-        resource.name = api_payload["name"]
-        resource.internal_id = api_payload["id"]
-        resource.updated_at = make_aware(datetime.datetime.fromtimestamp(api_payload["updated_at"]))
-        resource.metadata = api_payload
-        resource.save()
+        return cls(
+            provider=provider,
+            slug=api_payload["slug"],
+            name=api_payload["name"],
+            internal_id=api_payload["id"],
+            updated_at=make_aware(datetime.datetime.fromtimestamp(api_payload["updated_at"])),
+            metadata=api_payload,
+        )
+
+    @classmethod
+    def bulk_upsert_from_igdb_api(cls, provider, api_payloads):
+        """Create or update the instances for a page of IGDB payloads in a single statement.
+        Resources whose updated_at has not changed since the last import are left alone.
+
+        Returns:
+            int: Number of resources written
+        """
+        resources = {}
+        for api_payload in api_payloads:
+            try:
+                resource = cls.from_igdb_api(provider, api_payload)
+            except (KeyError, ValueError) as ex:
+                LOGGER.warning("Invalid IGDB payload for %s: %s", cls.__name__, ex)
+                continue
+            if resource is not None:
+                resources[getattr(resource, cls.igdb_key)] = resource
+        if not resources:
+            return 0
+        stored_updates = dict(
+            cls.objects.filter(
+                provider=provider, **{f"{cls.igdb_key}__in": list(resources)}
+            ).values_list(cls.igdb_key, "updated_at")
+        )
+        changed_resources = [
+            resource
+            for key, resource in resources.items()
+            if key not in stored_updates
+            or resource.updated_at is None
+            or stored_updates[key] != resource.updated_at
+        ]
+        cls.objects.bulk_create(
+            changed_resources,
+            update_conflicts=True,
+            unique_fields=["provider", cls.igdb_key],
+            update_fields=cls.igdb_fields,
+        )
+        cls.after_bulk_upsert(changed_resources)
+        return len(changed_resources)
+
+    @classmethod
+    def after_bulk_upsert(cls, resources):
+        """Called with the resources written by a bulk upsert, which sends no signals"""
 
 
 class ProviderGame(ProviderResource):
@@ -65,6 +118,15 @@ class ProviderGame(ProviderResource):
     def __str__(self):
         return f"[{self.provider}] {self.name or self.slug}"
 
+    @classmethod
+    def after_bulk_upsert(cls, resources):
+        """Invalidate the cached pages of the games linked to updated provider games"""
+        bump_game_versions(
+            cls.games.through.objects.filter(
+                providergame_id__in=[resource.pk for resource in resources]
+            ).values_list("game_id", flat=True)
+        )
+
     @staticmethod
     def autocomplete_search_fields():
         """Autocomplete fields used in the Django admin"""
@@ -81,6 +143,11 @@ class ProviderGenre(ProviderResource):
     updated_at = models.DateTimeField(null=True)
     metadata = models.JSONField(null=True)
 
+    class Meta:
+        """Model configuration"""
+
+        unique_together = [["slug", "provider"]]
+
 
 class ProviderPlatform(ProviderResource):
     """Platforms given by providers"""
@@ -92,6 +159,11 @@ class ProviderPlatform(ProviderResource):
     updated_at = models.DateTimeField(null=True)
     metadata = models.JSONField(null=True)
 
+    class Meta:
+        """Model configuration"""
+
+        unique_together = [["slug", "provider"]]
+
 
 class ProviderCover(ProviderResource):
     """Platforms given by providers"""
@@ -102,15 +174,26 @@ class ProviderCover(ProviderResource):
     updated_at = models.DateTimeField(null=True)
     metadata = models.JSONField(null=True)
 
+    igdb_key = "image_id"
+    igdb_fields = ("game", "updated_at", "metadata")
+
+    class Meta:
+        """Model configuration"""
+
+        unique_together = [["image_id", "provider"]]
+
     @classmethod
-    def create_from_igdb_api(cls, provider, api_payload):
-        """Create an instance from an IGDB payload"""
-        resource, _created = cls.objects.get_or_create(
-            provider=provider, image_id=api_payload["image_id"]
+    def from_igdb_api(cls, provider, api_payload):
+        """Return an unsaved instance built from an IGDB payload, None if it has no game"""
+        if "game" not in api_payload:
+            return None
+        updated_at = None
+        if api_payload.get("updated_at"):
+            updated_at = make_aware(datetime.datetime.fromtimestamp(api_payload["updated_at"]))
+        return cls(
+            provider=provider,
+            image_id=api_payload["image_id"],
+            game=api_payload["game"],
+            updated_at=updated_at,
+            metadata=api_payload,
         )
-        try:
-            resource.game = api_payload["game"]
-        except KeyError:
-            return
-        resource.metadata = api_payload
-        resource.save()
@@ -1,24 +1,34 @@
 """Provider tasks"""
 
+import hashlib
 import json
-import os
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
 
 import requests
 from celery.utils.log import get_task_logger
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
 from django.utils.timezone import make_aware
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from common.models import save_action_log
+from common.models import KeyValueStore, save_action_log
 from common.util import slugify
+from games.autoinstallers import update_auto_installers
+from games.cache import bump_game_versions, forget_installer_slugs
 from games.models import Game
+from games.search import update_search_documents
 from games.webhooks import send_simple_message
 from lutrisweb.celery import app
 from platforms.models import Platform
-from providers.igdb import IGDBClient
+from providers.igdb import IGDB_MAX_OPEN_REQUESTS, IGDBClient
 from providers.models import (
     Provider,
     ProviderCover,
@@ -51,12 +61,29 @@ IGDB_CAT = {
 }
 
 
-def _fetch_igdb_page(client, resource_name, page):
-    """Fetch a single page from IGDB with retry logic for timeouts"""
+def _fetch_igdb_page(client, resource_name, after_id, until_id):
+    """Fetch the resources with IDs in (after_id, until_id] from IGDB with retry logic
+    for timeouts
+    """
+    page = f"{after_id + 1}-{until_id}"
     last_error = None
 
     for attempt in range(IGDB_MAX_RETRIES):
-        response = client.get_resources(f"{resource_name}/", page=page)
+        try:
+            response = client.get_resources(f"{resource_name}/", after_id, until_id)
+        except requests.RequestException as ex:
+            delay = IGDB_RETRY_DELAYS[min(attempt, len(IGDB_RETRY_DELAYS) - 1)]
+            LOGGER.warning(
+                "IGDB request for %s IDs %s failed (attempt %d/%d), retrying in %ds: %s",
+                resource_name,
+                page,
+                attempt + 1,
+                IGDB_MAX_RETRIES,
+                delay,
+                ex,
+            )
+            time.sleep(delay)
+            continue
 
         # Check HTTP status
         if response.status_code == 200:
@@ -64,7 +91,7 @@ def _fetch_igdb_page(client, resource_name, page):
                 return response.json()
             except json.JSONDecodeError:
                 LOGGER.error(
-                    "Failed to parse JSON for %s page %s: %s",
+                    "Failed to parse JSON for %s IDs %s: %s",
                     resource_name,
                     page,
                     response.text[:200],
@@ -75,7 +102,7 @@ def _fetch_igdb_page(client, resource_name, page):
         if response.status_code == 408:
             delay = IGDB_RETRY_DELAYS[min(attempt, len(IGDB_RETRY_DELAYS) - 1)]
             LOGGER.warning(
-                "IGDB timeout for %s page %s (attempt %d/%d), retrying in %ds...",
+                "IGDB timeout for %s IDs %s (attempt %d/%d), retrying in %ds...",
                 resource_name,
                 page,
                 attempt + 1,
@@ -86,22 +113,22 @@ def _fetch_igdb_page(client, resource_name, page):
             last_error = response
             continue
 
-        # Handle rate limiting (429)
+        # Handle rate limiting (429), the pause applies to every request in flight
         if response.status_code == 429:
             delay = int(response.headers.get("Retry-After", 60))
             LOGGER.warning(
-                "IGDB rate limited for %s page %s, waiting %ds...",
+                "IGDB rate limited for %s IDs %s, waiting %ds...",
                 resource_name,
                 page,
                 delay,
             )
-            time.sleep(delay)
+            client.rate_limiter.pause(delay)
             last_error = response
             continue
 
         # Other errors - log and return None
         LOGGER.error(
-            "IGDB API error for %s page %s: HTTP %s - %s",
+            "IGDB API error for %s IDs %s: HTTP %s - %s",
             resource_name,
             page,
             response.status_code,
@@ -122,7 +149,7 @@ def _fetch_igdb_page(client, resource_name, page):
             error_detail = f" - {last_error.text[:100]}"
 
     LOGGER.error(
-        "IGDB API failed after %d retries for %s page %s%s",
+        "IGDB API failed after %d retries for %s IDs %s%s",
         IGDB_MAX_RETRIES,
         resource_name,
         page,
@@ -131,24 +158,93 @@ def _fetch_igdb_page(client, resource_name, page):
     return None
 
 
-def _igdb_loader(resource_name, model):
-    """Generic function to load a collection from IGDB to database"""
-    client = IGDBClient(settings.TWITCH_CLIENT_ID, settings.TWITCH_CLIENT_SECRET)
-    client.get_authentication_token()
-    if resource_name not in ("games", "covers"):
-        client.page_size = 10  # Most endpoints don't seem to support large page sizes
-    resources = True
-    page = 1
-    provider, _created = Provider.objects.get_or_create(name="igdb")
-    while resources:
-        LOGGER.info("Getting page %s of IGDB %s", page, resource_name)
-        resources = _fetch_igdb_page(client, resource_name, page)
+def _get_igdb_cursor_key(resource_name):
+    return f"igdb_{resource_name}_last_id"
+
+
+def get_igdb_cursor(resource_name):
+    """Return the last ID of a resource loaded by an unfinished import, 0 if there is none"""
+    value = (
+        KeyValueStore.objects.filter(key=_get_igdb_cursor_key(resource_name))
+        .values_list("value", flat=True)
+        .first()
+    )
+    return int(value) if value else 0
+
+
+def save_igdb_cursor(resource_name, last_id):
+    """Record the last ID of a resource written to the database"""
+    KeyValueStore.objects.update_or_create(
+        key=_get_igdb_cursor_key(resource_name), defaults={"value": str(last_id)}
+    )
+
+
+def clear_igdb_cursor(resource_name):
+    """Forget the position of a finished import, the next one starts from the first ID"""
+    KeyValueStore.objects.filter(key=_get_igdb_cursor_key(resource_name)).delete()
 
+
+def _iter_igdb_pages(client, resource_name, after_id, last_id):
+    """Yield (until_id, resources) tuples in ID order for the resources with IDs greater
+    than after_id and up to last_id.
+
+    Pages cover fixed ranges of page_size IDs rather than offsets into a sorted list, so
+    resources changing during the load never move from a page to another and pages can
+    be requested ahead: up to IGDB_MAX_OPEN_REQUESTS while the caller processes the
+    current one. Pages that failed to download yield None.
+    """
+    executor = ThreadPoolExecutor(max_workers=IGDB_MAX_OPEN_REQUESTS)
+    pending = deque()
+    try:
+        for page_start in range(after_id, last_id, client.page_size):
+            page_end = min(page_start + client.page_size, last_id)
+            pending.append(
+                (
+                    page_end,
+                    executor.submit(_fetch_igdb_page, client, resource_name, page_start, page_end),
+                )
+            )
+            if len(pending) < IGDB_MAX_OPEN_REQUESTS:
+                continue
+            until_id, future = pending.popleft()
+            yield until_id, future.result()
+        while pending:
+            until_id, future = pending.popleft()
+            yield until_id, future.result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _igdb_loader(resource_name, model, client=None, restart=False):
+    """Generic function to load a collection from IGDB to database
+
+    Pages are fetched concurrently and written as they arrive, in ID order. The last ID
+    written is saved so that an interrupted load resumes after it, unless restart is set.
+    """
+    if client is None:
+        client = IGDBClient(settings.TWITCH_CLIENT_ID, settings.TWITCH_CLIENT_SECRET)
+        client.get_authentication_token()
+        if resource_name not in ("games", "covers"):
+            client.page_size = 10  # Most endpoints don't seem to support large page sizes
+    if restart:
+        clear_igdb_cursor(resource_name)
+    after_id = get_igdb_cursor(resource_name)
+    if after_id:
+        LOGGER.info("Resuming IGDB %s after ID %s", resource_name, after_id)
+    try:
+        last_id = client.get_last_id(f"{resource_name}/")
+    except (requests.RequestException, ValueError, KeyError) as ex:
+        LOGGER.error("Could not get the last ID of IGDB %s: %s", resource_name, ex)
+        return
+    provider, _created = Provider.objects.get_or_create(name="igdb")
+    for until_id, resources in _iter_igdb_pages(client, resource_name, after_id, last_id):
+        LOGGER.info("Got IGDB %s up to ID %s", resource_name, until_id)
         if resources is None:
             # Fetch failed after retries, skip this page
-            page += 1
+            save_igdb_cursor(resource_name, until_id)
             continue
 
+        api_payloads = []
         for api_payload in resources:
             # Skip string responses (shouldn't happen with proper error handling)
             if isinstance(api_payload, str):
@@ -165,27 +261,30 @@ def _igdb_loader(resource_name, model):
                 )
                 continue
 
-            # Check for required 'slug' field
-            if isinstance(api_payload, dict) and "slug" not in api_payload:
+            # Check for the field identifying the resource ('slug' or 'image_id')
+            if isinstance(api_payload, dict) and model.igdb_key not in api_payload:
                 LOGGER.error(
-                    "API payload missing 'slug' field for %s: id=%s, keys=%s",
+                    "API payload missing '%s' field for %s: id=%s, keys=%s",
+                    model.igdb_key,
                     resource_name,
                     api_payload.get("id", "unknown"),
                     list(api_payload.keys())[:10],
                 )
                 continue
 
-            model.create_from_igdb_api(provider, api_payload)
-        page += 1
+            api_payloads.append(api_payload)
+        model.bulk_upsert_from_igdb_api(provider, api_payloads)
+        save_igdb_cursor(resource_name, until_id)
+    clear_igdb_cursor(resource_name)
 
 
 @app.task
-def load_igdb_games():
-    """Load all games from IGDB"""
+def load_igdb_games(restart=False):
+    """Load all games from IGDB, resuming an interrupted load unless restart is set"""
     start = datetime.now()
     send_simple_message("Starting IGDB loading")
     save_action_log("igdb_load_games_started_at", str(start))
-    _igdb_loader("games", ProviderGame)
+    _igdb_loader("games", ProviderGame, restart=restart)
     end = datetime.now()
     save_action_log("igdb_load_games_ended_at", str(end))
     duration = end - start
@@ -210,53 +309,128 @@ def load_igdb_covers():
     _igdb_loader("covers", ProviderCover)
 
 
-@app.task
-def match_igdb_games():
-    """Create or update Lutris games from IGDB games"""
-    platforms = {p.igdb_id: p for p in Platform.objects.filter(igdb_id__isnull=False)}
-    for igdb_game in ProviderGame.objects.filter(provider__name="igdb"):
-        igdb_slug = igdb_game.metadata["slug"]
-        if not igdb_slug:
-            LOGGER.error("Missing slug for %s", igdb_game.metadata)
-            continue
-        # Only match main games
-        if igdb_game.metadata.get("game_type", igdb_game.metadata.get("category")) != 0:
-            continue
-        if igdb_game.games.count():
-            # Game is already matched
-            continue
+IGDB_MATCH_BATCH_SIZE = 1000
 
-        # Match by slug
-        try:
-            lutris_game = Game.objects.get(slug=igdb_slug)
-            LOGGER.info("Updating Lutris game %s", igdb_game.name)
-        except Game.DoesNotExist:
-            LOGGER.info("Creating Lutris game %s", igdb_game.name)
-            lutris_game = Game.objects.create(
-                name=igdb_game.name,
-                slug=igdb_slug,
-            )
-        # Link IGDB game
-        lutris_game.provider_games.add(igdb_game)
 
-        # Set year
-        if not lutris_game.year and igdb_game.metadata.get("first_release_date"):
-            lutris_game.year = datetime.fromtimestamp(igdb_game.metadata["first_release_date"]).year
+def _is_main_igdb_game(metadata):
+    """Return whether IGDB metadata describes a main game (not a DLC, bundle, mod...)"""
+    return metadata.get("game_type", metadata.get("category")) == IGDB_CAT["main_game"]
 
-        # Set description
-        if not lutris_game.description and igdb_game.metadata.get("summary"):
-            lutris_game.description = igdb_game.metadata.get("summary")
 
-        # Set platform
+def _fill_from_igdb(lutris_game, metadata):
+    """Set year and description of a Lutris game from IGDB metadata, if they are missing.
+    Returns whether the game was modified.
+    """
+    changed = False
+    if not lutris_game.year and metadata.get("first_release_date"):
+        lutris_game.year = datetime.fromtimestamp(metadata["first_release_date"]).year
+        changed = True
+    if not lutris_game.description and metadata.get("summary"):
+        lutris_game.description = metadata["summary"]
+        changed = True
+    if not lutris_game.is_public:
+        lutris_game.is_public = True
+        changed = True
+    return changed
+
+
+def _match_igdb_batch(igdb_games, platforms, stats):
+    """Link a batch of unmatched IGDB games to new or existing Lutris games"""
+    existing_games = {
+        game.slug: game
+        for game in Game.objects.filter(
+            slug__in={igdb_game.metadata["slug"] for igdb_game in igdb_games}
+        )
+        .only("id", "slug", "year", "description", "is_public")
+        .order_by()
+    }
+    new_games = {}
+    changed_games = {}
+    matches = []
+    for igdb_game in igdb_games:
+        igdb_slug = igdb_game.metadata["slug"]
+        if igdb_slug in existing_games:
+            lutris_game = existing_games[igdb_slug]
+            if _fill_from_igdb(lutris_game, igdb_game.metadata):
+                changed_games[igdb_slug] = lutris_game
+        elif igdb_slug in new_games:
+            lutris_game = new_games[igdb_slug]
+            _fill_from_igdb(lutris_game, igdb_game.metadata)
+        else:
+            lutris_game = Game(name=igdb_game.name, slug=igdb_slug)
+            _fill_from_igdb(lutris_game, igdb_game.metadata)
+            new_games[igdb_slug] = lutris_game
+        matches.append((igdb_game, lutris_game))
+
+    Game.objects.bulk_create(new_games.values())
+    now = timezone.now()
+    for lutris_game in changed_games.values():
+        lutris_game.updated = now
+    Game.objects.bulk_update(
+        changed_games.values(), ["year", "description", "is_public", "updated"]
+    )
+
+    provider_game_links = []
+    platform_links = []
+    for igdb_game, lutris_game in matches:
+        provider_game_links.append(
+            Game.provider_games.through(game_id=lutris_game.pk, providergame_id=igdb_game.pk)
+        )
         for platform_id in igdb_game.metadata.get("platforms", []):
-            try:
-                lutris_game.platforms.add(platforms[platform_id])
-            except KeyError:
+            if platform_id not in platforms:
                 LOGGER.warning("No IGDB platform with ID %s", platform_id)
+                stats["missing_platforms"] += 1
                 continue
+            platform_links.append(
+                Game.platforms.through(game_id=lutris_game.pk, platform_id=platforms[platform_id])
+            )
+    Game.provider_games.through.objects.bulk_create(provider_game_links, ignore_conflicts=True)
+    Game.platforms.through.objects.bulk_create(platform_links, ignore_conflicts=True)
+    matched_game_ids = {lutris_game.pk for _igdb_game, lutris_game in matches}
+    update_search_documents(matched_game_ids)
+    bump_game_versions(matched_game_ids)
+    update_auto_installers(matched_game_ids)
+    forget_installer_slugs(new_games)
+    stats["matched"] += len(matches)
+    stats["created"] += len(new_games)
+    stats["updated"] += len(changed_games)
 
-        lutris_game.is_public = True
-        lutris_game.save()
+
+@app.task
+def match_igdb_games():
+    """Create or update Lutris games from IGDB games
+
+    Unmatched IGDB games are processed in batches: the Lutris games sharing their
+    slugs are fetched in a single query and the new games, links and updates are
+    written with bulk queries.
+    """
+    platforms = dict(Platform.objects.filter(igdb_id__isnull=False).values_list("igdb_id", "id"))
+    stats = {"matched": 0, "created": 0, "updated": 0, "skipped": 0, "missing_platforms": 0}
+    unmatched_games = (
+        ProviderGame.objects.filter(provider__name="igdb", games__isnull=True)
+        .only("id", "name", "metadata")
+        .order_by("id")
+    )
+    batch = []
+    for igdb_game in unmatched_games.iterator(chunk_size=IGDB_MATCH_BATCH_SIZE):
+        if not igdb_game.metadata.get("slug"):
+            LOGGER.error("Missing slug for %s", igdb_game.metadata)
+            stats["skipped"] += 1
+            continue
+        if not _is_main_igdb_game(igdb_game.metadata):
+            stats["skipped"] += 1
+            continue
+        batch.append(igdb_game)
+        if len(batch) == IGDB_MATCH_BATCH_SIZE:
+            with transaction.atomic():
+                _match_igdb_batch(batch, platforms, stats)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            _match_igdb_batch(batch, platforms, stats)
+    LOGGER.info("IGDB games matched: %s", stats)
+    save_action_log("match_igdb_games", stats)
+    return stats
 
 
 @app.task
@@ -272,62 +446,135 @@ def sync_igdb_platforms():
         lutris_platform.save()
 
 
-def get_igdb_cover(image_id, size="cover_big"):
+IGDB_IMAGE_URL = "https://images.igdb.com/igdb/image/upload"
+IGDB_COVER_FORMAT = "cover_big"
+# Covers are served by a CDN, they are not subject to the API rate limits
+IGDB_COVER_DOWNLOAD_WORKERS = 16
+IGDB_COVER_BATCH_SIZE = 500
+IGDB_COVER_TIMEOUT = (5, 30)
+
+
+def get_igdb_cover_session(workers=IGDB_COVER_DOWNLOAD_WORKERS):
+    """Return a session keeping a connection open for each download thread"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_maxsize=workers,
+        max_retries=Retry(total=3, backoff_factor=1, status_forcelist=(429, 500, 502, 503, 504)),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_igdb_cover(image_id, size=IGDB_COVER_FORMAT, session=None):
     """Download a cover from IGDB and return its contents"""
-    url = f"https://images.igdb.com/igdb/image/upload/t_{size}/{image_id}.jpg"
-    response = requests.get(url)
+    url = f"{IGDB_IMAGE_URL}/t_{size}/{image_id}.jpg"
+    response = (session or requests).get(url, timeout=IGDB_COVER_TIMEOUT)
+    response.raise_for_status()
     return response.content
 
 
+def _download_igdb_cover(session, image_id):
+    try:
+        return get_igdb_cover(image_id, session=session), None
+    except requests.RequestException as ex:
+        return None, str(ex)
+
+
+def get_igdb_cover_targets(force_update=False):
+    """Return (game ID, cover image ID) tuples for the Lutris games to get an IGDB cover,
+    one cover per game. Games with a coverart are left out unless force_update is set.
+    """
+    provider_links = Game.provider_games.through._meta.db_table
+    query = f"""
+        SELECT DISTINCT ON (game.id) game.id, cover.image_id
+        FROM {ProviderCover._meta.db_table} cover
+        JOIN {Provider._meta.db_table} provider ON provider.id = cover.provider_id
+        JOIN {ProviderGame._meta.db_table} provider_game
+            ON provider_game.provider_id = provider.id
+            AND provider_game.internal_id = cover.game::text
+        JOIN {provider_links} link ON link.providergame_id = provider_game.id
+        JOIN {Game._meta.db_table} game ON game.id = link.game_id
+        WHERE provider.name = 'igdb' AND game.change_for_id IS NULL
+            AND (%s OR game.coverart = '')
+        ORDER BY game.id, cover.id DESC
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(query, [force_update])
+        return cursor.fetchall()
+
+
+def _get_file_hash(name):
+    """Return the SHA-256 digest of a stored file, None if it can't be read"""
+    try:
+        with default_storage.open(name) as stored_file:
+            return hashlib.sha256(stored_file.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _get_igdb_coverart_name(image_id):
+    return f"{Game.coverart.field.upload_to}/{IGDB_COVER_FORMAT}/{image_id}.jpg"
+
+
+def _save_igdb_coverart(game, image_id, content, stored_hashes, stats):
+    """Set the coverart of a game, reusing a stored file with the same content"""
+    name = _get_igdb_coverart_name(image_id)
+    digest = hashlib.sha256(content).hexdigest()
+    if game.coverart and _get_file_hash(game.coverart.name) == digest:
+        stats["unchanged_coverart"] += 1
+        return
+    if digest not in stored_hashes and _get_file_hash(name) == digest:
+        stored_hashes[digest] = name
+    if digest in stored_hashes:
+        game.coverart.name = stored_hashes[digest]
+        stats["duplicate_file"] += 1
+    else:
+        game.coverart.save(name.split("/", 1)[1], ContentFile(content), save=False)
+        stored_hashes[digest] = game.coverart.name
+    game.save(update_fields=["coverart"])
+    stats["coverart_saved"] += 1
+
+
 @app.task
-def sync_igdb_coverart(force_update=False):
+def sync_igdb_coverart(force_update=False, workers=IGDB_COVER_DOWNLOAD_WORKERS):
     """Downloads IGDB coverart and associates it with Lutris games
 
+    Games missing a coverart are matched to their IGDB cover with a single query and
+    covers are downloaded in parallel. Covers already on disk are linked without
+    being downloaded and downloads identical to a stored file are not written again.
     force_update redownloads coverarts for every game even if one is already present.
     """
-    cover_format = "cover_big"
-    stats = {
-        "existing_file": 0,
-        "existing_lutris_coverart": 0,
-        "missing_igdb_game": 0,
-        "multiple_igdb_games": 0,
-        "missing_lutris_game": 0,
-        "multiple_lutris_games": 0,
-        "coverart_saved": 0,
-    }
-    for igdb_cover in ProviderCover.objects.filter(provider__name="igdb"):
-        relpath = f"{cover_format}/{igdb_cover.image_id}.jpg"
-        igdb_path = os.path.join(settings.MEDIA_ROOT, "igdb", relpath)
-        if os.path.exists(igdb_path) and not force_update:
-            stats["existing_file"] += 1
-            continue
-        try:
-            igdb_game = ProviderGame.objects.get(provider__name="igdb", internal_id=igdb_cover.game)
-        except ProviderGame.DoesNotExist:
-            stats["missing_igdb_game"] += 1
-            continue
-        except ProviderGame.MultipleObjectsReturned:
-            stats["multiple_igdb_games"] += 1
-            LOGGER.warning("Multiple games for %s", igdb_cover.game)
-            igdb_game = ProviderGame.objects.filter(
-                provider__name="igdb", internal_id=igdb_cover.game
-            ).first()
-        try:
-            lutris_game = Game.objects.get(provider_games=igdb_game)
-        except Game.DoesNotExist:
-            LOGGER.warning("No Lutris game with ID %s", igdb_cover.game)
-            stats["missing_lutris_game"] += 1
-            continue
-        except Game.MultipleObjectsReturned:
-            stats["multiple_lutris_games"] += 1
-            lutris_game = Game.objects.filter(provider_games=igdb_game).last()
-        if lutris_game.coverart and not force_update:
-            stats["existing_lutris_coverart"] += 1
-            continue
-        lutris_game.coverart = ContentFile(get_igdb_cover(igdb_cover.image_id), relpath)
-        lutris_game.save()
-        stats["coverart_saved"] += 1
-    return stats
+    stats = defaultdict(int)
+    stored_hashes = {}
+    targets = get_igdb_cover_targets(force_update)
+    session = get_igdb_cover_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for offset in range(0, len(targets), IGDB_COVER_BATCH_SIZE):
+            batch = targets[offset : offset + IGDB_COVER_BATCH_SIZE]
+            games = Game.objects.in_bulk([game_id for game_id, _image_id in batch])
+            downloads = []
+            for game_id, image_id in batch:
+                name = _get_igdb_coverart_name(image_id)
+                if not force_update and default_storage.exists(name):
+                    games[game_id].coverart.name = name
+                    games[game_id].save(update_fields=["coverart"])
+                    stats["existing_file"] += 1
+                    stats["coverart_saved"] += 1
+                    continue
+                downloads.append((game_id, image_id))
+            results = executor.map(
+                partial(_download_igdb_cover, session),
+                [image_id for _game_id, image_id in downloads],
+            )
+            for (game_id, image_id), (content, error) in zip(downloads, results, strict=True):
+                if error:
+                    LOGGER.warning("Could not download IGDB cover %s: %s", image_id, error)
+                    stats["download_failed"] += 1
+                    continue
+                _save_igdb_coverart(games[game_id], image_id, content, stored_hashes, stats)
+    LOGGER.info("IGDB coverart synced: %s", dict(stats))
+    return dict(stats)
 
 
 @app.task
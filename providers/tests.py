@@ -0,0 +1,420 @@
+# pylint: disable=missing-docstring
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from common.models import KeyValueStore
+from games.cache import get_game_version, set_installer_slug_targets
+from games.models import AutoInstallerSlug, Game, Installer
+from games.tests.factories import RunnerFactory
+from platforms.models import Platform
+from providers.igdb import IGDBClient, RateLimiter
+from providers.models import Provider, ProviderCover, ProviderGame, ProviderGenre
+from providers.tasks.igdb import (
+    _igdb_loader,
+    get_igdb_cursor,
+    match_igdb_games,
+    save_igdb_cursor,
+    sync_igdb_coverart,
+)
+
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class TestMatchIGDBGames(TestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(name="igdb", website="https://igdb.com")
+        self.linux = Platform.objects.create(name="Linux", slug="linux", igdb_id=3)
+        self.windows = Platform.objects.create(name="Windows", slug="windows", igdb_id=6)
+
+    def create_igdb_game(self, slug, **metadata):
+        metadata.setdefault("game_type", 0)
+        return ProviderGame.objects.create(
+            provider=self.provider,
+            name=slug.replace("-", " ").title(),
+            slug=slug,
+            internal_id=slug,
+            metadata={"slug": slug, **metadata},
+        )
+
+    def test_creates_games_for_unmatched_igdb_games(self):
+        igdb_game = self.create_igdb_game(
+            "quake",
+            first_release_date=834000000,
+            summary="Fight monsters",
+            platforms=[3, 6, 999],
+        )
+        stats = match_igdb_games()
+        game = Game.objects.get(slug="quake")
+        self.assertEqual(game.name, "Quake")
+        self.assertEqual(game.year, 1996)
+        self.assertEqual(game.description, "Fight monsters")
+        self.assertTrue(game.is_public)
+        self.assertEqual(list(game.provider_games.all()), [igdb_game])
+        self.assertEqual(set(game.platforms.all()), {self.linux, self.windows})
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(stats["missing_platforms"], 1)
+        self.assertTrue(KeyValueStore.objects.filter(key="match_igdb_games").exists())
+
+    def test_updates_existing_games_without_overwriting(self):
+        game = Game.objects.create(name="Doom", slug="doom", year=1993)
+        self.create_igdb_game("doom", first_release_date=1500000000, summary="Rip and tear")
+        stats = match_igdb_games()
+        game.refresh_from_db()
+        self.assertEqual(game.year, 1993)
+        self.assertEqual(game.description, "Rip and tear")
+        self.assertTrue(game.is_public)
+        self.assertEqual(game.provider_games.count(), 1)
+        self.assertEqual(stats["created"], 0)
+        self.assertEqual(stats["updated"], 1)
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_matched_games_get_auto_installers(self):
+        RunnerFactory(name="Linux", slug="linux")
+        self.linux.default_installer = {"runner": "linux", "game": {"exe": "N/A"}}
+        self.linux.save()
+        set_installer_slug_targets("quake", [])
+        self.create_igdb_game("quake", platforms=[3])
+        match_igdb_games()
+        game = Game.objects.get(slug="quake")
+        self.assertEqual(
+            list(AutoInstallerSlug.objects.filter(game=game).values_list("slug", flat=True)),
+            ["quake-linux"],
+        )
+        self.assertEqual(
+            [installer.slug for installer in Installer.objects.fuzzy_filter("quake")],
+            ["quake-linux"],
+        )
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_matched_games_are_invalidated(self):
+        game = Game.objects.create(name="Doom", slug="doom", year=1993, is_public=True)
+        version = get_game_version(game.pk)
+        self.create_igdb_game("doom", platforms=[3])
+        match_igdb_games()
+        self.assertNotEqual(get_game_version(game.pk), version)
+
+    def test_skips_non_main_games_and_matched_games(self):
+        self.create_igdb_game("doom-dlc", game_type=1)
+        self.create_igdb_game("hexen", category=0)
+        match_igdb_games()
+        self.assertFalse(Game.objects.filter(slug="doom-dlc").exists())
+        self.assertTrue(Game.objects.filter(slug="hexen").exists())
+
+        stats = match_igdb_games()
+        self.assertEqual(stats["matched"], 0)
+        self.assertEqual(Game.objects.filter(slug="hexen").count(), 1)
+
+    def test_query_count_does_not_depend_on_game_count(self):
+        self.create_igdb_game("game-0", platforms=[3])
+        with CaptureQueriesContext(connection) as single_game_queries:
+            match_igdb_games()
+        for index in range(1, 21):
+            self.create_igdb_game(f"game-{index}", platforms=[3])
+        with CaptureQueriesContext(connection) as many_games_queries:
+            stats = match_igdb_games()
+        self.assertEqual(len(many_games_queries), len(single_game_queries))
+        self.assertEqual(stats["created"], 20)
+        self.assertEqual(Game.objects.filter(platforms=self.linux).count(), 21)
+
+
+class TestIGDBBulkUpsert(TestCase):
+    def setUp(self):
+        self.provider = Provider.objects.create(name="igdb", website="https://igdb.com")
+
+    def get_payload(self, slug, updated_at=1600000000, **extra):
+        return {
+            "id": len(slug),
+            "slug": slug,
+            "name": slug.title(),
+            "updated_at": updated_at,
+            **extra,
+        }
+
+    def test_page_is_written_in_three_queries(self):
+        payloads = [self.get_payload(f"game-{index}") for index in range(50)]
+        # Stored resources, upsert and games linked to the written provider games
+        with self.assertNumQueries(3):
+            written = ProviderGame.bulk_upsert_from_igdb_api(self.provider, payloads)
+        self.assertEqual(written, 50)
+        self.assertEqual(ProviderGame.objects.count(), 50)
+        game = ProviderGame.objects.get(slug="game-7")
+        self.assertEqual(game.name, "Game-7")
+        self.assertEqual(game.internal_id, "6")
+        self.assertEqual(game.metadata, payloads[7])
+
+    def test_only_changed_resources_are_updated(self):
+        ProviderGenre.bulk_upsert_from_igdb_api(
+            self.provider, [self.get_payload("shooter"), self.get_payload("puzzle")]
+        )
+        written = ProviderGenre.bulk_upsert_from_igdb_api(
+            self.provider,
+            [
+                self.get_payload("shooter", name="Unchanged"),
+                self.get_payload("puzzle", updated_at=1700000000, name="Puzzle games"),
+            ],
+        )
+        self.assertEqual(written, 1)
+        self.assertEqual(ProviderGenre.objects.count(), 2)
+        self.assertEqual(ProviderGenre.objects.get(slug="shooter").name, "Shooter")
+        self.assertEqual(ProviderGenre.objects.get(slug="puzzle").name, "Puzzle games")
+
+    @override_settings(CACHES=LOCMEM_CACHES)
+    def test_linked_games_are_invalidated(self):
+        ProviderGame.bulk_upsert_from_igdb_api(self.provider, [self.get_payload("quake")])
+        game = Game.objects.create(name="Quake", slug="quake")
+        game.provider_games.add(ProviderGame.objects.get(slug="quake"))
+        version = get_game_version(game.pk)
+        ProviderGame.bulk_upsert_from_igdb_api(
+            self.provider, [self.get_payload("quake", updated_at=1700000000)]
+        )
+        self.assertNotEqual(get_game_version(game.pk), version)
+
+    def test_duplicates_in_a_page_keep_the_last_payload(self):
+        ProviderGame.bulk_upsert_from_igdb_api(
+            self.provider,
+            [self.get_payload("quake", name="Old"), self.get_payload("quake", name="New")],
+        )
+        self.assertEqual(ProviderGame.objects.get(slug="quake").name, "New")
+
+    def test_covers_are_keyed_by_image_id(self):
+        ProviderCover.objects.create(provider=self.provider, image_id="co1abc", game=1)
+        written = ProviderCover.bulk_upsert_from_igdb_api(
+            self.provider,
+            [
+                {"id": 1, "image_id": "co1abc", "game": 42},
+                {"id": 2, "image_id": "co2def", "game": 43},
+                {"id": 3, "image_id": "co3ghi"},
+            ],
+        )
+        self.assertEqual(written, 2)
+        self.assertEqual(ProviderCover.objects.count(), 2)
+        self.assertEqual(ProviderCover.objects.get(image_id="co1abc").game, 42)
+
+
+class FakeIGDBHandler(BaseHTTPRequestHandler):
+    """Serves a fixed list of games, queried by ID range like the IGDB API"""
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        query = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        server = self.server
+        if query == "fields id; sort id desc; limit 1;":
+            games = sorted(server.games, key=lambda game: game["id"])[-1:]
+            self.send_json([{"id": game["id"]} for game in games])
+            return
+        limit = int(re.search(r"limit (\d+);", query).group(1))
+        after_id, until_id = map(int, re.search(r"where id > (\d+) & id <= (\d+);", query).groups())
+        with server.lock:
+            server.after_ids.append(after_id)
+            rate_limited = after_id in server.rate_limited_ids
+            server.rate_limited_ids.discard(after_id)
+        if rate_limited:
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.end_headers()
+            return
+        games = sorted(
+            (game for game in server.games if after_id < game["id"] <= until_id),
+            key=lambda game: game["id"],
+        )
+        self.send_json(games[:limit])
+
+    def send_json(self, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class TestIGDBLoader(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeIGDBHandler)
+        self.server.lock = threading.Lock()
+        self.server.after_ids = []
+        self.server.rate_limited_ids = set()
+        # IDs have gaps, like IGDB's
+        self.server.games = [
+            {
+                "id": game_id,
+                "slug": f"game-{game_id}",
+                "name": f"Game {game_id}",
+                "updated_at": 1600000000,
+            }
+            for game_id in [*range(1, 21), 28, 29, 41]
+        ]
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.client = IGDBClient("client-id", "client-secret")
+        self.client.access_token = "token"
+        self.client.base_url = "http://127.0.0.1:%s/v4/" % self.server.server_address[1]
+        self.client.page_size = 5
+        self.client.rate_limiter = RateLimiter(1000)
+
+    def test_loads_every_page(self):
+        _igdb_loader("games", ProviderGame, client=self.client)
+        self.assertEqual(ProviderGame.objects.count(), 23)
+        self.assertEqual(sorted(self.server.after_ids), list(range(0, 41, 5)))
+        self.assertEqual(get_igdb_cursor("games"), 0)
+
+    def test_resumes_after_last_saved_id(self):
+        save_igdb_cursor("games", 10)
+        _igdb_loader("games", ProviderGame, client=self.client)
+        self.assertEqual(min(self.server.after_ids), 10)
+        self.assertEqual(ProviderGame.objects.count(), 13)
+        self.assertFalse(ProviderGame.objects.filter(slug="game-10").exists())
+        self.assertEqual(get_igdb_cursor("games"), 0)
+
+    def test_resumed_pages_ignore_updated_resources(self):
+        save_igdb_cursor("games", 10)
+        # A resource updated since the interrupted load doesn't shift the next pages
+        self.server.games[3]["updated_at"] = 1700000000
+        _igdb_loader("games", ProviderGame, client=self.client)
+        self.assertEqual(ProviderGame.objects.count(), 13)
+        self.assertTrue(ProviderGame.objects.filter(slug="game-11").exists())
+
+    def test_restart_ignores_saved_cursor(self):
+        save_igdb_cursor("games", 10)
+        _igdb_loader("games", ProviderGame, client=self.client, restart=True)
+        self.assertEqual(ProviderGame.objects.count(), 23)
+
+    def test_retries_rate_limited_pages(self):
+        self.server.rate_limited_ids = {5, 15}
+        _igdb_loader("games", ProviderGame, client=self.client)
+        self.assertEqual(ProviderGame.objects.count(), 23)
+        self.assertEqual(self.server.after_ids.count(5), 2)
+
+
+class TestRateLimiter(TestCase):
+    def test_limits_request_rate(self):
+        rate_limiter = RateLimiter(50, capacity=1)
+        start = time.monotonic()
+        for _index in range(6):
+            rate_limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_pause_delays_requests(self):
+        rate_limiter = RateLimiter(1000)
+        rate_limiter.pause(0.05)
+        start = time.monotonic()
+        rate_limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+
+class FakeIGDBImageHandler(BaseHTTPRequestHandler):
+    """Serves covers whose content is given by the image ID, before its first dash"""
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        image_id = self.path.rsplit("/", 1)[-1].split(".")[0]
+        with self.server.lock:
+            self.server.paths.append(self.path)
+        if image_id.startswith("missing"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = image_id.split("-")[0].encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class TestSyncIGDBCoverart(TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeIGDBImageHandler)
+        self.server.lock = threading.Lock()
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        url_patch = patch(
+            "providers.tasks.igdb.IGDB_IMAGE_URL",
+            "http://127.0.0.1:%s/igdb/image/upload" % self.server.server_address[1],
+        )
+        url_patch.start()
+        self.addCleanup(url_patch.stop)
+
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.provider = Provider.objects.create(name="igdb", website="https://igdb.com")
+
+    def create_covered_game(self, index, image_id):
+        igdb_game = ProviderGame.objects.create(
+            provider=self.provider, slug=f"game-{index}", internal_id=str(index)
+        )
+        ProviderCover.objects.create(provider=self.provider, game=index, image_id=image_id)
+        game = Game.objects.create(name=f"Game {index}", slug=f"game-{index}")
+        game.provider_games.add(igdb_game)
+        return game
+
+    def test_downloads_covers_of_games_without_coverart(self):
+        first_game = self.create_covered_game(1, "aaa-1")
+        second_game = self.create_covered_game(2, "bbb-2")
+        self.create_covered_game(3, "missing-3")
+        stats = sync_igdb_coverart(workers=2)
+        self.assertEqual(stats["coverart_saved"], 2)
+        self.assertEqual(stats["download_failed"], 1)
+        first_game.refresh_from_db()
+        self.assertEqual(first_game.coverart.name, "igdb/cover_big/aaa-1.jpg")
+        with first_game.coverart.open() as coverart:
+            self.assertEqual(coverart.read(), b"aaa")
+        second_game.refresh_from_db()
+        self.assertEqual(second_game.coverart.name, "igdb/cover_big/bbb-2.jpg")
+
+        self.server.paths.clear()
+        stats = sync_igdb_coverart(workers=2)
+        self.assertEqual(stats["download_failed"], 1)
+        self.assertEqual(len(self.server.paths), 1)
+
+    def test_identical_covers_are_stored_once(self):
+        first_game = self.create_covered_game(1, "aaa-1")
+        second_game = self.create_covered_game(2, "aaa-2")
+        stats = sync_igdb_coverart(workers=2)
+        self.assertEqual(stats["duplicate_file"], 1)
+        first_game.refresh_from_db()
+        second_game.refresh_from_db()
+        self.assertEqual(first_game.coverart.name, second_game.coverart.name)
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, "igdb/cover_big"))), 1)
+
+    def test_unchanged_covers_are_not_saved_again(self):
+        game = self.create_covered_game(1, "aaa-1")
+        sync_igdb_coverart(workers=1)
+        stats = sync_igdb_coverart(force_update=True, workers=1)
+        self.assertEqual(stats, {"unchanged_coverart": 1})
+        game.refresh_from_db()
+        self.assertEqual(game.coverart.name, "igdb/cover_big/aaa-1.jpg")
+
+    def test_covers_on_disk_are_linked_without_download(self):
+        game = self.create_covered_game(1, "aaa-1")
+        os.makedirs(os.path.join(self.media_root, "igdb/cover_big"))
+        with open(os.path.join(self.media_root, "igdb/cover_big/aaa-1.jpg"), "wb") as cover:
+            cover.write(b"aaa")
+        stats = sync_igdb_coverart(workers=1)
+        self.assertEqual(stats["existing_file"], 1)
+        self.assertEqual(self.server.paths, [])
+        game.refresh_from_db()
+        self.assertEqual(game.coverart.name, "igdb/cover_big/aaa-1.jpg")
@@ -0,0 +1,18 @@
+"""Runners related signals"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from runners.models import Runner, RunnerVersion, Runtime
+from runners.util import invalidate_runtime_versions
+
+
+@receiver(post_save, sender=Runner)
+@receiver(post_delete, sender=Runner)
+@receiver(post_save, sender=RunnerVersion)
+@receiver(post_delete, sender=RunnerVersion)
+@receiver(post_save, sender=Runtime)
+@receiver(post_delete, sender=Runtime)
+def clear_runtime_versions_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """Invalidate the cached runtime versions payloads when runners or runtimes change"""
+    invalidate_runtime_versions()
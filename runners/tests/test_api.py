@@ -1,7 +1,8 @@
 import json
 import os
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from common.util import create_admin
@@ -49,3 +50,53 @@ class TestApi(TestCase):
         self.assertEqual(response.status_code, 201)
         response_data = json.loads(response.content.decode())
         self.assertIn("lutris-runner.dummy", response_data["versions"][0]["url"])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TestRuntimeVersions(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.runner = models.Runner.objects.create(name="Wine", slug="wine")
+        models.RunnerVersion.objects.create(runner=self.runner, version="8.0", default=True)
+        models.RunnerVersion.objects.create(runner=self.runner, version="7.0")
+        models.Runtime.objects.create(name="dxvk", version="v2.3")
+        models.Runtime.objects.create(name="dxvk-old", version="v1.10", enabled=False)
+        models.Runtime.objects.create(name="newer-runtime", min_version=5020000)
+        self.url = reverse("runtime_versions")
+        self.user_agent = "Lutris 0.5.13"
+
+    def get_runtime_versions(self):
+        response = self.client.get(self.url, HTTP_USER_AGENT=self.user_agent)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode())
+
+    def test_returns_default_versions_and_enabled_runtimes(self):
+        response_data = self.get_runtime_versions()
+        self.assertEqual(
+            [version["version"] for version in response_data["runners"]["wine"]], ["8.0"]
+        )
+        self.assertEqual(set(response_data["runtimes"]), {"dxvk"})
+
+    def test_cached_response_runs_no_queries(self):
+        first_response = self.get_runtime_versions()
+        with self.assertNumQueries(0):
+            second_response = self.get_runtime_versions()
+        self.assertEqual(first_response, second_response)
+
+    def test_cache_is_keyed_by_client_version(self):
+        self.get_runtime_versions()
+        self.user_agent = "Lutris 0.5.22"
+        response_data = self.get_runtime_versions()
+        self.assertEqual(set(response_data["runtimes"]), {"dxvk", "newer-runtime"})
+
+    def test_cache_is_invalidated_on_changes(self):
+        self.get_runtime_versions()
+        models.RunnerVersion.objects.create(runner=self.runner, version="9.0", default=True)
+        models.Runtime.objects.filter(name="dxvk-old").get().delete()
+        models.Runtime.objects.create(name="vkd3d", version="v2.8")
+        response_data = self.get_runtime_versions()
+        self.assertEqual(
+            sorted(version["version"] for version in response_data["runners"]["wine"]),
+            ["8.0", "9.0"],
+        )
+        self.assertEqual(set(response_data["runtimes"]), {"dxvk", "vkd3d"})
@@ -0,0 +1,139 @@
+"""Runner and runtime utilities"""
+
+# pylint: disable=no-member
+import time
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from runners.models import Runner, RunnerVersion, Runtime
+
+RUNTIME_VERSIONS_CACHE_PREFIX = "runtime-versions"
+RUNTIME_VERSIONS_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_hw_support(gpus):
+    """Return the graphic APIs supported by a set of GPUs
+
+    Args:
+        gpus (dict): Hardware features by PCI ID, as returned by PCIIndex.get_features_many
+    """
+    hw_support = {
+        "vulkan": True,
+        "vulkan_1_3": True,
+        "directx_11": True,
+        "directx_12": True,
+    }
+    for gpu_info in gpus.values():
+        if not gpu_info.get("features"):
+            continue
+        apis = [feature.split()[0] for feature in gpu_info["features"]]
+        versioned_apis = [" ".join(feature.split()[0:2]) for feature in gpu_info["features"]]
+        if not hw_support["vulkan"]:
+            hw_support["vulkan"] = "Vulkan" in apis
+        if not hw_support["vulkan_1_3"]:
+            hw_support["vulkan_1_3"] = "Vulkan 1.3" in versioned_apis
+        if not hw_support["directx_11"]:
+            hw_support["directx_11"] = "Direct3D 11" in versioned_apis
+        if not hw_support["directx_12"]:
+            hw_support["directx_12"] = hw_support["directx_11"] = "Direct3D 12" in versioned_apis
+    return hw_support
+
+
+def runtime_is_supported(runtime, client_version_number, hw_support):
+    """Return whether a runtime should be offered to a client"""
+    if (
+        client_version_number
+        and runtime.min_version
+        and client_version_number < runtime.min_version
+    ):
+        return False
+    if (not hw_support["vulkan"] or not hw_support["directx_11"]) and (
+        runtime.name.startswith("dxvk") or runtime.name == "vkd3d"
+    ):
+        return False
+    if not hw_support["directx_12"] and runtime.name == "vkd3d":
+        return False
+    if not hw_support["vulkan_1_3"]:
+        if runtime.name == "dxvk" and int(runtime.version.strip("v")[0]) > 1:
+            return False
+        if runtime.name == "vkd3d" and runtime.version != "v2.6":
+            return False
+    else:
+        if runtime.name == "dxvk" and int(runtime.version.strip("v")[0]) == 1:
+            return False
+        if runtime.name == "vkd3d" and runtime.version == "v2.6":
+            return False
+    return True
+
+
+def build_runtime_versions(client_version_number, hw_support):
+    """Return the default runner versions and the runtimes available to a client.
+    This runs a constant number of queries, regardless of the number of runners.
+    """
+    runners = {}
+    for runner in Runner.objects.prefetch_related(
+        Prefetch("runner_versions", queryset=RunnerVersion.objects.filter(default=True))
+    ):
+        runners[runner.slug] = [
+            {
+                "name": runner.slug,
+                "version": version.version,
+                "url": version.url,
+                "architecture": version.architecture,
+            }
+            for version in runner.runner_versions.all()
+        ]
+    runtimes = {}
+    for runtime in Runtime.objects.filter(enabled=True):
+        if not runtime_is_supported(runtime, client_version_number, hw_support):
+            continue
+        runtimes[runtime.name] = {
+            "name": runtime.name,
+            "created_at": runtime.created_at,
+            "architecture": runtime.architecture,
+            "url": runtime.url,
+            "version": runtime.version,
+            "versioned": runtime.versioned,
+        }
+    return {"runners": runners, "runtimes": runtimes}
+
+
+def get_runtime_versions_generation():
+    """Return the current generation of the runtime versions cache.
+    Cached payloads are keyed by generation so that a single write invalidates
+    every client version and hardware combination at once.
+    """
+    return cache.get_or_set(
+        f"{RUNTIME_VERSIONS_CACHE_PREFIX}:generation", time.time_ns, timeout=None
+    )
+
+
+def invalidate_runtime_versions():
+    """Discard all cached runtime versions payloads"""
+    cache.set(f"{RUNTIME_VERSIONS_CACHE_PREFIX}:generation", time.time_ns(), timeout=None)
+
+
+def get_runtime_versions(client_version_number, hw_support):
+    """Return the runners and runtimes payload for a client, from the cache if possible
+
+    Args:
+        client_version_number (int): Version of the client, as returned by get_version_number
+        hw_support (dict): Supported graphic APIs, as returned by get_hw_support
+    """
+    hw_key = "-".join(
+        f"{api}={int(bool(supported))}" for api, supported in sorted(hw_support.items())
+    )
+    cache_key = ":".join(
+        [
+            RUNTIME_VERSIONS_CACHE_PREFIX,
+            str(get_runtime_versions_generation()),
+            str(client_version_number),
+            hw_key,
+        ]
+    )
+    runtime_versions = cache.get(cache_key)
+    if runtime_versions is None:
+        runtime_versions = build_runtime_versions(client_version_number, hw_support)
+        cache.set(cache_key, runtime_versions, RUNTIME_VERSIONS_CACHE_TIMEOUT)
+    return runtime_versions
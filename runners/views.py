@@ -9,13 +9,14 @@ from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 
 from common.permissions import IsAdminOrReadOnly
-from hardware.models import get_hardware_features
+from hardware.index import get_pci_index
 from runners.models import Runner, RunnerVersion, Runtime, RuntimeComponent
 from runners.serializers import (
     RunnerSerializer,
     RuntimeDetailSerializer,
     RuntimeSerializer,
 )
+from runners.util import get_hw_support, get_runtime_versions
 
 
 class ClientTooOld(APIException):
@@ -201,76 +202,7 @@ class RuntimeVersions(views.APIView):
             except ValueError as ex:
                 raise ClientTooOld from ex
 
-        for pci_id in request.GET.get("pci_ids", "").lower().split(","):
-            try:
-                response["gpus"][pci_id] = get_hardware_features(pci_id)
-            except ValueError:
-                continue
-        hw_support = {
-            "vulkan": True,
-            "vulkan_1_3": True,
-            "directx_11": True,
-            "directx_12": True,
-        }
-        if response["gpus"]:
-            for gpu_info in response["gpus"].values():
-                if not gpu_info.get("features"):
-                    continue
-                apis = [feature.split()[0] for feature in gpu_info["features"]]
-                versioned_apis = [
-                    " ".join(feature.split()[0:2]) for feature in gpu_info["features"]
-                ]
-                if not hw_support["vulkan"]:
-                    hw_support["vulkan"] = "Vulkan" in apis
-                if not hw_support["vulkan_1_3"]:
-                    hw_support["vulkan_1_3"] = "Vulkan 1.3" in versioned_apis
-                if not hw_support["directx_11"]:
-                    hw_support["directx_11"] = "Direct3D 11" in versioned_apis
-                if not hw_support["directx_12"]:
-                    hw_support["directx_12"] = hw_support["directx_11"] = (
-                        "Direct3D 12" in versioned_apis
-                    )
-
-        response["hw_support"] = hw_support
-        for runner in Runner.objects.all():
-            response["runners"][runner.slug] = [
-                {
-                    "name": runner.slug,
-                    "version": version.version,
-                    "url": version.url,
-                    "architecture": version.architecture,
-                }
-                for version in runner.runner_versions.filter(default=True)
-            ]
-        for runtime in Runtime.objects.filter(enabled=True):
-            if (
-                client_version_number
-                and runtime.min_version
-                and client_version_number < runtime.min_version
-            ):
-                continue
-            if (not hw_support["vulkan"] or not hw_support["directx_11"]) and (
-                runtime.name.startswith("dxvk") or runtime.name == "vkd3d"
-            ):
-                continue
-            if not hw_support["directx_12"] and runtime.name == "vkd3d":
-                continue
-            if not hw_support["vulkan_1_3"]:
-                if runtime.name == "dxvk" and int(runtime.version.strip("v")[0]) > 1:
-                    continue
-                if runtime.name == "vkd3d" and runtime.version != "v2.6":
-                    continue
-            else:
-                if runtime.name == "dxvk" and int(runtime.version.strip("v")[0]) == 1:
-                    continue
-                if runtime.name == "vkd3d" and runtime.version == "v2.6":
-                    continue
-            response["runtimes"][runtime.name] = {
-                "name": runtime.name,
-                "created_at": runtime.created_at,
-                "architecture": runtime.architecture,
-                "url": runtime.url,
-                "version": runtime.version,
-                "versioned": runtime.versioned,
-            }
+        response["gpus"] = get_pci_index().get_features_many(request.GET.get("pci_ids", "").lower())
+        response["hw_support"] = get_hw_support(response["gpus"])
+        response.update(get_runtime_versions(client_version_number, response["hw_support"]))
         return Response(response)
@@ -0,0 +1,72 @@
+"""Benchmark the TOSEC naming convention parser against the names of dat files"""
+
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from tosec.parsers.naming import TosecNamingConvention, parse_many, parse_name
+from tosec.parsers.xml import TosecParser
+
+FIXTURE_DAT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "fixtures",
+    "Apple 1 - Games (TOSEC-v2019-01-01_CM).dat",
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark the TOSEC naming convention parser on the game and ROM names of dat files"
+
+    def add_arguments(self, parser):
+        parser.add_argument("dat_files", nargs="*", default=[FIXTURE_DAT])
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def get_names(self, dat_files):
+        """Return the name of every game and ROM in the dat files"""
+        names = []
+        for dat_file in dat_files:
+            for game in TosecParser(dat_file).iter_games():
+                names.append(game["name"])
+                names.extend(os.path.splitext(rom["name"])[0] for rom in game["roms"])
+        return names
+
+    def report(self, label, names_count, duration):
+        self.stdout.write(
+            f"{label:<24} {duration * 1000:>10.1f} ms {names_count / duration:>14,.0f} names/s"
+        )
+
+    def handle(self, *args, **options):
+        names = self.get_names(options["dat_files"])
+        repeat = options["repeat"]
+        self.stdout.write(
+            f"{len(names)} names ({len(set(names))} unique) from {len(options['dat_files'])} "
+            f"dat files, best of {repeat} runs"
+        )
+
+        durations = []
+        for _index in range(repeat):
+            start = time.perf_counter()
+            for name in names:
+                TosecNamingConvention(name)
+            durations.append(time.perf_counter() - start)
+        self.report("Uncached", len(names), min(durations))
+
+        durations = []
+        for _index in range(repeat):
+            parse_name.cache_clear()
+            start = time.perf_counter()
+            parse_many(names)
+            durations.append(time.perf_counter() - start)
+        self.report("parse_many (cold cache)", len(names), min(durations))
+
+        durations = []
+        for _index in range(repeat):
+            start = time.perf_counter()
+            parse_many(names)
+            durations.append(time.perf_counter() - start)
+        self.report("parse_many (warm cache)", len(names), min(durations))
+
+        if names:
+            self.stdout.write(f"Result size: {sys.getsizeof(parse_name(names[0]))} bytes")
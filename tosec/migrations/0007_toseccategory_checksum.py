@@ -0,0 +1,18 @@
+# Generated by Django 5.2.11 on 2026-10-18 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tosec', '0006_alter_toseccategory_id_alter_tosecgame_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='toseccategory',
+            name='checksum',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
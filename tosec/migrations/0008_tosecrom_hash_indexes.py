@@ -0,0 +1,35 @@
+# Generated by Django 5.2.11 on 2026-10-18 04:53
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def lowercase_hashes(apps, schema_editor):
+    TosecRom = apps.get_model('tosec', 'TosecRom')
+    TosecRom.objects.update(crc=Lower('crc'), md5=Lower('md5'), sha1=Lower('sha1'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tosec', '0007_toseccategory_checksum'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_hashes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='tosecrom',
+            name='crc',
+            field=models.CharField(db_index=True, max_length=16),
+        ),
+        migrations.AlterField(
+            model_name='tosecrom',
+            name='md5',
+            field=models.CharField(db_index=True, max_length=32),
+        ),
+        migrations.AlterField(
+            model_name='tosecrom',
+            name='sha1',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+    ]
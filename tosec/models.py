@@ -10,6 +10,7 @@ class TosecCategory(models.Model):
     version = models.CharField(max_length=32)
     author = models.TextField()
     section = models.CharField(max_length=12, default="TOSEC")
+    checksum = models.CharField(max_length=64, blank=True)  # SHA-256 of the imported dat file
 
     def __str__(self):
         return self.name
@@ -39,9 +40,21 @@ class TosecRom(models.Model):
     game = models.ForeignKey(TosecGame, related_name="roms", on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
     size = models.BigIntegerField()
-    crc = models.CharField(max_length=16)
-    md5 = models.CharField(max_length=32)
-    sha1 = models.CharField(max_length=64)
+    # Hashes are stored in lowercase so lookups can use the indexes
+    crc = models.CharField(max_length=16, db_index=True)
+    md5 = models.CharField(max_length=32, db_index=True)
+    sha1 = models.CharField(max_length=64, db_index=True)
 
     def __str__(self):
         return self.name
+
+    def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
+        self.crc = self.crc.lower()
+        self.md5 = self.md5.lower()
+        self.sha1 = self.sha1.lower()
+        return super().save(
+            force_insert=force_insert,
+            force_update=force_update,
+            using=using,
+            update_fields=update_fields,
+        )
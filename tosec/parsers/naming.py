@@ -1,5 +1,6 @@
 """TOSEC naming convention parser"""
 
+import functools
 import logging
 import re
 
@@ -7,17 +8,41 @@ from tosec import constants
 
 LOGGER = logging.getLogger(__name__)
 
+TOSEC_RE = re.compile(
+    r"(?P<title>.*?) "
+    r"(?:\((?P<demo>demo(?:-[a-z]{5,9})*)\) )*"
+    r"\((?P<date>[0-9x]{4}(?:-[0-9]{2}(?:-[0-9x]{2})*)*)\)"
+    r"\((?P<publisher>.*?)\)"
+)
+FLAGS_RE = re.compile(r"\(.*\)")
+FLAGS_SPLIT_RE = re.compile(r"(\(.*?\))")
+DUMP_FLAGS_RE = re.compile(r"\[.*\]")
+DUMP_FLAGS_SPLIT_RE = re.compile(r"(\[.*?\])")
+MULTI_LANGUAGE_RE = re.compile(r"^M\d$")
+
+DUMP_FLAGS_ATTRS = {
+    "cr": "cracked",
+    "f": "fixed",
+    "h": "hacked",
+    "m": "modified",
+    "p": "pirated",
+    "t": "trained",
+    "tr": "translated",
+    "o": "over_dump",
+    "u": "under_dump",
+    "v": "virus",
+    "b": "bad_dump",
+    "a": "alternate",
+    "!": "known_verified",
+}
+
+PARSE_CACHE_SIZE = 65536
+
 
 class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
     """Naming conventions used in TOSEC files"""
 
-    tosec_re = (
-        r"(?P<title>.*?) "
-        r"(?:\((?P<demo>demo(?:-[a-z]{5,9})*)\) )*"
-        r"\((?P<date>[0-9x]{4}(?:-[0-9]{2}(?:-[0-9x]{2})*)*)\)"
-        r"\((?P<publisher>.*?)\)"
-    )
-    flags_re = r"\((.*?)\)*"
+    tosec_re = TOSEC_RE
 
     parts = [
         "title",
@@ -48,21 +73,16 @@ class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
         "known_verified",
     ]
 
-    empty = {"title": None, "demo": None, "date": None, "publisher": None}
+    # Flags in parenthesis, in the order they can appear after the publisher
+    flag_setters = tuple(
+        "set_" + part for part in parts[parts.index("publisher") + 1 : parts.index("cracked")]
+    )
+
+    __slots__ = (*parts, "filename", "media_additional", "media_numbers", "media_total")
 
     def __init__(self, name):
-        for part in self.parts:
-            setattr(self, part, None)
-        self.media_numbers = []
-        self.media_total = None
         self.filename = name
-        self.matches = re.search(self.tosec_re, name)
-        groupdict = self.matches.groupdict() if self.matches else self.empty
-        self.title = groupdict["title"]
-        self.demo = groupdict["demo"]
-        self.date = groupdict["date"]
-        self.publisher = groupdict["publisher"]
-
+        self.version = None
         self.system = ""
         self.video = ""
         self.country = ""
@@ -72,63 +92,55 @@ class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
         self.media = ""
         self.media_additional = ""
         self.media_label = ""
-
-        if self.matches:
-            remainder = self.filename[self.matches.end() :]
-            flag_match = re.search(r"\(.*\)", remainder)
-            if flag_match:
-                flag_part = remainder[flag_match.start() : flag_match.end()]
-                flags = [s for s in re.split(r"(\(.*?\))", flag_part) if s]
-                self.set_flags(flags)
-                remainder = remainder[flag_match.end() :]
-
-            dump_match = re.search(r"\[.*\]", remainder)
-            if dump_match:
-                dump_part = remainder[dump_match.start(), dump_match.end()]
-                dump_flags = [d for d in re.split(r"(\[.*?\])", dump_part) if d]
-                self.set_dump_flags(dump_flags)
+        self.media_numbers = []
+        self.media_total = None
+        for dump_flag in DUMP_FLAGS_ATTRS.values():
+            setattr(self, dump_flag, None)
+
+        matches = TOSEC_RE.search(name)
+        if not matches:
+            self.title = self.demo = self.date = self.publisher = None
+            return
+        self.title, self.demo, self.date, self.publisher = matches.group(
+            "title", "demo", "date", "publisher"
+        )
+
+        remainder = name[matches.end() :]
+        flag_match = FLAGS_RE.search(remainder)
+        if flag_match:
+            self.set_flags([s for s in FLAGS_SPLIT_RE.split(flag_match.group()) if s])
+            remainder = remainder[flag_match.end() :]
+
+        dump_match = DUMP_FLAGS_RE.search(remainder)
+        if dump_match:
+            self.set_dump_flags([d for d in DUMP_FLAGS_SPLIT_RE.split(dump_match.group()) if d])
 
     def set_flags(self, flags):
         """Dispatch flag assignment to the class' set_* methods"""
-        current_flag_index = self.parts.index("publisher") + 1
+        current_flag_index = 0
         for flag in flags:
-            # if not flag.startswith('('):
-            #     return
             flag_value = flag.strip("()")
             flag_set = False
-            last_index = self.parts.index("cracked")
-            while current_flag_index < last_index and not flag_set:
-                flag_type = self.parts[current_flag_index]
-                flag_method = getattr(self, "set_" + flag_type)
-                flag_set = flag_method(flag_value)
+            while current_flag_index < len(self.flag_setters) and not flag_set:
+                flag_set = getattr(self, self.flag_setters[current_flag_index])(flag_value)
                 current_flag_index += 1
 
     def set_dump_flags(self, dump_flags):
         """Set attributes on the instance from the game's dump flags"""
-        dump_flags_attrs = {
-            "cr": "cracked",
-            "f": "fixed",
-            "h": "hacked",
-            "m": "modified",
-            "p": "pirated",
-            "t": "trained",
-            "tr": "translated",
-            "o": "over_dump",
-            "u": "under_dump",
-            "v": "virus",
-            "b": "bad_dump",
-            "a": "alternate",
-            "!": "known_verified",
-        }
         for flag in dump_flags:
-            flag_parts = flag.split()
+            flag_parts = flag.strip("[]").split()
+            if not flag_parts:
+                continue
+            # Multiple dumps of the same kind are numbered, for example [a2]
             flag_name = flag_parts[0]
-            if flag_name in dump_flags_attrs:
+            if flag_name not in DUMP_FLAGS_ATTRS:
+                flag_name = flag_name.rstrip("0123456789")
+            if flag_name in DUMP_FLAGS_ATTRS:
                 if len(flag_parts) == 1:
                     value = True
                 else:
                     value = " ".join(flag_parts[1:])
-                setattr(self, dump_flags_attrs[flag_name], value)
+                setattr(self, DUMP_FLAGS_ATTRS[flag_name], value)
 
     def set_system(self, value):
         """This field is reserved for collections that require multiple system
@@ -193,7 +205,7 @@ class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
         if all(lang in constants.LANGUAGE_FLAGS for lang in languages):
             self.language = value
             return True
-        if re.match(r"^M\d$", value):
+        if MULTI_LANGUAGE_RE.match(value):
             self.language = value
             return True
 
@@ -230,7 +242,7 @@ class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
         allowed.
         """
         media_info = value.split()
-        if media_info[0] in constants.MEDIA_FLAGS:
+        if len(media_info) > 1 and media_info[0] in constants.MEDIA_FLAGS:
             self.media = media_info[0]
             self.media_numbers = media_info[1].split("-")
             if len(media_info) > 2:
@@ -252,3 +264,14 @@ class TosecNamingConvention:  # pylint: disable=too-many-instance-attributes
         "Insert Character Disk".
         """
         self.media_label = value
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_name(name):
+    """Return the parsed TOSEC name, results are cached and must not be modified"""
+    return TosecNamingConvention(name)
+
+
+def parse_many(names):
+    """Parse a batch of TOSEC names"""
+    return [parse_name(name) for name in names]
@@ -4,22 +4,50 @@ import xml.etree.ElementTree
 
 
 class TosecParser:
-    """Parser for XML based dat files"""
+    """Parser for XML based dat files
+
+    The file is read incrementally, elements are discarded as soon as their game
+    has been processed so memory usage doesn't depend on the size of the dat.
+    """
 
     def __init__(self, filename):
+        self.filename = filename
         self.headers = {}
         self.games = []
-        self.root = xml.etree.ElementTree.parse(filename).getroot()
+
+    def read_headers(self):
+        """Read the headers of the dat file without parsing its games"""
+        with open(self.filename, "rb") as dat_file:
+            for _event, element in xml.etree.ElementTree.iterparse(dat_file):
+                if element.tag == "header":
+                    self.headers = {header_tag.tag: header_tag.text for header_tag in element}
+                    break
+        return self.headers
+
+    def iter_games(self):
+        """Yield games from the dat file, headers are available once the first
+        game has been yielded.
+        """
+        root = None
+        for event, element in xml.etree.ElementTree.iterparse(
+            self.filename, events=("start", "end")
+        ):
+            if event == "start":
+                if root is None:
+                    root = element
+                continue
+            if element.tag == "header":
+                self.headers = {header_tag.tag: header_tag.text for header_tag in element}
+                root.clear()
+            elif element.tag == "game":
+                description = element.find("description")
+                yield {
+                    "name": element.attrib["name"],
+                    "description": description.text if description is not None else "",
+                    "roms": [dict(rom_tag.attrib) for rom_tag in element.findall("rom")],
+                }
+                root.clear()
 
     def parse(self):
         """Parse the XML file"""
-        header = self.root.find("header")
-        for header_tag in header:
-            self.headers[header_tag.tag] = header_tag.text
-        for game_tag in self.root.findall("game"):
-            game = {"name": game_tag.attrib["name"], "roms": []}
-            description = game_tag.find("description")
-            game["description"] = description.text
-            for rom_tag in game_tag.findall("rom"):
-                game["roms"].append(rom_tag.attrib)
-            self.games.append(game)
+        self.games = list(self.iter_games())
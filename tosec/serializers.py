@@ -24,3 +24,19 @@ class GameSerializer(serializers.ModelSerializer):
     class Meta:
         model = TosecGame
         fields = ("name", "description", "category", "roms")
+
+
+class GameSummarySerializer(serializers.ModelSerializer):
+    category = CategorySerializer()
+
+    class Meta:
+        model = TosecGame
+        fields = ("name", "description", "category")
+
+
+class RomMatchSerializer(serializers.ModelSerializer):
+    game = GameSummarySerializer()
+
+    class Meta:
+        model = TosecRom
+        fields = ("name", "size", "crc", "md5", "sha1", "game")
@@ -9,14 +9,21 @@ from tosec.utils import import_tosec_database
 
 
 @app.task
-def import_dat(filename, folder):
+def import_dat(filename, folder, force=False):
     """Wrapper around import_tosec_database as a Celery task"""
-    import_tosec_database(filename, folder)
+    category, imported = import_tosec_database(filename, folder, force=force)
+    if imported:
+        print(f"Imported {category.name} {category.version}")
+    else:
+        print(f"Skipped {filename}, {category.name} {category.version} is already loaded")
+    return imported
 
 
 @app.task
-def import_tosec(folder="TOSEC"):
-    """Import several TOSEC dat files to the database"""
+def import_tosec(folder="TOSEC", force=False):
+    """Import several TOSEC dat files to the database.
+    Dat files that are already loaded are skipped unless force is set.
+    """
     basepath = os.path.join(settings.TOSEC_DAT_PATH, folder)
     if not os.path.exists(basepath):
         print(f"No TOSEC database found in {basepath}")
@@ -27,4 +34,4 @@ def import_tosec(folder="TOSEC"):
     total_files = len(filenames)
     for index, filename in enumerate(filenames, start=1):
         print(f"Importing {filename} [{index} of {total_files}]")
-        import_dat.delay(filename, folder)
+        import_dat.delay(filename, folder, force=force)
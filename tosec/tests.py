@@ -1,11 +1,17 @@
 # pylint: disable=missing-docstring,invalid-name
+import json
 import os
+import shutil
+import tempfile
 
 from django.test import TestCase
+from django.urls import reverse
 
+from tosec import models
 from tosec.parsers.legacy import TosecOldParser as TosecParser
-from tosec.parsers.naming import TosecNamingConvention
-from tosec.utils import smart_split
+from tosec.parsers.naming import TosecNamingConvention, parse_many
+from tosec.parsers.xml import TosecParser as TosecXMLParser
+from tosec.utils import import_tosec_database, smart_split
 
 
 class TestTosecParser(TestCase):
@@ -32,6 +38,113 @@ class TestTosecParser(TestCase):
         self.assertIn("Blackjack", parser.games[0]["name"])
 
 
+class TestTosecXMLParser(TestCase):
+    def setUp(self):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.dat_path = os.path.join(
+            base_path, "fixtures", "Apple 1 - Games (TOSEC-v2019-01-01_CM).dat"
+        )
+
+    def test_can_stream_games(self):
+        parser = TosecXMLParser(self.dat_path)
+        games = list(parser.iter_games())
+        self.assertEqual(parser.headers["version"], "2019-01-01")
+        self.assertEqual(len(games), 3)
+        self.assertIn("Blackjack", games[0]["name"])
+        self.assertEqual(len(games[2]["roms"]), 2)
+
+    def test_can_import_database(self):
+        category, imported = import_tosec_database(self.dat_path, "TOSEC")
+        self.assertTrue(imported)
+        self.assertEqual(category.name, "Apple 1 - Games")
+        self.assertEqual(category.version, "2019-01-01")
+        self.assertEqual(models.TosecGame.objects.filter(category=category).count(), 3)
+        rom = models.TosecRom.objects.get(md5="95ca2a2be59851ec42f0dc4fbfa26310")
+        self.assertEqual(rom.size, 3350056)
+        self.assertIn("Lunar Lander", rom.game.name)
+
+    def test_reimport_is_skipped(self):
+        category, _imported = import_tosec_database(self.dat_path, "TOSEC")
+        with self.assertNumQueries(1):
+            skipped_category, imported = import_tosec_database(self.dat_path, "TOSEC")
+        self.assertFalse(imported)
+        self.assertEqual(skipped_category, category)
+        self.assertEqual(models.TosecCategory.objects.count(), 1)
+        self.assertEqual(models.TosecRom.objects.count(), 4)
+
+    def test_new_version_replaces_old_one(self):
+        import_tosec_database(self.dat_path, "TOSEC")
+        with open(self.dat_path, encoding="utf-8") as dat_file:
+            dat_content = dat_file.read()
+        new_dat_path = os.path.join(tempfile.mkdtemp(), "Apple 1 - Games (TOSEC-v2020).dat")
+        self.addCleanup(shutil.rmtree, os.path.dirname(new_dat_path))
+        with open(new_dat_path, "w", encoding="utf-8") as dat_file:
+            dat_file.write(dat_content.replace("2019-01-01", "2020-01-01"))
+
+        category, imported = import_tosec_database(new_dat_path, "TOSEC")
+        self.assertTrue(imported)
+        self.assertEqual(list(models.TosecCategory.objects.all()), [category])
+        self.assertEqual(category.version, "2020-01-01")
+        self.assertEqual(models.TosecGame.objects.count(), 3)
+        self.assertEqual(models.TosecRom.objects.count(), 4)
+
+        category, imported = import_tosec_database(self.dat_path, "TOSEC")
+        self.assertFalse(imported)
+        self.assertEqual(category.version, "2020-01-01")
+
+
+class TestRomLookup(TestCase):
+    def setUp(self):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        import_tosec_database(
+            os.path.join(base_path, "fixtures", "Apple 1 - Games (TOSEC-v2019-01-01_CM).dat"),
+            "TOSEC",
+        )
+
+    def test_can_find_game_by_md5(self):
+        response = self.client.get(
+            reverse("tosec_games"), {"md5": "95CA2A2BE59851EC42F0DC4FBFA26310"}
+        )
+        self.assertEqual(response.status_code, 200)
+        games = response.json()["results"]
+        self.assertEqual(len(games), 1)
+        self.assertIn("Lunar Lander", games[0]["name"])
+
+    def test_can_lookup_hashes_in_batch(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse("tosec_rom_lookup"),
+                {
+                    "md5": ["B5891670343DF82155B6EA33D0407394", "ffffffffffffffffffffffffffffffff"],
+                    "sha1": ["de99cf33433e9b53b74920f3be258a4ce295ca2d"],
+                    "crc": ["0BADC0DE"],
+                },
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200)
+        roms = sorted(response.json(), key=lambda rom: rom["name"])
+        self.assertEqual(len(roms), 3)
+        self.assertIn("Blackjack", roms[0]["game"]["name"])
+        self.assertIn("Lunar Lander", roms[1]["game"]["name"])
+        self.assertEqual(roms[2]["crc"], "0badc0de")
+        self.assertEqual(roms[2]["game"]["category"]["name"], "Apple 1 - Games")
+
+    def test_lookup_rejects_too_many_hashes(self):
+        response = self.client.post(
+            reverse("tosec_rom_lookup"),
+            {"crc": [f"{index:08x}" for index in range(1001)]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_lookup_rejects_malformed_payloads(self):
+        for payload in (["0badc0de"], "0badc0de", 42, {"crc": [1234]}, {"md5": "0badc0de"}):
+            response = self.client.post(
+                reverse("tosec_rom_lookup"), json.dumps(payload), content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400, payload)
+
+
 class TestSplitter(TestCase):
     def test_can_normally_split_strings(self):
         string = "aaa bbb   ccc      ddd\t\teee"
@@ -255,3 +368,30 @@ class TestNamingConvention(TestCase):
         name = "TOSEC, The (1986)(Devstudio)(US)(Bonus Disc)"
         tosec_name = TosecNamingConvention(name)
         self.assertEqual(tosec_name.media_label, "Bonus Disc")
+
+    def test_dump_flags(self):
+        name = "Legend of TOSEC, The (1986)(Devstudio)(US)[cr PDX][a2][!]"
+        tosec_name = TosecNamingConvention(name)
+        self.assertEqual(tosec_name.country, "US")
+        self.assertEqual(tosec_name.cracked, "PDX")
+        self.assertTrue(tosec_name.alternate)
+        self.assertTrue(tosec_name.known_verified)
+        self.assertIsNone(tosec_name.hacked)
+
+        name = "Blackjack (19xx)(-)[Req BASIC][load at 4A.FFR800.FFFR, enter at E2B3]"
+        tosec_name = TosecNamingConvention(name)
+        self.assertEqual(tosec_name.title, "Blackjack")
+
+    def test_parse_many(self):
+        names = [
+            "Legend of TOSEC, The (1986)(Devstudio)(PAL)",
+            "Legend of TOSEC, The (demo) (1986)(Devstudio)",
+            "Legend of TOSEC, The (1986)(Devstudio)(PAL)",
+            "Not a TOSEC name",
+        ]
+        tosec_names = parse_many(names)
+        self.assertEqual(len(tosec_names), 4)
+        self.assertEqual(tosec_names[0].video, "PAL")
+        self.assertEqual(tosec_names[1].demo, "demo")
+        self.assertIs(tosec_names[0], tosec_names[2])
+        self.assertIsNone(tosec_names[3].title)
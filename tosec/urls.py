@@ -8,4 +8,5 @@ from . import views
 urlpatterns = [
     path("/categories", views.CategoryListView.as_view(), name="tosec_categories"),
     path("/games", views.GameListView.as_view(), name="tosec_games"),
+    path("/roms/lookup", views.RomLookupView.as_view(), name="tosec_rom_lookup"),
 ]
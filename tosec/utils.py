@@ -1,10 +1,14 @@
 """Utilities for handling TOSEC files"""
 
-from django.db import DataError
+import hashlib
+
+from django.db import transaction
 
 from tosec import models
 from tosec.parsers.xml import TosecParser
 
+IMPORT_BATCH_SIZE = 1000
+
 
 def smart_split(string, sep=None):
     """Split a string while preserving separator groups"""
@@ -36,37 +40,124 @@ def smart_split(string, sep=None):
     return splits
 
 
-def import_tosec_database(filename, collection):
-    """Import a TOSEC database referenced by filename"""
-    tosec_parser = TosecParser(filename)
-    tosec_parser.parse()
-
-    category = models.TosecCategory(
-        name=tosec_parser.headers["name"],
-        description=tosec_parser.headers["description"],
-        category=tosec_parser.headers.get("category", collection),
-        version=tosec_parser.headers["version"],
-        author=tosec_parser.headers["author"] or "",
+def get_dat_checksum(filename):
+    """Return the SHA-256 fingerprint of a dat file"""
+    checksum = hashlib.sha256()
+    with open(filename, "rb") as dat_file:
+        for chunk in iter(lambda: dat_file.read(1024 * 1024), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def create_category(headers, collection, checksum=""):
+    """Create a TosecCategory from the headers of a dat file"""
+    return models.TosecCategory.objects.create(
+        name=headers["name"],
+        description=headers["description"],
+        category=headers.get("category", collection),
+        version=headers["version"],
+        author=headers["author"] or "",
+        checksum=checksum,
     )
-    category.save()
-
-    for game in tosec_parser.games:
-        game_row = models.TosecGame(
-            category=category,
-            name=game["name"],
-            description=game["description"],
-        )
-        game_row.save()
+
+
+def get_loaded_categories(headers, collection):
+    """Return the categories already imported for the dat file's set, newest first"""
+    return models.TosecCategory.objects.filter(
+        name=headers["name"], category=headers.get("category", collection)
+    ).order_by("-version", "-pk")
+
+
+def remove_other_versions(category):
+    """Delete every other copy or version of a category, along with their games and ROMs"""
+    other_categories = models.TosecCategory.objects.filter(
+        name=category.name, category=category.category
+    ).exclude(pk=category.pk)
+    models.TosecRom.objects.filter(game__category__in=other_categories).delete()
+    models.TosecGame.objects.filter(category__in=other_categories).delete()
+    other_categories.delete()
+
+
+def rom_fits(rom):
+    """Return whether a ROM can be saved without exceeding the size of its columns"""
+    for field_name in ("name", "crc", "md5", "sha1"):
+        max_length = models.TosecRom._meta.get_field(field_name).max_length
+        if len(rom.get(field_name, "")) > max_length:
+            return False
+    return True
+
+
+def save_games(category, games):
+    """Save a batch of parsed games and their ROMs"""
+    game_rows = models.TosecGame.objects.bulk_create(
+        [
+            models.TosecGame(
+                category=category,
+                name=game["name"],
+                description=game["description"],
+            )
+            for game in games
+        ]
+    )
+    rom_rows = []
+    for game, game_row in zip(games, game_rows, strict=True):
         for rom in game["roms"]:
-            rom_row = models.TosecRom(
-                game=game_row,
-                name=rom["name"],
-                size=int(rom["size"]),
-                crc=rom["crc"],
-                md5=rom.get("md5", ""),
-                sha1=rom.get("sha1", ""),
+            if not rom_fits(rom):
+                print("Failed to save ROM %s: value too long" % rom)
+                continue
+            rom_rows.append(
+                models.TosecRom(
+                    game=game_row,
+                    name=rom["name"],
+                    size=int(rom["size"]),
+                    crc=rom["crc"].lower(),
+                    md5=rom.get("md5", "").lower(),
+                    sha1=rom.get("sha1", "").lower(),
+                )
             )
-            try:
-                rom_row.save()
-            except DataError as ex:
-                print("Failed to save ROM %s: %s" % (rom, ex))
+    models.TosecRom.objects.bulk_create(rom_rows, batch_size=IMPORT_BATCH_SIZE)
+
+
+def import_tosec_database(filename, collection, force=False):
+    """Import a TOSEC database referenced by filename
+
+    Games are streamed from the dat file and inserted in batches. The new
+    category replaces previous versions of the same set in a single transaction.
+    Unless force is set, files that were already imported, or that are older than
+    the version in the database, are skipped.
+
+    Returns:
+        tuple: The category for the dat file and whether it was imported
+    """
+    checksum = get_dat_checksum(filename)
+    tosec_parser = TosecParser(filename)
+    if not force:
+        category = models.TosecCategory.objects.filter(checksum=checksum).first()
+        if category:
+            return category, False
+        headers = tosec_parser.read_headers()
+        category = get_loaded_categories(headers, collection).first()
+        if category and category.version >= headers["version"]:
+            with transaction.atomic():
+                if category.version == headers["version"]:
+                    category.checksum = checksum
+                    category.save(update_fields=["checksum"])
+                remove_other_versions(category)
+            return category, False
+
+    category = None
+    games = []
+    with transaction.atomic():
+        for game in tosec_parser.iter_games():
+            if category is None:
+                category = create_category(tosec_parser.headers, collection, checksum)
+            games.append(game)
+            if len(games) >= IMPORT_BATCH_SIZE:
+                save_games(category, games)
+                games = []
+        if category is None:
+            category = create_category(tosec_parser.headers, collection, checksum)
+        if games:
+            save_games(category, games)
+        remove_other_versions(category)
+    return category, True
@@ -1,9 +1,14 @@
 """TOSEC API views"""
 
-from rest_framework import filters, generics
+from django.db.models import Q
+from rest_framework import filters, generics, status
+from rest_framework.response import Response
 
-from tosec.models import TosecCategory, TosecGame
-from tosec.serializers import CategorySerializer, GameSerializer
+from tosec.models import TosecCategory, TosecGame, TosecRom
+from tosec.serializers import CategorySerializer, GameSerializer, RomMatchSerializer
+
+HASH_TYPES = ("md5", "sha1", "crc")
+MAX_LOOKUP_HASHES = 1000
 
 
 class CategoryListView(generics.ListAPIView):
@@ -21,8 +26,47 @@ class GameListView(generics.ListAPIView):
     paginate_by = 100
 
     def get_queryset(self):
-        md5sum = self.request.GET.get("md5")
-        base_query = TosecGame.objects.all()
-        if md5sum:
-            base_query = base_query.filter(roms__md5__iexact=md5sum)
+        base_query = TosecGame.objects.select_related("category").prefetch_related("roms")
+        for hash_type in HASH_TYPES:
+            hash_value = self.request.GET.get(hash_type)
+            if hash_value:
+                base_query = base_query.filter(**{f"roms__{hash_type}": hash_value.lower()})
         return base_query
+
+
+class RomLookupView(generics.GenericAPIView):
+    """Identify a batch of ROMs from their hashes
+
+    The payload is a JSON object with lists of hashes for any of the md5, sha1
+    and crc keys. Every matching ROM is returned along with its game.
+    """
+
+    serializer_class = RomMatchSerializer
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response(
+                "Expected an object with lists of hashes", status=status.HTTP_400_BAD_REQUEST
+            )
+        hashes = {}
+        for hash_type in HASH_TYPES:
+            values = request.data.get(hash_type) or []
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                return Response(
+                    f"{hash_type} must be a list of hashes", status=status.HTTP_400_BAD_REQUEST
+                )
+            hashes[hash_type] = {value.lower() for value in values if value}
+        if sum(len(values) for values in hashes.values()) > MAX_LOOKUP_HASHES:
+            return Response(
+                f"Too many hashes, the maximum is {MAX_LOOKUP_HASHES}",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        query = Q()
+        for hash_type, values in hashes.items():
+            if values:
+                query |= Q(**{f"{hash_type}__in": values})
+        if not query:
+            return Response([])
+        roms = TosecRom.objects.filter(query).select_related("game__category")
+        serializer = self.get_serializer(roms, many=True)
+        return Response(serializer.data)